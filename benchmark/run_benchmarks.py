@@ -0,0 +1,363 @@
+#============================================================
+# BENCHMARK SUITE
+# Measures tags file loading, read_tag/write_tag call overhead with the
+#   transport stubbed, batching and end-to-end scan cycles against the
+#   local Modbus simulator. Results are written as JSON so they can be
+#   compared between commits.
+# USAGE:
+#   python benchmark/run_benchmarks.py [--output FILE] [--compare FILE]
+#       [--quick] [--only NAME ...]
+#============================================================
+
+#============================================================
+# Imports
+import os, sys, argparse, json, platform, subprocess, tempfile, time
+import statistics, timeit
+from importlib import util
+from pymodbus.bit_read_message import ReadCoilsResponse, \
+    ReadDiscreteInputsResponse
+from pymodbus.bit_write_message import WriteSingleCoilResponse, \
+    WriteMultipleCoilsResponse
+from pymodbus.register_read_message import ReadHoldingRegistersResponse, \
+    ReadInputRegistersResponse
+from pymodbus.register_write_message import WriteSingleRegisterResponse, \
+    WriteMultipleRegistersResponse
+
+# User-defined Imports
+root_dir= os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+def load_module(module_name):
+    file_path= root_dir + "/src/" + module_name + ".py"
+    spec = util.spec_from_file_location(module_name, file_path)
+    module = util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+modbusclient= load_module("modbusclient")
+processimage= load_module("processimage")
+simulator= load_module("simulator")
+tracelog= load_module("tracelog")
+FactoryIOModbusClient= modbusclient.FactoryIOModbusClient
+ProcessImage= processimage.ProcessImage
+FactoryIOSimulator= simulator.FactoryIOSimulator
+TraceRecorder= tracelog.TraceRecorder
+
+#============================================================
+# Constants
+TAGS_PATH= root_dir + "/data/tags.csv"
+STACKER_TAGS_PATH= root_dir + "/sample/stacker/tags.csv"
+STACKER_INPUTS= ["ST_AL1_ST1", "ST_AL1_ST2", "ST_AL1_ST3",
+    "RP_AL1_ST_CLAMPED", "AL1_ST_DETECTED", "AL1_ST_X_POS", "AL1_ST_Y_POS",
+    "AL1_ST_Z_POS"]
+STACKER_OUTPUTS= {"AL1_ST_X_SET": 0, "AL1_ST_Y_SET": 560,
+    "AL1_ST_Z_SET": 410, "RP_AL1_ST_CLAMP": False, "AL1_ST_GRAB": False,
+    "AL1_EMIT": False, "RC_AL1_ST": False}
+
+#============================================================
+# Helpers
+def summarize(samples, unit_scale=1e6):
+    """Summary statistics of timing samples (seconds), in microseconds."""
+    samples= sorted(samples)
+    def rank(percent):
+        return samples[max(0, int(round(percent / 100 * len(samples))) - 1)]
+    return {
+        "n": len(samples),
+        "mean_us": statistics.fmean(samples) * unit_scale,
+        "p50_us": rank(50) * unit_scale,
+        "p90_us": rank(90) * unit_scale,
+        "p99_us": rank(99) * unit_scale,
+        "min_us": samples[0] * unit_scale
+    }
+
+def time_calls(func, number, repeat):
+    """Per-call time of func (seconds) for each repetition."""
+    return [elapsed / number for elapsed in
+        timeit.repeat(func, number=number, repeat=repeat)]
+
+def time_each(func, number, budget=None):
+    """Time of each of number calls of func (seconds). Stops early, after
+    at least one call, once budget seconds have been spent."""
+    samples= []
+    clock= time.perf_counter
+    for _ in range(number):
+        start= clock()
+        func()
+        samples.append(clock() - start)
+        if budget is not None and sum(samples) >= budget:
+            break
+    return samples
+
+def time_interleaved(funcs, number):
+    """Time of each of number calls of each of funcs (seconds), calling
+    them in turn, such that load changes during the run (e.g. of the
+    simulator thread) weigh on all of them alike."""
+    samples= [[] for _ in funcs]
+    clock= time.perf_counter
+    for _ in range(number):
+        for func, func_samples in zip(funcs, samples):
+            start= clock()
+            func()
+            func_samples.append(clock() - start)
+    return samples
+
+def traced_results(label, plain_cycle, recorder, traced_cycle, number):
+    """Results of a cycle with and without trace recording, the traced
+    result reporting the recording overhead of the median cycle time."""
+    plain, traced= time_interleaved([plain_cycle, recorder.wrap(traced_cycle)],
+        number)
+    results= {label + "_untraced": summarize(plain),
+        label + "_traced": summarize(traced)}
+    results[label + "_traced"]["overhead_pct"]= (statistics.median(traced)
+        / statistics.median(plain) - 1) * 100
+    return results
+
+def write_synthetic_tags(path, n_tags):
+    """Write a FactoryIO-like tags file with n_tags tags, cycling through
+    the four address spaces."""
+    kinds= [("Input", "Bool", "Input {}"), ("Output", "Bool", "Coil {}"),
+        ("Input", "Real", "Input Reg {}"), ("Output", "Real", "Holding Reg {}")]
+    with open(path, "w", encoding="utf-8-sig", newline="") as tags_file:
+        tags_file.write("Name,Type,Data Type,Address\n")
+        for idx in range(n_tags):
+            tag_type, data_type, address= kinds[idx % 4]
+            tags_file.write("TAG_{},{},{},{}\n".format(idx, tag_type,
+                data_type, address.format(idx // 4)))
+
+def stub_transport(client):
+    """Replace the client transport with canned responses, such that only
+    client-side overhead (request building, dispatch, decoding) is timed.
+    """
+    responses= {
+        0x01: ReadCoilsResponse([True] * 8),
+        0x02: ReadDiscreteInputsResponse([True] * 8),
+        0x03: ReadHoldingRegistersResponse([7] * 125),
+        0x04: ReadInputRegistersResponse([7] * 125),
+        0x05: WriteSingleCoilResponse(0, True),
+        0x06: WriteSingleRegisterResponse(0, 1),
+        0x0F: WriteMultipleCoilsResponse(0, 1),
+        0x10: WriteMultipleRegistersResponse(0, 1)
+    }
+    client.execute= lambda request: responses[request.function_code]
+    return client
+
+#============================================================
+# Benchmarks
+def bench_load_tags(config, tmp_dir):
+    """load_tags on the shipped tags file and synthetic 10k/100k files."""
+    results= {}
+    files= [("data_tags", TAGS_PATH)]
+    for n_tags in config["synthetic_sizes"]:
+        path= os.path.join(tmp_dir, "tags_{}.csv".format(n_tags))
+        write_synthetic_tags(path, n_tags)
+        files.append(("synthetic_{}".format(n_tags), path))
+    client= FactoryIOModbusClient(filepath=TAGS_PATH)
+    for label, path in files:
+        repeat= config["load_repeat"]
+        samples= time_each(lambda: client.load_tags(path), repeat,
+            config["load_budget"])
+        result= summarize(samples)
+        result["tags"]= len(client.tag_index)
+        results["load_tags." + label]= result
+    return results
+
+def bench_tag_lookup(config, tmp_dir):
+    """Tag index lookup."""
+    client= FactoryIOModbusClient(filepath=TAGS_PATH)
+    name= list(client.tag_index)[-1]
+    return {"tag_lookup": summarize(time_calls(lambda: client.get_tag(name),
+        config["number"], config["repeat"]))}
+
+def bench_call_overhead(config, tmp_dir):
+    """read_tag/write_tag/read_tags/write_tags with the transport stubbed."""
+    client= stub_transport(FactoryIOModbusClient(filepath=STACKER_TAGS_PATH))
+    # Instrumented client, the stub replacing the timed execute too
+    instrumented= stub_transport(FactoryIOModbusClient(
+        filepath=STACKER_TAGS_PATH, instrument=True))
+    number= config["number"]
+    repeat= config["repeat"]
+    def per_tag_reads():
+        for name in STACKER_INPUTS:
+            client.read_tag(name)
+    def per_tag_writes():
+        for name, value in STACKER_OUTPUTS.items():
+            client.write_tag(name, value)
+    return {
+        "read_tag.bool": summarize(time_calls(
+            lambda: client.read_tag("ST_AL1_ST1"), number, repeat)),
+        "read_tag.register": summarize(time_calls(
+            lambda: client.read_tag("AL1_ST_X_POS"), number, repeat)),
+        "write_tag.bool": summarize(time_calls(
+            lambda: client.write_tag("AL1_ST_GRAB", True), number, repeat)),
+        "write_tag.register": summarize(time_calls(
+            lambda: client.write_tag("AL1_ST_X_SET", 5), number, repeat)),
+        "read_tag.register.instrumented": summarize(time_calls(
+            lambda: instrumented.read_tag("AL1_ST_X_POS"), number, repeat)),
+        "write_tag.register.instrumented": summarize(time_calls(
+            lambda: instrumented.write_tag("AL1_ST_X_SET", 5), number,
+            repeat)),
+        "stacker_inputs.read_tag": summarize(time_calls(
+            per_tag_reads, number // 10, repeat)),
+        "stacker_inputs.read_tags": summarize(time_calls(
+            lambda: client.read_tags(STACKER_INPUTS), number // 10, repeat)),
+        "stacker_outputs.write_tag": summarize(time_calls(
+            per_tag_writes, number // 10, repeat)),
+        "stacker_outputs.write_tags": summarize(time_calls(
+            lambda: client.write_tags(STACKER_OUTPUTS), number // 10, repeat))
+    }
+
+def bench_scan_cycle(config, tmp_dir):
+    """End-to-end stacker-like scan cycles against the local simulator."""
+    results= {}
+    with FactoryIOSimulator(filepath=STACKER_TAGS_PATH,
+        latency=config["latency"]) as sim:
+        host, port= sim.address
+        with FactoryIOModbusClient(host, port,
+            filepath=STACKER_TAGS_PATH) as client:
+            assert client.connect()
+            def per_tag_cycle():
+                for name in STACKER_INPUTS:
+                    client.read_tag(name)
+                for name, value in STACKER_OUTPUTS.items():
+                    client.write_tag(name, value)
+            def batched_cycle():
+                client.read_tags(STACKER_INPUTS)
+                client.write_tags(STACKER_OUTPUTS)
+            image= ProcessImage(client, inputs=STACKER_INPUTS)
+            def image_cycle():
+                image.scan()
+                for name, value in STACKER_OUTPUTS.items():
+                    image[name]= value
+                image.flush()
+            buffer= client.image_buffer(STACKER_INPUTS)
+            def buffer_cycle():
+                buffer.read()
+                client.write_tags(STACKER_OUTPUTS)
+            for label, cycle in (("per_tag", per_tag_cycle),
+                ("batched", batched_cycle), ("process_image", image_cycle),
+                ("image_buffer", buffer_cycle)):
+                requests= sim.requests
+                samples= time_each(cycle, config["cycles"])
+                result= summarize(samples)
+                result["requests_per_cycle"]= (sim.requests - requests) \
+                    / config["cycles"]
+                results["scan_cycle." + label]= result
+            # Batched cycle recorded to a trace log, against the cycle
+            #   calling the unrecorded methods
+            read_tags, write_tags= client.read_tags, client.write_tags
+            def plain_cycle():
+                read_tags(STACKER_INPUTS)
+                write_tags(STACKER_OUTPUTS)
+            with TraceRecorder(client,
+                os.path.join(tmp_dir, "scan_cycle.trace")) as recorder:
+                results.update(traced_results("scan_cycle.batched",
+                    plain_cycle, recorder, batched_cycle, config["cycles"]))
+    # Batched cycle reading all inputs and writing all outputs of the
+    #   shipped tags file (349 tags), recorded to a trace log
+    with FactoryIOSimulator(filepath=TAGS_PATH,
+        latency=config["latency"]) as sim:
+        host, port= sim.address
+        with FactoryIOModbusClient(host, port, filepath=TAGS_PATH) as client:
+            assert client.connect()
+            inputs= [name for name, tag in client.tag_index.items()
+                if tag.write_type is None]
+            outputs= {name: False if tag.write_type == "write_coil" else 0
+                for name, tag in client.tag_index.items()
+                if tag.write_type is not None}
+            read_tags, write_tags= client.read_tags, client.write_tags
+            def plain_cycle():
+                read_tags(inputs)
+                write_tags(outputs)
+            def all_tags_cycle():
+                client.read_tags(inputs)
+                client.write_tags(outputs)
+            with TraceRecorder(client,
+                os.path.join(tmp_dir, "all_tags.trace")) as recorder:
+                results.update(traced_results("scan_cycle.all_tags",
+                    plain_cycle, recorder, all_tags_cycle, config["cycles"]))
+            results["scan_cycle.all_tags_traced"]["tags"]= len(inputs) \
+                + len(outputs)
+    return results
+
+BENCHMARKS= {
+    "load_tags": bench_load_tags,
+    "tag_lookup": bench_tag_lookup,
+    "call_overhead": bench_call_overhead,
+    "scan_cycle": bench_scan_cycle
+}
+
+#============================================================
+# Main
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+            cwd=root_dir, capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline):
+    """Print mean time ratios against a previous results file."""
+    print("\n{:<40}{:>16}{:>16}{:>9}".format("benchmark", "baseline us",
+        "current us", "ratio"))
+    for name, result in sorted(results["results"].items()):
+        previous= baseline["results"].get(name)
+        if previous is None:
+            continue
+        ratio= result["mean_us"] / previous["mean_us"] \
+            if previous["mean_us"] else float("nan")
+        print("{:<40}{:>16.2f}{:>16.2f}{:>8.2f}x".format(name,
+            previous["mean_us"], result["mean_us"], ratio))
+
+def main(argv=None):
+    parser= argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", default=root_dir + "/bench_output.json",
+        help="JSON results file")
+    parser.add_argument("--compare", help="Previous JSON results file")
+    parser.add_argument("--quick", action="store_true",
+        help="Fewer iterations and no 100k tags file")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS),
+        help="Benchmarks to run")
+    args= parser.parse_args(argv)
+
+    if args.quick:
+        config= {"synthetic_sizes": [10000], "load_repeat": 3, "number": 200,
+            "repeat": 3, "cycles": 50, "latency": 0.0, "load_budget": 10}
+    else:
+        config= {"synthetic_sizes": [10000, 100000], "load_repeat": 5,
+            "number": 2000, "repeat": 5, "cycles": 500, "latency": 0.0,
+            "load_budget": 30}
+
+    results= {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in args.only or BENCHMARKS:
+            print("Running {}...".format(name))
+            results.update(BENCHMARKS[name](config, tmp_dir))
+    output= {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": config
+        },
+        "results": results
+    }
+    with open(args.output, "w") as output_file:
+        json.dump(output, output_file, indent=2, sort_keys=True)
+
+    print("\n{:<40}{:>16}{:>16}{:>16}".format("benchmark", "mean us",
+        "p50 us", "p99 us"))
+    for name, result in sorted(results.items()):
+        print("{:<40}{:>16.2f}{:>16.2f}{:>16.2f}".format(name,
+            result["mean_us"], result["p50_us"], result["p99_us"]))
+    for name, result in sorted(results.items()):
+        if "overhead_pct" in result:
+            print("{:<40}{:>15.2f}%".format(name + " overhead",
+                result["overhead_pct"]))
+    print("\nResults written to {}".format(args.output))
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            compare(output, json.load(baseline_file))
+
+if __name__ == "__main__":
+    main()
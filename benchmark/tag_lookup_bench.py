@@ -0,0 +1,51 @@
+#============================================================
+# TAG LOOKUP MICROBENCHMARK
+# Compares the DataFrame boolean-mask lookup previously done on
+#   every read_tag/write_tag/read_fault/write_fault call with the
+#   compiled tag index.
+# USAGE: python benchmark/tag_lookup_bench.py [path/to/tags.csv]
+#============================================================
+
+#============================================================
+# Imports
+import os, sys, timeit
+from importlib import util
+
+# User-defined Imports
+root_dir= os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+module_name="modbusclient"
+file_path= root_dir + "/src/modbusclient.py"
+spec = util.spec_from_file_location(module_name, file_path)
+modbusclient = util.module_from_spec(spec)
+sys.modules[module_name] = modbusclient
+spec.loader.exec_module(modbusclient)
+from modbusclient import FactoryIOModbusClient
+
+#============================================================
+# Constants
+TAGS_PATH= sys.argv[1] if len(sys.argv) > 1 else root_dir + "/data/tags.csv"
+NUMBER= 2000
+REPEAT= 5
+
+#============================================================
+client= FactoryIOModbusClient(filepath=TAGS_PATH)
+tags= client.tags_dataframe()
+tag_index= client.tag_index
+# Look up the last tag: worst case for a linear scan
+name= tags["Name"].iloc[-1]
+
+def mask_lookup():
+    return tags[tags["Name"]==name].iloc[0]
+
+def index_lookup():
+    return tag_index[name]
+
+print("Tags: {} ({} rows)".format(TAGS_PATH, len(tags)))
+results= {}
+for label, func in (("DataFrame mask", mask_lookup), 
+    ("Tag index", index_lookup)):
+    best= min(timeit.repeat(func, number=NUMBER, repeat=REPEAT))
+    results[label]= best / NUMBER
+    print("{:<16}{:>12.3f} us/lookup".format(label, results[label] * 1e6))
+print("Speedup: {:.0f}x".format(
+    results["DataFrame mask"] / results["Tag index"]))
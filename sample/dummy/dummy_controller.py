@@ -23,6 +23,13 @@ modbusclient = util.module_from_spec(spec)
 sys.modules[module_name] = modbusclient
 spec.loader.exec_module(modbusclient)
 from modbusclient import FactoryIOModbusClient
+module_name="scanscheduler"
+file_path= "./src/scanscheduler.py"
+spec = util.spec_from_file_location(module_name, file_path)
+scanscheduler = util.module_from_spec(spec)
+sys.modules[module_name] = scanscheduler
+spec.loader.exec_module(scanscheduler)
+from scanscheduler import ScanScheduler
 
 #============================================================
 # FAULT INJECTION THREAD
@@ -61,7 +68,8 @@ with FactoryIOModbusClient(
     P1= True
 
     # Controller execution cycle
-    while True:
+    def cycle():
+        global P0, P1
 
         # Read inputs
         S1= client.read_tag("S1")
@@ -84,5 +92,10 @@ with FactoryIOModbusClient(
             client.write_tag("A1", False)
         if P1:
             client.write_tag("A1", True)
-       
-        time.sleep(CYCLE_PERIOD/1000)
+
+    # Run cycle at a fixed rate
+    scheduler= ScanScheduler(cycle, CYCLE_PERIOD/1000, overrun_policy="warn")
+    try:
+        scheduler.run()
+    finally:
+        print(scheduler.stats())
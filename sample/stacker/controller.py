@@ -10,6 +10,9 @@ MODBUS_HOST= "192.168.1.111"
 MODBUS_PORT= 502
 TAGS_PATH= "./sample/stacker/tags.csv"
 CYCLE_PERIOD= 100 #milliseconds
+# Inputs read (in as few requests as possible) every cycle
+INPUT_TAGS= ["ST_AL1_ST1", "ST_AL1_ST2", "ST_AL1_ST3", "RP_AL1_ST_CLAMPED",
+    "AL1_ST_DETECTED", "AL1_ST_X_POS", "AL1_ST_Y_POS", "AL1_ST_Z_POS"]
 
 #============================================================
 # Imports
@@ -24,6 +27,13 @@ modbusclient = util.module_from_spec(spec)
 sys.modules[module_name] = modbusclient
 spec.loader.exec_module(modbusclient)
 from modbusclient import FactoryIOModbusClient
+module_name="scanscheduler"
+file_path= "./src/scanscheduler.py"
+spec = util.spec_from_file_location(module_name, file_path)
+scanscheduler = util.module_from_spec(spec)
+sys.modules[module_name] = scanscheduler
+spec.loader.exec_module(scanscheduler)
+from scanscheduler import ScanScheduler
 
 #============================================================
 # FAULT INJECTION THREAD
@@ -46,7 +56,8 @@ class FaultInjector(threading.Thread):
 
 #============================================================
 # Create client instance
-with FactoryIOModbusClient(MODBUS_HOST, MODBUS_PORT, filepath=TAGS_PATH) as client:
+with FactoryIOModbusClient(MODBUS_HOST, MODBUS_PORT, filepath=TAGS_PATH,
+    write_cache=True) as client:
     # Connect client
     isConnected= client.connect()
     assert isConnected
@@ -79,17 +90,20 @@ with FactoryIOModbusClient(MODBUS_HOST, MODBUS_PORT, filepath=TAGS_PATH) as clie
     PSE0= True
 
     # Controller execution cycle
-    while True:
+    def cycle():
+        global PA13, PS0, PSC, PS1, PS23, PS2, PS3, PS4, PS5, PS6, PS7, PS8, \
+            PS9, PS10, PS11, PS12, PSE1, PSE2, PSE0
 
         # Read inputs
-        ST_AL1_ST1= client.read_tag("ST_AL1_ST1")
-        ST_AL1_ST2= client.read_tag("ST_AL1_ST2")
-        ST_AL1_ST3= client.read_tag("ST_AL1_ST3")
-        RP_AL1_ST_CLAMPED= client.read_tag("RP_AL1_ST_CLAMPED")
-        AL1_ST_DETECTED= client.read_tag("AL1_ST_DETECTED")
-        AL1_ST_X_POS= client.read_tag("AL1_ST_X_POS")
-        AL1_ST_Y_POS= client.read_tag("AL1_ST_Y_POS")
-        AL1_ST_Z_POS= client.read_tag("AL1_ST_Z_POS")
+        inputs= client.read_tags(INPUT_TAGS)
+        ST_AL1_ST1= inputs["ST_AL1_ST1"]
+        ST_AL1_ST2= inputs["ST_AL1_ST2"]
+        ST_AL1_ST3= inputs["ST_AL1_ST3"]
+        RP_AL1_ST_CLAMPED= inputs["RP_AL1_ST_CLAMPED"]
+        AL1_ST_DETECTED= inputs["AL1_ST_DETECTED"]
+        AL1_ST_X_POS= inputs["AL1_ST_X_POS"]
+        AL1_ST_Y_POS= inputs["AL1_ST_Y_POS"]
+        AL1_ST_Z_POS= inputs["AL1_ST_Z_POS"]
 
         # Controller Logic
         
@@ -205,47 +219,55 @@ with FactoryIOModbusClient(MODBUS_HOST, MODBUS_PORT, filepath=TAGS_PATH) as clie
             PSE0=True
 
         # Outputs
+        outputs= {}
         if PS0:
-            client.write_tag("AL1_ST_X_SET", 0)
-            client.write_tag("AL1_ST_Y_SET", 560)
-            client.write_tag("AL1_ST_Z_SET", 410)
+            outputs["AL1_ST_X_SET"]= 0
+            outputs["AL1_ST_Y_SET"]= 560
+            outputs["AL1_ST_Z_SET"]= 410
         if PSC:
-            client.write_tag("RP_AL1_ST_CLAMP", False)
+            outputs["RP_AL1_ST_CLAMP"]= False
         if PS23:
-            client.write_tag("RP_AL1_ST_CLAMP", False)
-            client.write_tag("AL1_ST_GRAB", False)
+            outputs["RP_AL1_ST_CLAMP"]= False
+            outputs["AL1_ST_GRAB"]= False
         if PS2:
-            client.write_tag("RP_AL1_ST_CLAMP", True)
-            client.write_tag("AL1_ST_GRAB", False)
+            outputs["RP_AL1_ST_CLAMP"]= True
+            outputs["AL1_ST_GRAB"]= False
         if PS3:
-            client.write_tag("RP_AL1_ST_CLAMP", True)
-            client.write_tag("AL1_ST_GRAB", False)
-            client.write_tag("AL1_ST_Y_SET", 560)
+            outputs["RP_AL1_ST_CLAMP"]= True
+            outputs["AL1_ST_GRAB"]= False
+            outputs["AL1_ST_Y_SET"]= 560
         if PS4:
-            client.write_tag("RP_AL1_ST_CLAMP", True)
-            client.write_tag("AL1_ST_GRAB", False)
-            client.write_tag("AL1_ST_Z_SET", 800)
+            outputs["RP_AL1_ST_CLAMP"]= True
+            outputs["AL1_ST_GRAB"]= False
+            outputs["AL1_ST_Z_SET"]= 800
         if PS5:
-            client.write_tag("AL1_ST_GRAB", True)
+            outputs["AL1_ST_GRAB"]= True
         if PS6:
-            client.write_tag("AL1_ST_GRAB", True)
-            client.write_tag("AL1_ST_Z_SET", 410)
+            outputs["AL1_ST_GRAB"]= True
+            outputs["AL1_ST_Z_SET"]= 410
         if PS7:
-            client.write_tag("AL1_ST_GRAB", True)
-            client.write_tag("AL1_ST_X_SET", 770)
+            outputs["AL1_ST_GRAB"]= True
+            outputs["AL1_ST_X_SET"]= 770
         if PS8:
-            client.write_tag("AL1_ST_GRAB", True)
-            client.write_tag("AL1_ST_Z_SET", 600)
+            outputs["AL1_ST_GRAB"]= True
+            outputs["AL1_ST_Z_SET"]= 600
         if PS9:
-            client.write_tag("AL1_ST_GRAB", False)
+            outputs["AL1_ST_GRAB"]= False
         if PSE1:
-            client.write_tag("AL1_EMIT", True)
-            client.write_tag("RC_AL1_ST", True)
+            outputs["AL1_EMIT"]= True
+            outputs["RC_AL1_ST"]= True
         if PSE2:
-            client.write_tag("RC_AL1_ST", True)
-            client.write_tag("AL1_EMIT", False)
+            outputs["RC_AL1_ST"]= True
+            outputs["AL1_EMIT"]= False
         if PSE0:
-            client.write_tag("AL1_EMIT", False)
-            client.write_tag("RC_AL1_ST", False)      
+            outputs["AL1_EMIT"]= False
+            outputs["RC_AL1_ST"]= False
+        # Write outputs (in as few requests as possible)
+        client.write_tags(outputs)
 
-        time.sleep(CYCLE_PERIOD/1000)
+    # Run cycle at a fixed rate
+    scheduler= ScanScheduler(cycle, CYCLE_PERIOD/1000, overrun_policy="warn")
+    try:
+        scheduler.run()
+    finally:
+        print(scheduler.stats())
@@ -1,5 +1,21 @@
 # Imports
-import logging
+import csv, hashlib, importlib.util, logging, marshal, os, re, sys, tempfile
+from array import array
+from functools import lru_cache
+from operator import attrgetter, methodcaller
+from types import MappingProxyType
+
+# Self-defined imports
+# Long-styled import method is used to preserve import structure 
+#   regardless of execution/import method
+# datatypes
+work_dir= os.path.dirname(os.path.realpath(__file__))
+module_name= "datatypes"
+file_path= work_dir + "/datatypes.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+datatypes = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = datatypes
+spec.loader.exec_module(datatypes)
 
 def extract_addresses(addresses):
         """Extract address numeral from textual representation.
@@ -13,24 +29,19 @@ def extract_addresses(addresses):
 
         returns:
         -------
-        A list of integers extracted from supplied addresses. 
+        A list of integers extracted from supplied addresses. Invalid 
+        addresses are left as is, see parse_addresses for an error report.
         """
         
-        # Since lists are iterated over in Python in an orderly fashion, 
-        #   put 'Input Reg' before 'Input' such that the 'Reg' in an address 
-        #   with an 'Input Reg' prefix doesn't get left behind
-        address_prefixes= ["Input Reg ", "Holding Reg ", "Input ", "Coil "]
-
-        
-        for idx,address in enumerate(addresses):
-            # Replace prefixes with empty string
-            for prefix in address_prefixes:
-                addresses[idx]=addresses[idx].replace(prefix, "")
-            # Extract numeral
-            try:
-                addresses[idx]= int(addresses[idx])
-            except:
-                logging.warning("Invalid modbus address suppied at index {}".format(idx))
+        # Parse all addresses at once
+        numbers, _, errors= parse_addresses(addresses)
+        if errors:
+            logging.warning("Invalid modbus address suppied at index {}".format(
+                ", ".join(str(error.index) for error in errors)))
+        invalid= {error.index for error in errors}
+        clean_addresses= [address if idx in invalid else number
+            for idx, (address, number) in enumerate(zip(addresses, numbers))]
+        addresses[:]= clean_addresses
 
         # Return
         return addresses
@@ -59,11 +70,11 @@ def evaluate_reader(tag):
         read_type="read_coils"
         unit_reader= "getBit(0)"
 
-    if tag["Type"]=="Input" and tag["Data Type"]=="Real":
+    if tag["Type"]=="Input" and tag["Data Type"] in ("Real", "Int"):
         read_type="read_input_registers"
         unit_reader= "getRegister(0)"
     
-    if tag["Type"]=="Output" and tag["Data Type"]=="Real":
+    if tag["Type"]=="Output" and tag["Data Type"] in ("Real", "Int"):
         read_type="read_holding_registers"
         unit_reader= "getRegister(0)"
 
@@ -96,7 +107,7 @@ def evaluate_writer(tag):
     if tag["Type"]=="Output" and tag["Data Type"]=="Bool":
         write_type="write_coil"
     
-    if tag["Type"]=="Output" and tag["Data Type"]=="Real":
+    if tag["Type"]=="Output" and tag["Data Type"] in ("Real", "Int"):
         write_type="write_register"
 
     # Check if no type is matched, raise  ValueError
@@ -108,3 +119,829 @@ def evaluate_writer(tag):
         "write_type": write_type,
         "UNIT": UNIT
     })
+
+
+# Columns of FactoryIO tags files
+TAGS_FILE_COLUMNS= ("Name", "Type", "Data Type", "Address")
+
+# Modbus read function code of each FactoryIO address space prefix
+ADDRESS_SPACES= {
+    "Coil": 0x01,
+    "Input": 0x02,
+    "Holding Reg": 0x03,
+    "Input Reg": 0x04
+}
+
+# Textual FactoryIO address, e.g. 'Input Reg 2'. 'Input Reg' is tried 
+#   before 'Input' such that the 'Reg' isn't left behind
+ADDRESS_PATTERN= re.compile(
+    r"[ \t]*(?:(Input Reg|Holding Reg|Input|Coil)[ \t]+)?(\d+)[ \t]*")
+
+def parse_address(address):
+    """Extract address numeral from a single textual address.
+    parameters:
+    ----------
+    address: str
+        Textual address, e.g. 'Holding Reg 17'.
+    returns:
+    -------
+    int, or the supplied address if it is malformed
+    """
+    match= ADDRESS_PATTERN.fullmatch(address)
+    if match is None:
+        return address
+    return int(match.group(2))
+
+class AddressError(object):
+    """Malformed address found by parse_addresses.
+    attributes:
+    ----------
+    index: int
+        Position of the address in the parsed sequence.
+    address: str
+        Malformed address.
+    reason: str
+        What is wrong with the address.
+    """
+    __slots__= ("index", "address", "reason")
+
+    def __init__(self, index, address, reason):
+        self.index= index
+        self.address= address
+        self.reason= reason
+
+    def __eq__(self, other):
+        if not isinstance(other, AddressError):
+            return NotImplemented
+        return (self.index, self.address, self.reason) == \
+            (other.index, other.address, other.reason)
+
+    def __repr__(self):
+        return "AddressError({}, {!r}, {!r})".format(
+            self.index, self.address, self.reason)
+
+def _address_error(index, address):
+    """Describe why an address didn't match ADDRESS_PATTERN."""
+    if not isinstance(address, str):
+        return AddressError(index, address, "not a string")
+    match= re.fullmatch(r"(.*?)[ \t]*\d+[ \t]*", address)
+    if match is None:
+        reason= "missing address number"
+    elif match.group(1).strip() in ADDRESS_SPACES:
+        reason= "malformed address"
+    else:
+        reason= "unknown address space"
+    return AddressError(index, address, reason)
+
+# Replacement of each address space prefix by the digit of its function 
+#   code and a tab, longest prefixes first ('Input Reg' before 'Input')
+_ADDRESS_PREFIX_CODES= [("{} ".format(prefix), "{}\t".format(code))
+    for prefix, code in sorted(ADDRESS_SPACES.items(), 
+        key=lambda item: -len(item[0]))]
+_ADDRESS_CODE_DIGITS= "".join(str(code) for code in ADDRESS_SPACES.values())
+_ADDRESS_CODE_TABLE= bytes.maketrans(_ADDRESS_CODE_DIGITS.encode(), 
+    bytes(ADDRESS_SPACES.values()))
+# Joined addresses after prefix replacement, when every address is 
+#   '<prefix> <ASCII numeral>'
+_FAST_ADDRESSES_PATTERN= re.compile(r"(?:[{0}]\t[0-9]+\n)*[{0}]\t[0-9]+"
+    .format(_ADDRESS_CODE_DIGITS))
+
+def parse_addresses(addresses):
+    """Parse textual addresses in a single pass.
+    The addresses are processed as a whole: the prefixes of the joined 
+    addresses are replaced by function codes, and the result is split 
+    into a column of function codes and a column of numerals. If any 
+    address is malformed, the addresses are matched against 
+    ADDRESS_PATTERN instead to locate them.
+    parameters:
+    ----------
+    addresses: list or pandas.core.series.Series
+        Textual addresses, e.g. ['Input 0', 'Holding Reg 17'].
+    returns:
+    -------
+    (numbers, spaces, errors) tuple:
+        numbers: array.array of int, address numerals, -1 if malformed
+        spaces: array.array of int, read function code of the address 
+            space (ADDRESS_SPACES), 0 if it has no prefix or is malformed
+        errors: list of AddressError, one per malformed address
+    """
+    addresses= list(addresses)
+    if not addresses:
+        return array("l"), array("B"), []
+
+    # Fast path: every address is '<prefix> <numeral>'. The joined text is
+    #   validated as a whole, such that any other address (no or repeated
+    #   prefix, missing or non-ASCII numeral, ...) goes to the slow path
+    if all(type(address) is str for address in addresses):
+        text= "\n".join(addresses)
+        for prefix, code in _ADDRESS_PREFIX_CODES:
+            text= text.replace(prefix, code)
+        if _FAST_ADDRESSES_PATTERN.fullmatch(text):
+            fields= text.replace("\t", "\n").split("\n")
+            # Addresses containing line breaks go to the slow path
+            if len(fields) == 2 * len(addresses):
+                codes= "".join(fields[0::2])
+                return array("l", map(int, fields[1::2])), \
+                    array("B", codes.encode().translate(_ADDRESS_CODE_TABLE)), []
+
+    # Match addresses one by one
+    numbers= array("l")
+    spaces= array("B")
+    errors= []
+    fullmatch= ADDRESS_PATTERN.fullmatch
+    for idx, address in enumerate(addresses):
+        match= fullmatch(address) if isinstance(address, str) else None
+        if match is None:
+            numbers.append(-1)
+            spaces.append(0)
+            errors.append(_address_error(idx, address))
+        else:
+            prefix, numeral= match.groups()
+            numbers.append(int(numeral))
+            spaces.append(ADDRESS_SPACES.get(prefix, 0))
+
+    return numbers, spaces, errors
+
+def read_tags_file(filepath):
+    """Read a FactoryIO tags file.
+    The file is parsed line by line with the csv module, without pandas.
+    A UTF-8 byte order mark, as written by FactoryIO exports, is skipped.
+    parameters:
+    ----------
+    filepath: str
+        Path to FactoryIO tags file
+    returns:
+    -------
+    dict mapping the TAGS_FILE_COLUMNS to lists of values, addresses 
+    reduced to their numeric values. Malformed addresses are left as is.
+    """
+    columns= {column: [] for column in TAGS_FILE_COLUMNS}
+    with open(filepath, encoding="utf-8-sig", newline="") as tags_file:
+        reader= csv.reader(tags_file)
+        header= [column.strip() for column in next(reader, [])]
+        try:
+            positions= [header.index(column) for column in TAGS_FILE_COLUMNS]
+        except ValueError:
+            raise ValueError(
+                "Invalid tags file header: {}. Expected columns {}".format(
+                    header, TAGS_FILE_COLUMNS)) from None
+        names, types, data_types, addresses= columns.values()
+        name_pos, type_pos, data_type_pos, address_pos= positions
+        for row in reader:
+            # Skip blank lines
+            if not row:
+                continue
+            names.append(row[name_pos])
+            types.append(row[type_pos])
+            data_types.append(row[data_type_pos])
+            addresses.append(row[address_pos])
+
+    # Reduce addresses to their numeric values
+    numbers, _, errors= parse_addresses(addresses)
+    invalid= {error.index for error in errors}
+    columns["Address"]= [address if idx in invalid else number
+        for idx, (address, number) in enumerate(zip(addresses, numbers))]
+    if errors:
+        logging.warning("{} invalid modbus address(es) supplied in {}: {}"
+            .format(len(errors), filepath, errors))
+
+    return columns
+
+# Modbus function codes of the pymodbus request methods
+FUNCTION_CODES= {
+    "read_coils": 0x01,
+    "read_discrete_inputs": 0x02,
+    "read_holding_registers": 0x03,
+    "read_input_registers": 0x04,
+    "write_coil": 0x05,
+    "write_register": 0x06,
+    "write_coils": 0x0F,
+    "write_registers": 0x10
+}
+
+# Read types of register tags
+REGISTER_READ_TYPES= ("read_holding_registers", "read_input_registers")
+
+# Method handles of the pymodbus request methods, shared by all tags
+METHOD_HANDLES= {method: attrgetter(method) for method in FUNCTION_CODES}
+
+# Pre-built decoders for the unit readers returned by evaluate_reader
+DECODERS= {
+    "getBit(0)": methodcaller("getBit", 0),
+    "getRegister(0)": methodcaller("getRegister", 0)
+}
+
+class Tag(object):
+    """Compiled FactoryIO tag descriptor.
+    Holds everything needed to read or write a tag, resolved once when
+    the tags file is loaded. Instances are immutable.
+    attributes:
+    ----------
+    name: str
+        Tag name.
+    type: str
+        "Input" or "Output".
+    data_type: str
+        "Bool", "Real", ...
+    address: int
+        Numeric Modbus address.
+    unit: int
+        Modbus unit (slave) id.
+    length: int
+        Number of bits/registers occupied by the tag.
+    read_type: str or None
+        Name of the pymodbus read method, None if the tag can't be read.
+    read_fc: int or None
+        Modbus function code used to read the tag.
+    unit_reader: str or None
+        Textual form of the decoder applied to the read response.
+    write_type: str or None
+        Name of the pymodbus write method, None if the tag can't be written.
+    write_fc: int or None
+        Modbus function code used to write the tag.
+    reader: operator.attrgetter or None
+        reader(client) returns the client's bound read method.
+    decoder: operator.methodcaller or None
+        decoder(response) returns the tag value from a read response.
+    writer: operator.attrgetter or None
+        writer(client) returns the client's bound write method, 
+        write_registers for tags spanning several registers.
+    datatype: datatypes.DataType or None
+        Data type of register tags decoded from/encoded to registers,
+        None for bits and raw 16-bit registers.
+    """
+    __slots__= ("name", "type", "data_type", "address", "unit", "length",
+        "read_type", "read_fc", "unit_reader", "write_type", "write_fc",
+        "reader", "decoder", "writer", "datatype")
+
+    def __init__(self, name, type, data_type, address, unit, length,
+        read_type, unit_reader, write_type, datatype=None):
+        set_attr= object.__setattr__
+        set_attr(self, "name", name)
+        set_attr(self, "type", type)
+        set_attr(self, "data_type", data_type)
+        set_attr(self, "address", address)
+        set_attr(self, "unit", unit)
+        set_attr(self, "length", length)
+        set_attr(self, "read_type", read_type)
+        set_attr(self, "read_fc", FUNCTION_CODES.get(read_type))
+        set_attr(self, "unit_reader", unit_reader)
+        set_attr(self, "write_type", write_type)
+        set_attr(self, "write_fc", FUNCTION_CODES.get(write_type))
+        # Method handles are resolved against the client instance at call 
+        #   time (attrgetter), so overridden/patched methods are honoured
+        set_attr(self, "reader", METHOD_HANDLES.get(read_type))
+        set_attr(self, "decoder", DECODERS.get(unit_reader))
+        set_attr(self, "writer", METHOD_HANDLES.get(write_type))
+        set_attr(self, "datatype", datatype)
+        # Typed register tags
+        if datatype is not None:
+            set_attr(self, "length", datatype.length)
+            set_attr(self, "decoder", datatype.decode_response)
+            if datatype.length > 1 and write_type is not None:
+                set_attr(self, "writer", METHOD_HANDLES["write_registers"])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Tag descriptors are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Tag descriptors are immutable")
+
+    def __repr__(self):
+        return "Tag({!r}, {}, {}, address={})".format(
+            self.name, self.type, self.data_type, self.address)
+
+    def with_datatype(self, datatype):
+        """Copy of the tag with another data type.
+        parameters:
+        ----------
+        datatype: datatypes.DataType or None
+            Data type, None for raw 16-bit registers.
+        returns:
+        -------
+        Tag
+        """
+        if datatype is not None and self.read_type not in REGISTER_READ_TYPES:
+            raise ValueError("Tag type error")
+        return Tag(self.name, self.type, self.data_type, self.address, 
+            self.unit, 1, self.read_type, self.unit_reader, self.write_type,
+            datatype)
+
+
+def compile_tag(name, type, data_type, address):
+    """Compile a single tag row into a Tag descriptor.
+    Tags whose type is not supported are still compiled, with their
+    read/write types set to None, such that the "Tag type error" is only
+    raised when they are actually used.
+    parameters:
+    ----------
+    name: str
+    type: str
+    data_type: str
+    address: int or str
+        Numeric address as returned by extract_addresses.
+    returns:
+    -------
+    Tag
+    """
+    # Normalize numeric addresses (e.g. numpy integers) to int
+    if not isinstance(address, int):
+        try:
+            address= int(address)
+        except (TypeError, ValueError):
+            pass
+
+    return Tag(name, type, data_type, address, *_tag_kind(type, data_type))
+
+@lru_cache(maxsize=None)
+def _tag_kind(type, data_type):
+    """Unit, length, read type, unit reader, write type and data type of
+    tags of a type and data type, evaluated once per combination.
+    """
+    row= {"Type": type, "Data Type": data_type}
+    # Reader
+    try:
+        reader= evaluate_reader(row)
+    except ValueError:
+        reader= {"read_type": None, "UNIT": 0x1, "length": 1, 
+            "unit_reader": None}
+    # Writer
+    try:
+        write_type= evaluate_writer(row)["write_type"]
+    except ValueError:
+        write_type= None
+
+    # Default data type of register tags
+    datatype= None
+    if reader["read_type"] in REGISTER_READ_TYPES:
+        datatype= datatypes.DEFAULT_DATA_TYPES.get(data_type)
+
+    return (reader["UNIT"], reader["length"], reader["read_type"], 
+        reader["unit_reader"], write_type, datatype)
+
+def build_tag_index(tags):
+    """Build a read-only name -> Tag index.
+    If a name appears more than once, the first occurence wins.
+    parameters:
+    ----------
+    tags: pandas.core.frame.DataFrame or dict of lists
+        Tags with "Name", "Type", "Data Type" and "Address" columns, 
+        addresses already reduced to their numeric values.
+    returns:
+    -------
+    types.MappingProxyType mapping tag names to Tag objects
+    """
+    index= {}
+    for name, type, data_type, address in zip(tags["Name"], tags["Type"],
+        tags["Data Type"], tags["Address"]):
+        if name not in index:
+            index[name]= compile_tag(name, type, data_type, address)
+
+    return MappingProxyType(index)
+
+def apply_data_types(tag_index, data_types):
+    """Assign data types to register tags.
+    parameters:
+    ----------
+    tag_index: mapping
+        Compiled tag index, as returned by build_tag_index.
+    data_types: dict
+        Mapping of tag names or FactoryIO data types (e.g. "Real") to
+        data types (datatypes.DataType, type name or spec tuple, see 
+        datatypes.as_data_type), or None for raw 16-bit registers. Tag 
+        names take precedence.
+    returns:
+    -------
+    types.MappingProxyType mapping tag names to Tag objects
+    """
+    if not data_types:
+        return tag_index
+    data_types= {key: None if data_type is None 
+        else datatypes.as_data_type(data_type) 
+        for key, data_type in data_types.items()}
+    for key in data_types:
+        if key in tag_index \
+            and tag_index[key].read_type not in REGISTER_READ_TYPES:
+            raise ValueError("Tag type error")
+    index= {}
+    for name, tag in tag_index.items():
+        if tag.read_type in REGISTER_READ_TYPES:
+            if name in data_types:
+                tag= tag.with_datatype(data_types[name])
+            elif tag.data_type in data_types:
+                tag= tag.with_datatype(data_types[tag.data_type])
+        index[name]= tag
+
+    return MappingProxyType(index)
+
+# Version of the compiled tags cache format. Bump when Tag or the 
+#   serialized layout changes, such that stale cache files are ignored
+TAG_CACHE_VERSION= 2
+
+def tag_cache_path(data, cache_dir):
+    """Path of the compiled tags cache file of a tags file.
+    The file name is derived from the tags file content, the cache format
+    version and the Python version (marshal format).
+    parameters:
+    ----------
+    data: bytes
+        Content of the tags file.
+    cache_dir: str
+        Cache directory.
+    returns:
+    -------
+    str
+    """
+    digest= hashlib.sha256(data)
+    digest.update("{}:{}.{}".format(TAG_CACHE_VERSION, 
+        *sys.version_info[:2]).encode())
+    return os.path.join(cache_dir, "tags-{}.marshal".format(
+        digest.hexdigest()[:32]))
+
+def dump_tags_cache(path, tags, tag_index):
+    """Write compiled tags to a cache file. The file is replaced 
+    atomically.
+    parameters:
+    ----------
+    path: str
+        Cache file path, see tag_cache_path.
+    tags: dict
+        Tag columns, as returned by read_tags_file.
+    tag_index: mapping
+        Compiled tag index, as returned by build_tag_index.
+    """
+    rows= [(tag.name, tag.type, tag.data_type, tag.address, tag.unit, 
+        1, tag.read_type, tag.unit_reader, tag.write_type, 
+        tag.datatype.spec() if tag.datatype is not None else None)
+        for tag in tag_index.values()]
+    data= marshal.dumps({"version": TAG_CACHE_VERSION, "tags": tags, 
+        "rows": rows})
+    cache_dir= os.path.dirname(path) or "."
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path= tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as cache_file:
+            cache_file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def load_tags_cache(path):
+    """Read compiled tags from a cache file.
+    parameters:
+    ----------
+    path: str
+        Cache file path, see tag_cache_path.
+    returns:
+    -------
+    (tags, tag_index) tuple as with read_tags_file and build_tag_index, 
+    or None if the cache file is missing, corrupt or of another version
+    """
+    try:
+        # Read at once, marshal.load on a buffered file is much slower
+        with open(path, "rb") as cache_file:
+            cache= marshal.loads(cache_file.read())
+        if cache["version"] != TAG_CACHE_VERSION:
+            return None
+        # Data types are shared between tags
+        specs= {}
+        for row in cache["rows"]:
+            if row[9] is not None and row[9] not in specs:
+                specs[row[9]]= datatypes.as_data_type(row[9])
+        tag_index= MappingProxyType({row[0]: Tag(*row[:9], specs.get(row[9]))
+            for row in cache["rows"]})
+        return cache["tags"], tag_index
+    except (OSError, EOFError, ValueError, TypeError, KeyError, IndexError):
+        return None
+
+def load_compiled_tags(filepath, cache_dir):
+    """Load a FactoryIO tags file through the compiled tags cache.
+    The tags file is only parsed and compiled if its content has no
+    valid cache file in cache_dir yet.
+    parameters:
+    ----------
+    filepath: str
+        Path to FactoryIO tags file
+    cache_dir: str
+        Cache directory, created if needed.
+    returns:
+    -------
+    (tags, tag_index) tuple as with read_tags_file and build_tag_index
+    """
+    with open(filepath, "rb") as tags_file:
+        path= tag_cache_path(tags_file.read(), cache_dir)
+    cached= load_tags_cache(path)
+    if cached is not None:
+        return cached
+
+    tags= read_tags_file(filepath)
+    tag_index= build_tag_index(tags)
+    try:
+        dump_tags_cache(path, tags, tag_index)
+    except OSError as error:
+        logging.warning("Unable to write tags cache {}: {}".format(path, 
+            error))
+    return tags, tag_index
+
+# Maximum number of bits/registers per read request (Modbus spec)
+READ_LIMITS= {
+    "read_coils": 2000,
+    "read_discrete_inputs": 2000,
+    "read_holding_registers": 125,
+    "read_input_registers": 125
+}
+
+# Response attribute holding the read values
+READ_PAYLOADS= {
+    "read_coils": attrgetter("bits"),
+    "read_discrete_inputs": attrgetter("bits"),
+    "read_holding_registers": attrgetter("registers"),
+    "read_input_registers": attrgetter("registers")
+}
+
+class ReadBlock(object):
+    """Single read request covering a contiguous address range.
+    attributes:
+    ----------
+    read_type: str
+        Name of the pymodbus read method.
+    unit: int
+        Modbus unit (slave) id.
+    address: int
+        First address of the range.
+    count: int
+        Number of bits/registers in the range.
+    tags: list of Tag
+        Tags served by the request, ordered by address.
+    reader: operator.attrgetter
+        reader(client) returns the client's bound read method.
+    payload: operator.attrgetter
+        payload(response) returns the list of read bits/registers.
+    codec: datatypes.BlockCodec or None
+        Decoder of the tag values of register blocks holding typed tags, 
+        None if values are the read bits/registers themselves.
+    """
+    __slots__= ("read_type", "unit", "address", "count", "tags", "reader",
+        "payload", "codec")
+
+    def __init__(self, tag):
+        self.read_type= tag.read_type
+        self.unit= tag.unit
+        self.address= tag.address
+        self.count= tag.length
+        self.tags= [tag]
+        self.reader= tag.reader
+        self.payload= READ_PAYLOADS[tag.read_type]
+        self.codec= None
+
+    def compile(self):
+        """Build the codec of a block holding typed tags."""
+        if any(tag.datatype is not None for tag in self.tags):
+            self.codec= datatypes.BlockCodec(self.count, [(tag.name, 
+                tag.address - self.address, tag.datatype or datatypes.UINT16) 
+                for tag in self.tags])
+        else:
+            self.codec= None
+
+    def __repr__(self):
+        return "ReadBlock({}, address={}, count={}, tags={})".format(
+            self.read_type, self.address, self.count, len(self.tags))
+
+def plan_reads(tags, max_gap=0):
+    """Coalesce tags into as few read requests as possible.
+    Tags are grouped by read type (i.e. function code) and unit, sorted by
+    address and merged into blocks as long as the hole between two
+    consecutive tags is at most max_gap addresses and the block stays 
+    within the protocol limit of the read type (READ_LIMITS).
+    parameters:
+    ----------
+    tags: iterable of Tag
+        Tags to read. Duplicates are only read once.
+    max_gap: int
+        Maximum number of unused addresses read to merge two tags into
+        one request.
+    returns:
+    -------
+    list of ReadBlock
+    """
+    # Group by function code and unit
+    groups= {}
+    for tag in tags:
+        if tag.read_type is None:
+            raise ValueError("Tag type error")
+        groups.setdefault((tag.read_type, tag.unit), {})[tag.name]= tag
+
+    blocks= []
+    for (read_type, unit), group in groups.items():
+        limit= READ_LIMITS[read_type]
+        block= None
+        for tag in sorted(group.values(), key=attrgetter("address")):
+            if block is not None:
+                end= block.address + block.count
+                new_count= max(end, tag.address + tag.length) - block.address
+                # Extend current block
+                if tag.address - end <= max_gap and new_count <= limit:
+                    block.count= new_count
+                    block.tags.append(tag)
+                    continue
+            # Start new block
+            block= ReadBlock(tag)
+            blocks.append(block)
+
+    for block in blocks:
+        block.compile()
+    return blocks
+
+def block_values(block, payload):
+    """Tag values of a read block.
+    parameters:
+    ----------
+    block: ReadBlock
+        Block read
+    payload: list
+        Bits/registers read, as returned by block.payload(response)
+    returns:
+    -------
+    dict mapping tag names to values
+    """
+    if block.codec is not None:
+        return block.codec.decode_dict(payload)
+    start= block.address
+    return {tag.name: payload[tag.address - start] for tag in block.tags}
+
+# Python type expected for the values written by each write type
+WRITE_VALUE_TYPES= {
+    "write_coil": bool,
+    "write_register": int
+}
+
+def check_write_value(tag, value):
+    """Check that a value matches the data type of an output tag.
+    parameters:
+    ----------
+    tag: Tag
+        Tag to write
+    value: bool, int or float
+        Value to write
+    raises:
+    ------
+    ValueError if the tag can't be written or the value type doesn't match
+    """
+    if tag.write_type is None:
+        raise ValueError("Tag type error")
+    if tag.datatype is not None:
+        check_typed_value(tag, value)
+        return
+    expected= WRITE_VALUE_TYPES[tag.write_type]
+    if not type(value) == expected:
+        raise ValueError(
+                "The supplied value doesn't not match the data type.\n" \
+                + "'{}' required but '{}' supplied.".format(
+                    expected.__name__, type(value))
+            )
+
+def check_typed_value(tag, value):
+    """Check that a value matches the data type of a typed register tag.
+    parameters:
+    ----------
+    tag: Tag
+        Tag with a datatype
+    value: int or float
+        Value to check
+    raises:
+    ------
+    ValueError if the value type doesn't match or the value is out of the
+    range of the data type
+    """
+    expected= tag.datatype.value_types
+    if type(value) not in expected:
+        raise ValueError(
+                "The supplied value doesn't not match the data type.\n" \
+                + "'{}' required but '{}' supplied.".format(
+                    "' or '".join(t.__name__ for t in expected), type(value))
+            )
+    # Range check
+    try:
+        tag.datatype.encode(value)
+    except ValueError as error:
+        raise ValueError("{}: {}".format(tag.name, error)) from None
+
+def encode_value(tag, value):
+    """Value argument of the write request of a tag.
+    parameters:
+    ----------
+    tag: Tag
+        Tag to write
+    value: bool, int or float
+        Value to write
+    returns:
+    -------
+    value itself, or the registers encoding it for typed tags (a single
+    register for 1-register data types)
+    """
+    if tag.datatype is None:
+        return value
+    registers= tag.datatype.encode(value)
+    return registers[0] if len(registers) == 1 else registers
+
+# Multi-write type and maximum number of values per request (Modbus spec)
+#   for each single write type
+WRITE_MULTIPLE= {
+    "write_coil": ("write_coils", 1968),
+    "write_register": ("write_registers", 123)
+}
+
+class WriteBlock(object):
+    """Single write request covering a contiguous address range.
+    attributes:
+    ----------
+    write_type: str
+        Name of the pymodbus write method, a multi-write method 
+        (write_coils/write_registers) if the block holds several tags.
+    unit: int
+        Modbus unit (slave) id.
+    address: int
+        First address of the range.
+    tags: list of Tag
+        Tags written, ordered by address.
+    values: list
+        Values written, one per tag.
+    count: int
+        Number of coils/registers written.
+    """
+    __slots__= ("write_type", "unit", "address", "tags", "values", "count")
+
+    def __init__(self, tag, value):
+        self.write_type= tag.write_type
+        self.unit= tag.unit
+        self.address= tag.address
+        self.tags= [tag]
+        self.values= [value]
+        self.count= tag.length
+        # Tags spanning several registers need a multi-write
+        if tag.length > 1:
+            self.write_type= WRITE_MULTIPLE[tag.write_type][0]
+
+    def payload(self):
+        """Value argument of the write request.
+        returns:
+        -------
+        Single value for single writes, list of values for multi-writes
+        """
+        if len(self.values) == 1:
+            return encode_value(self.tags[0], self.values[0])
+        if not any(tag.datatype is not None for tag in self.tags):
+            return self.values
+        registers= []
+        for tag, value in zip(self.tags, self.values):
+            if tag.datatype is None:
+                registers.append(value)
+            else:
+                registers+= tag.datatype.encode(value)
+        return registers
+
+    def __repr__(self):
+        return "WriteBlock({}, address={}, count={})".format(
+            self.write_type, self.address, len(self.values))
+
+def plan_writes(items):
+    """Pack tag values into as few write requests as possible.
+    Tags are grouped by write type and unit, sorted by address and 
+    strictly contiguous addresses are packed into multi-writes 
+    (function codes 15/16) within the protocol limits. Isolated tags are
+    written with single writes (function codes 5/6).
+    parameters:
+    ----------
+    items: iterable of (Tag, value) tuples
+        Tags and values to write.
+    returns:
+    -------
+    list of WriteBlock
+    """
+    # Group by write type and unit
+    groups= {}
+    for tag, value in items:
+        if tag.write_type is None:
+            raise ValueError("Tag type error")
+        groups.setdefault((tag.write_type, tag.unit), []).append((tag, value))
+
+    blocks= []
+    for (write_type, unit), group in groups.items():
+        multi_type, limit= WRITE_MULTIPLE[write_type]
+        block= None
+        for tag, value in sorted(group, key=lambda item: item[0].address):
+            if block is not None \
+                and tag.address == block.address + block.count \
+                and block.count + tag.length <= limit:
+                # Extend current block
+                block.write_type= multi_type
+                block.tags.append(tag)
+                block.values.append(value)
+                block.count+= tag.length
+                continue
+            # Start new block
+            block= WriteBlock(tag, value)
+            blocks.append(block)
+
+    return blocks
@@ -0,0 +1,392 @@
+# Imports
+import os, importlib.util, sys, asyncio, struct
+from pymodbus.bit_read_message import ReadCoilsRequest, \
+    ReadDiscreteInputsRequest
+from pymodbus.bit_write_message import WriteSingleCoilRequest, \
+    WriteMultipleCoilsRequest
+from pymodbus.register_read_message import ReadHoldingRegistersRequest, \
+    ReadInputRegistersRequest
+from pymodbus.register_write_message import WriteSingleRegisterRequest, \
+    WriteMultipleRegistersRequest
+from pymodbus.exceptions import ConnectionException, ModbusException, \
+    ModbusIOException
+from pymodbus.factory import ClientDecoder
+from pymodbus.framer.socket_framer import ModbusSocketFramer
+
+# Self-defined imports
+# Long-styled import method is used to preserve import structure
+#   regardless of execution/import method
+# modbusclient
+work_dir= os.path.dirname(os.path.realpath(__file__))
+module_name= "modbusclient"
+file_path= work_dir + "/modbusclient.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+modbusclient = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = modbusclient
+spec.loader.exec_module(modbusclient)
+FMC_functions= modbusclient.FMC_functions
+
+# MBAP header: transaction id, protocol id, length, unit id
+MBAP_HEADER= struct.Struct(">HHHB")
+
+
+class AsyncFactoryIOModbusClient(modbusclient.FactoryIOTagsMixin):
+    """asyncio Modbus TCP client using FactoryIO tag names.
+    Requests are pipelined: any number of transactions can be outstanding
+    on the single TCP connection, responses are matched to requests by
+    their Modbus transaction id. Tags file loading and fault injection
+    behave as in FactoryIOModbusClient.
+
+    Usage:
+    -----
+    async with AsyncFactoryIOModbusClient(host, filepath=path) as client:
+        values= await client.read_tags(["S_AL1_B", "AL1_X_POS"])
+        await client.write_tag("P_AL1_B", True)
+    """
+
+    def __init__(self, host="127.0.0.1", port=502, *, filepath,
+        tag_table=None, cache_dir=None, data_types=None, timeout=3):
+        """Constructor
+        parameters:
+        ----------
+        host: str
+            Host address of the Modbus TCP server.
+        port: int
+            Host TCP port.
+        filepath: str
+            Path to FactoryIO tags file.
+        tag_table: tuple
+            tag_table of another client loaded from the same tags file,
+            shared instead of loading filepath again.
+        cache_dir: str
+            Directory caching compiled tags files, keyed by file content.
+            Later constructions with an unchanged tags file skip parsing.
+        data_types: dict
+            Data types of register tags, by tag name or FactoryIO data type
+            (e.g. {"Real": "float32"}), see FMC_functions.apply_data_types.
+        timeout: float
+            Seconds to wait for the response to a request.
+        """
+        # Load tags and initialize fault tags
+        self._init_tags(filepath, tag_table, cache_dir, data_types)
+        self.host= host
+        self.port= port
+        self.timeout= timeout
+        self.decoder= ClientDecoder()
+        self.framer= ModbusSocketFramer(self.decoder)
+        # Connection
+        self._reader= None
+        self._writer= None
+        self._receiver= None
+        # Outstanding transactions: transaction id -> future
+        self._pending= {}
+        self._last_tid= 0
+
+    # ===================================================================
+    # Connection
+    async def connect(self):
+        """Connect to the Modbus TCP server.
+        returns:
+        -------
+        True on success and False otherwise
+        """
+        if self.is_socket_open():
+            return True
+        try:
+            self._reader, self._writer= await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        self._receiver= asyncio.ensure_future(self._receive())
+        self._receiver.add_done_callback(self._receiver_done)
+        return True
+
+    def is_socket_open(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def close(self):
+        """Close the connection. Outstanding requests fail with
+        ConnectionException.
+        """
+        if self._receiver is not None:
+            self._receiver.cancel()
+            try:
+                await self._receiver
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                # Already raised by the outstanding requests
+                pass
+            self._receiver= None
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+            self._reader= None
+            self._writer= None
+
+    async def __aenter__(self):
+        if not await self.connect():
+            raise ConnectionException(
+                "Failed to connect to {}:{}".format(self.host, self.port))
+        return self
+
+    async def __aexit__(self, klass, value, traceback):
+        await self.close()
+
+    # ===================================================================
+    # Transactions
+    def _new_tid(self):
+        """Next free transaction id (1..65535)."""
+        tid= self._last_tid
+        while True:
+            tid= tid % 0xFFFF + 1
+            if tid not in self._pending:
+                self._last_tid= tid
+                return tid
+
+    async def execute(self, request):
+        """Send a request and wait for its response. Several requests can
+        be executed concurrently.
+        parameters:
+        ----------
+        request: pymodbus.pdu.ModbusRequest
+            Request to send
+        returns:
+        -------
+        pymodbus.pdu.ModbusResponse
+        """
+        if not self.is_socket_open():
+            raise ConnectionException(
+                "Client is not connected to {}:{}".format(self.host, self.port))
+        tid= self._new_tid()
+        request.transaction_id= tid
+        future= asyncio.get_running_loop().create_future()
+        self._pending[tid]= future
+        try:
+            try:
+                self._writer.write(self.framer.buildPacket(request))
+                await self._writer.drain()
+            except OSError as exc:
+                # e.g. connection reset
+                raise ConnectionException(str(exc)) from exc
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise ModbusIOException(
+                "No response to transaction {} within {} seconds".format(
+                    tid, self.timeout)) from None
+        finally:
+            self._pending.pop(tid, None)
+
+    async def _receive(self):
+        """Read response frames and resolve the matching transactions."""
+        try:
+            while True:
+                header= await self._reader.readexactly(MBAP_HEADER.size)
+                tid, _, length, unit= MBAP_HEADER.unpack(header)
+                # Length covers the unit id and at least a function code
+                if length < 2:
+                    raise ConnectionException(
+                        "Invalid MBAP length {} of transaction {}".format(
+                            length, tid))
+                pdu= await self._reader.readexactly(length - 1)
+                future= self._pending.get(tid)
+                # Late response to a timed out request
+                if future is None or future.done():
+                    continue
+                response= self.decoder.decode(pdu)
+                if response is None:
+                    future.set_exception(ModbusIOException(
+                        "Unable to decode response to transaction {}".format(
+                            tid)))
+                    continue
+                response.transaction_id= tid
+                response.unit_id= unit
+                future.set_result(response)
+        except (asyncio.IncompleteReadError, OSError) as exc:
+            raise ConnectionException(str(exc)) from exc
+
+    def _receiver_done(self, task):
+        """Fail the outstanding requests with the exception ending the
+        receiver task, and drop the connection such that new requests fail
+        at once instead of waiting for a response.
+        """
+        if task.cancelled():
+            error= ConnectionException("Connection closed")
+        else:
+            # Retrieved here, such that it is never left unretrieved
+            error= task.exception()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        if not task.cancelled() and self._writer is not None:
+            self._writer.close()
+
+    # ===================================================================
+    # Modbus requests
+    async def read_coils(self, address, count=1, **kwargs):
+        return await self.execute(ReadCoilsRequest(address, count, **kwargs))
+
+    async def read_discrete_inputs(self, address, count=1, **kwargs):
+        return await self.execute(
+            ReadDiscreteInputsRequest(address, count, **kwargs))
+
+    async def read_holding_registers(self, address, count=1, **kwargs):
+        return await self.execute(
+            ReadHoldingRegistersRequest(address, count, **kwargs))
+
+    async def read_input_registers(self, address, count=1, **kwargs):
+        return await self.execute(
+            ReadInputRegistersRequest(address, count, **kwargs))
+
+    async def write_coil(self, address, value, **kwargs):
+        return await self.execute(
+            WriteSingleCoilRequest(address, value, **kwargs))
+
+    async def write_coils(self, address, values, **kwargs):
+        return await self.execute(
+            WriteMultipleCoilsRequest(address, values, **kwargs))
+
+    async def write_register(self, address, value, **kwargs):
+        return await self.execute(
+            WriteSingleRegisterRequest(address, value, **kwargs))
+
+    async def write_registers(self, address, values, **kwargs):
+        return await self.execute(
+            WriteMultipleRegistersRequest(address, values, **kwargs))
+
+    # ===================================================================
+    # Tags
+    async def read_tag(self, tag):
+        """Read tag
+        parameters:
+        ----------
+        tag: str
+            Tag to read
+        returns:
+        -------
+        bool or int
+        """
+        # Tag
+        tag= self.get_tag(tag)
+        if tag.read_type is None:
+            raise ValueError("Tag type error")
+
+        # Perform read
+        read_step= await tag.reader(self)(tag.address, tag.length,
+            unit=tag.unit)
+        # Check if fault is injected in tag
+        read_faults= self.fault_tags["read"]
+        if tag.name in read_faults:
+            # Fault present
+            return read_faults[tag.name]
+        else:
+            # No fault
+            return tag.decoder(read_step)
+
+    async def read_tags(self, tags, max_gap=8):
+        """Read several tags using as few requests as possible.
+        The coalesced requests are pipelined.
+        parameters:
+        ----------
+        tags: iterable of str
+            Tags to read
+        max_gap: int
+            Maximum number of unused addresses read in order to merge
+            two tags into one request.
+        returns:
+        -------
+        dict mapping tag names to bool or int values
+        """
+        # Tags
+        tags= [self.get_tag(tag) for tag in tags]
+        # Perform reads
+        blocks= FMC_functions.plan_reads(tags, max_gap)
+        payloads= await asyncio.gather(
+            *[self.read_block(block) for block in blocks])
+        values= {}
+        for block, payload in zip(blocks, payloads):
+            values.update(FMC_functions.block_values(block, payload))
+        # Override values of tags with injected faults
+        return self._apply_read_faults(tags, values)
+
+    async def read_block(self, block):
+        """Perform a coalesced read request.
+        Read faults are not applied.
+        parameters:
+        ----------
+        block: FMC_functions.ReadBlock
+            Read request to perform, see FMC_functions.plan_reads
+        returns:
+        -------
+        list of bits or registers read, starting at block.address
+        """
+        response= await block.reader(self)(block.address, block.count,
+            unit=block.unit)
+        if response.isError():
+            raise ModbusIOException(
+                "{} failed at address {}: {}".format(
+                    block.read_type, block.address, response))
+        return block.payload(response)
+
+    async def write_tag(self, tag, value):
+        """Write tag
+        parameters:
+        ----------
+        tag: str
+            Tag to write
+        value: bool or int
+            Value to write
+        returns:
+        -------
+        pymodbus.bit_write_message.WriteSingleCoilResponse
+        or
+        pymodbus.register_write_message.WriteSingleRegisterResponse
+        """
+        # Tag
+        tag= self.get_tag(tag)
+        # Check if value matches type of Output to write
+        FMC_functions.check_write_value(tag, value)
+        # Check if fault has been injected in specified tag
+        write_faults= self.fault_tags["write"]
+        if tag.name in write_faults:
+            # If so, write the faulty value
+            value= write_faults[tag.name]
+
+        # Perform write
+        return await tag.writer(self)(tag.address, 
+            FMC_functions.encode_value(tag, value), unit=tag.unit)
+
+    async def write_tags(self, values):
+        """Write several tags using as few requests as possible.
+        The multi-write/single write requests are pipelined.
+        parameters:
+        ----------
+        values: dict
+            Mapping of tags to values to write
+        returns:
+        -------
+        dict mapping tag names to True on success and False otherwise
+        """
+        # Validate tags and values before writing anything
+        items= self._collect_writes(values)
+        # Perform writes
+        blocks= FMC_functions.plan_writes(items)
+        responses= await asyncio.gather(
+            *[getattr(self, block.write_type)(block.address, block.payload(),
+                unit=block.unit) for block in blocks],
+            return_exceptions=True)
+        status= {}
+        for block, response in zip(blocks, responses):
+            if isinstance(response, ModbusException):
+                isSuccess= False
+            elif isinstance(response, BaseException):
+                raise response
+            else:
+                isSuccess= not response.isError()
+            for tag in block.tags:
+                status[tag.name]= isSuccess
+
+        return status
@@ -0,0 +1,361 @@
+# Imports
+import bisect, json, time
+
+
+# Fault modes
+# stuck: the tag is forced to value
+# flip: the value read is inverted, on every scan of the window (Bool
+#   read faults)
+# ramp: the tag is forced from value to end_value, linearly over the
+#   fault window
+FAULT_MODES= ("stuck", "flip", "ramp")
+
+# Tolerance of window boundaries, in seconds, absorbing the rounding of
+#   clocks accumulating periods (e.g. 10 * 0.1 < 1.0)
+TIME_EPSILON= 1e-9
+
+# Keys of a fault specification
+FAULT_KEYS= ("tag", "kind", "mode", "value", "end_value", "at", "duration",
+    "at_scan", "scans", "every")
+
+
+def read_schedule(filepath):
+    """Read a fault schedule file.
+    The file holds a JSON list of fault specifications, or an object with
+    a "faults" list, e.g.
+    [
+        {"tag": "AL1_ST_X_SET", "mode": "stuck", "value": 700, "at": 5,
+            "duration": 3},
+        {"tag": "ST_AL1_ST1", "mode": "flip", "every": 5}
+    ]
+    parameters:
+    ----------
+    filepath: str
+        Path to the schedule file.
+    returns:
+    -------
+    list of dict, see Fault
+    """
+    with open(filepath) as schedule_file:
+        schedule= json.load(schedule_file)
+    if isinstance(schedule, dict):
+        schedule= schedule.get("faults", [])
+    return schedule
+
+
+class Fault(object):
+    """Compiled fault of a campaign.
+    A fault is applied during its window, either a time window (at,
+    duration) in seconds since the campaign start or a scan window
+    (at_scan, scans) in scans, not a mix of both. Without window, the
+    fault applies for the whole campaign. With every, the fault is only
+    active on every every-th scan of its window (intermittent fault).
+    At the end of its window, the fault the tag had before (e.g. injected
+    by hand) is restored.
+    attributes:
+    ----------
+    tag: str
+        Tag name.
+    kind: str
+        "read" (sensor) or "write" (actuator) fault. Defaults to "write"
+        for Output tags and to "read" otherwise.
+    mode: str
+        See FAULT_MODES.
+    value: bool, int or float
+        Injected value (stuck), or start value (ramp).
+    end_value: int or float
+        End value (ramp).
+    at, duration: float
+        Time window. duration None for an open window.
+    at_scan, scans: int
+        Scan window. scans None for an open window.
+    every: int
+        Scan interval of intermittent faults, 1 otherwise.
+    """
+    __slots__= ("tag", "kind", "mode", "value", "end_value", "at",
+        "duration", "at_scan", "scans", "every", "start_scan", "active",
+        "injected", "previous", "record")
+
+    def __init__(self, spec, client):
+        """Constructor
+        parameters:
+        ----------
+        spec: dict
+            Fault specification, see FAULT_KEYS.
+        client: FactoryIOModbusClient
+            Client the fault is injected in, used to check the tag and
+            the values against the tag's data type.
+        raises:
+        ------
+        ValueError if the specification is invalid
+        """
+        unknown= set(spec) - set(FAULT_KEYS)
+        if unknown:
+            raise ValueError("Unknown fault keys: {}".format(sorted(unknown)))
+        if "tag" not in spec:
+            raise ValueError("Fault without tag: {}".format(spec))
+        tag= client.get_tag(spec["tag"])
+        self.tag= tag.name
+        self.kind= spec.get("kind",
+            "write" if tag.type == "Output" else "read")
+        self.mode= spec.get("mode", "stuck")
+        self.value= spec.get("value")
+        self.end_value= spec.get("end_value")
+        self.at= spec.get("at")
+        self.duration= spec.get("duration")
+        self.at_scan= spec.get("at_scan")
+        self.scans= spec.get("scans")
+        self.every= spec.get("every", 1)
+        # Checks
+        if self.kind not in ("read", "write"):
+            raise ValueError("Invalid fault kind: {}".format(self.kind))
+        if self.mode not in FAULT_MODES:
+            raise ValueError("Invalid fault mode: {}. Expected one of {}"
+                .format(self.mode, FAULT_MODES))
+        if (self.at is not None or self.duration is not None) \
+            and (self.at_scan is not None or self.scans is not None):
+            raise ValueError("A fault has a time or a scan window, not both")
+        if not isinstance(self.every, int) or self.every < 1:
+            raise ValueError("every must be a positive integer")
+        if self.mode == "flip":
+            if self.kind != "read" or tag.read_type not in ("read_coils",
+                "read_discrete_inputs"):
+                raise ValueError("Only Bool read faults can flip")
+        elif self.value is None:
+            raise ValueError("Fault without value: {}".format(spec))
+        if self.mode == "ramp":
+            if self.end_value is None:
+                raise ValueError("Ramp fault without end_value")
+            if self.duration is None and self.scans is None:
+                raise ValueError("Ramp fault without window length")
+            if type(self.value) == bool or type(self.end_value) == bool:
+                raise ValueError("Bool faults can't ramp")
+        # Values injected, checked as by read_fault/write_fault
+        if self.mode != "flip":
+            client.check_fault_value(tag.name, self.kind, self.value)
+        if self.mode == "ramp":
+            client.check_fault_value(tag.name, self.kind, self.end_value)
+        # State
+        self.start_scan= None
+        self.active= False
+        self.injected= None
+        # Fault of the tag before activation, restored at the end
+        self.previous= None
+        self.record= None
+
+    def fraction(self, t, scan):
+        """Position in the window, from 0 to 1."""
+        if self.duration is not None:
+            return min(1.0, (t - (self.at or 0.0)) / self.duration) \
+                if self.duration > 0 else 1.0
+        return min(1.0, (scan - self.start_scan) / self.scans) \
+            if self.scans > 0 else 1.0
+
+    def ended(self, t, scan):
+        """True once the window of the fault is over."""
+        if self.duration is not None:
+            return t + TIME_EPSILON >= (self.at or 0.0) + self.duration
+        if self.scans is not None:
+            return scan >= self.start_scan + self.scans
+        return False
+
+    def __repr__(self):
+        return "Fault({!r}, kind={!r}, mode={!r})".format(self.tag, self.kind,
+            self.mode)
+
+
+class FaultCampaign(object):
+    """Fault injection campaign driven by the scan cycle.
+    step() is called once per scan, before the controller cycle, and
+    applies and clears the faults of the schedule through the client fault
+    table. No thread is involved: pending faults are kept sorted by start,
+    such that a step only looks at the faults whose window is open.
+    Activation and clearing of each fault is recorded with campaign time
+    and scan number.
+    attributes:
+    ----------
+    records: list of dict
+        One record per activation, with "tag", "kind", "mode", "value"
+        (first value injected), "start" and "end" (seconds since the
+        campaign start), "start_scan" and "end_scan" (first scan without
+        the fault). end and end_scan are None while the fault is active.
+
+    Usage:
+    -----
+    campaign= FaultCampaign(client, read_schedule("faults.json"))
+    scheduler= ScanScheduler(campaign.wrap(cycle), 0.1)
+    scheduler.run(cycles=300)
+    campaign.finish()
+    print(campaign.records)
+    """
+
+    def __init__(self, client, schedule, clock=time.monotonic):
+        """Constructor
+        parameters:
+        ----------
+        client: FactoryIOModbusClient
+            Client the faults are injected in.
+        schedule: iterable of dict
+            Fault specifications, see Fault and read_schedule.
+        clock: callable
+            Monotonic clock returning seconds, e.g. the clock of the scan
+            scheduler.
+        """
+        self.client= client
+        self.clock= clock
+        self.faults= [Fault(spec, client) for spec in schedule]
+        # Pending faults, sorted by start time / start scan
+        timed= sorted((fault for fault in self.faults
+            if fault.at_scan is None), key=lambda fault: fault.at or 0.0)
+        self._timed= timed
+        self._timed_starts= [fault.at or 0.0 for fault in timed]
+        scanned= sorted((fault for fault in self.faults
+            if fault.at_scan is not None), key=lambda fault: fault.at_scan)
+        self._scanned= scanned
+        self._scanned_starts= [fault.at_scan for fault in scanned]
+        self._next_timed= 0
+        self._next_scanned= 0
+        # Faults whose window is open
+        self._open= []
+        # Campaign state
+        self.t0= None
+        self.scan= 0
+        self.t= 0.0
+        # Activation records
+        self.records= []
+
+    def start(self, t0=None):
+        """Start the campaign clock.
+        parameters:
+        ----------
+        t0: float
+            Clock time of the campaign start. Defaults to now.
+        """
+        self.t0= self.clock() if t0 is None else t0
+
+    def step(self):
+        """Apply and clear faults for the next scan.
+        returns:
+        -------
+        int, number of faults active during the scan
+        """
+        if self.t0 is None:
+            self.start()
+        t= self.t= self.clock() - self.t0
+        scan= self.scan
+        # Open the windows of faults due
+        end= bisect.bisect_right(self._timed_starts, t + TIME_EPSILON,
+            self._next_timed)
+        if end > self._next_timed:
+            self._open_faults(self._timed[self._next_timed:end], scan)
+            self._next_timed= end
+        end= bisect.bisect_right(self._scanned_starts, scan, self._next_scanned)
+        if end > self._next_scanned:
+            self._open_faults(self._scanned[self._next_scanned:end], scan)
+            self._next_scanned= end
+        # Update open faults
+        active= 0
+        closed= False
+        for fault in self._open:
+            if fault.ended(t, scan):
+                self._deactivate(fault, t, scan)
+                fault.start_scan= None
+                closed= True
+            elif (scan - fault.start_scan) % fault.every == 0:
+                self._activate(fault, t, scan)
+                active+= 1
+            else:
+                self._deactivate(fault, t, scan)
+        if closed:
+            self._open= [fault for fault in self._open
+                if fault.start_scan is not None]
+        self.scan= scan + 1
+        return active
+
+    def _open_faults(self, faults, scan):
+        for fault in faults:
+            fault.start_scan= scan
+            self._open.append(fault)
+
+    def _activate(self, fault, t, scan):
+        """Inject the value of a fault for the scan."""
+        if not fault.active:
+            fault.previous= self.client.fault_tags[fault.kind].get(fault.tag)
+        if fault.mode == "ramp":
+            value= fault.value + (fault.end_value - fault.value) \
+                * fault.fraction(t, scan)
+            if isinstance(fault.value, int) and isinstance(fault.end_value,
+                int):
+                value= int(round(value))
+        elif fault.mode == "flip":
+            # Live value, without the flip of the previous scan
+            if fault.active:
+                self._restore(fault)
+            value= not self.client.read_tag(fault.tag)
+        else:
+            value= fault.value
+        if fault.active and value == fault.injected and fault.mode != "flip":
+            return
+        if fault.kind == "read":
+            self.client.read_fault(fault.tag, value)
+        else:
+            self.client.write_fault(fault.tag, value)
+        fault.injected= value
+        if not fault.active:
+            fault.active= True
+            fault.record= {"tag": fault.tag, "kind": fault.kind,
+                "mode": fault.mode, "value": value, "start": t,
+                "start_scan": scan, "end": None, "end_scan": None}
+            self.records.append(fault.record)
+
+    def _deactivate(self, fault, t, scan):
+        """Clear a fault, recording the end of its activation."""
+        if not fault.active:
+            return
+        # Unless another fault was injected in the tag meanwhile
+        if self.client.fault_tags[fault.kind].get(fault.tag) == fault.injected:
+            self._restore(fault)
+        fault.active= False
+        fault.injected= None
+        fault.record["end"]= t
+        fault.record["end_scan"]= scan
+        fault.record= None
+
+    def _restore(self, fault):
+        """Put back the fault the tag had before the fault activated."""
+        if fault.previous is None:
+            self.client.clear_fault(fault.tag, fault.kind)
+        elif fault.kind == "read":
+            self.client.read_fault(fault.tag, fault.previous)
+        else:
+            self.client.write_fault(fault.tag, fault.previous)
+
+    def finish(self):
+        """Clear the active faults and end the campaign.
+        returns:
+        -------
+        list of activation records, see records
+        """
+        t= self.clock() - self.t0 if self.t0 is not None else 0.0
+        for fault in self._open:
+            self._deactivate(fault, t, self.scan)
+            fault.start_scan= None
+        self._open= []
+        return self.records
+
+    def wrap(self, cycle):
+        """Cycle function stepping the campaign before each cycle, e.g. for
+        a ScanScheduler.
+        parameters:
+        ----------
+        cycle: callable
+            Controller cycle, called without arguments.
+        returns:
+        -------
+        callable
+        """
+        step= self.step
+        def campaign_cycle():
+            step()
+            cycle()
+        return campaign_cycle
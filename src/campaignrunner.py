@@ -0,0 +1,240 @@
+# Imports
+import os, importlib.util, sys, time, statistics, traceback
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+# Self-defined imports
+# Long-styled import method is used to preserve import structure
+#   regardless of execution/import method
+work_dir= os.path.dirname(os.path.realpath(__file__))
+# modbusclient
+module_name= "modbusclient"
+file_path= work_dir + "/modbusclient.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+modbusclient = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = modbusclient
+spec.loader.exec_module(modbusclient)
+# simulator
+module_name= "simulator"
+file_path= work_dir + "/simulator.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+simulator = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = simulator
+spec.loader.exec_module(simulator)
+# scanscheduler
+module_name= "scanscheduler"
+file_path= work_dir + "/scanscheduler.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+scanscheduler = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = scanscheduler
+spec.loader.exec_module(scanscheduler)
+# campaign
+module_name= "campaign"
+file_path= work_dir + "/campaign.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+campaign = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = campaign
+spec.loader.exec_module(campaign)
+
+
+def run_scenario(controller, filepath, scenario, config):
+    """Run a controller against a fault scenario on a local simulator.
+    Executed in the worker processes of CampaignRunner.
+    parameters:
+    ----------
+    controller: callable
+        controller(client) returning the cycle function of a fresh
+        controller instance.
+    filepath: str
+        Path to FactoryIO tags file.
+    scenario: dict
+        {"name": str, "faults": list of fault specifications}, see
+        campaign.Fault.
+    config: dict
+        Options of CampaignRunner (cycles, period, realtime, setup, check,
+        data_types).
+    returns:
+    -------
+    dict, see CampaignRunner.run
+    """
+    result= {"name": scenario.get("name"), "passed": False, "error": None,
+        "cycles": 0, "wall_time": 0.0, "cycle_time_us": None,
+        "requests": 0, "faults": []}
+    start= time.perf_counter()
+    period= config["period"]
+    if config["realtime"]:
+        clock, sleep, tick= time.monotonic, time.sleep, period
+    else:
+        virtual= scanscheduler.VirtualClock()
+        clock, sleep, tick= virtual.clock, virtual.sleep, None
+    plant= simulator.FactoryIOSimulator(filepath=filepath,
+        data_types=config["data_types"], tick=tick)
+    try:
+        if config["setup"] is not None:
+            config["setup"](plant)
+        host, port= plant.start()
+        with modbusclient.FactoryIOModbusClient(host, port,
+            tag_table=plant.tag_table, filepath=filepath) as client:
+            if not client.connect():
+                raise ConnectionError("Failed to connect to the simulator")
+            faults= campaign.FaultCampaign(client, scenario.get("faults", []),
+                clock=clock)
+            cycle= controller(client)
+            # Wall time of each cycle, plant update and faults included
+            timings= array("d")
+            t0= clock()
+            perf_counter= time.perf_counter
+            def scan():
+                cycle_start= perf_counter()
+                if tick is None:
+                    plant.step(clock() - t0)
+                faults.step()
+                cycle()
+                timings.append(perf_counter() - cycle_start)
+            scheduler= scanscheduler.ScanScheduler(scan, period,
+                overrun_policy="skip", clock=clock, sleep=sleep)
+            try:
+                scheduler.run(cycles=config["cycles"])
+            finally:
+                result["faults"]= faults.finish()
+                result["cycles"]= scheduler.cycles
+            check= config["check"]
+            result["passed"]= True if check is None \
+                else bool(check(client, plant))
+            if timings:
+                ordered= sorted(timings)
+                result["cycle_time_us"]= {
+                    "mean": statistics.fmean(ordered) * 1e6,
+                    "p50": ordered[len(ordered) // 2] * 1e6,
+                    "p99": ordered[min(len(ordered) - 1,
+                        int(0.99 * len(ordered)))] * 1e6,
+                    "max": ordered[-1] * 1e6
+                }
+            if config["realtime"]:
+                result["overruns"]= scheduler.overruns
+    except Exception as error:
+        result["error"]= "".join(traceback.format_exception_only(
+            type(error), error)).strip()
+    finally:
+        result["requests"]= plant.requests
+        plant.stop()
+        result["wall_time"]= time.perf_counter() - start
+    return result
+
+def _init_worker(src_dir):
+    """Make the modules of this package importable in spawned workers."""
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+
+
+class CampaignRunner(object):
+    """Runs a controller under many fault scenarios in parallel.
+    Scenarios are fanned out across a process pool. Each scenario runs in
+    a worker with its own local FactoryIOSimulator and client, for a fixed
+    number of scan cycles, with the faults of the scenario applied by a
+    campaign.FaultCampaign. By default scenarios run in virtual time: the
+    plant dynamics (see FactoryIOSimulator.script) and the fault windows
+    advance by one period per cycle, as fast as the controller allows.
+    controller, setup and check are sent to the workers, so they must be
+    picklable, e.g. module-level functions.
+
+    Usage:
+    -----
+    def controller(client):
+        state= {...}
+        def cycle():
+            ...
+        return cycle
+
+    runner= CampaignRunner(controller, "./tags.csv", cycles=300, period=0.1)
+    results= runner.run([{"name": "stuck_x", "faults": [...]}, ...])
+    print(runner.summary(results))
+    """
+
+    def __init__(self, controller, filepath, *, cycles=100, period=0.1,
+        realtime=False, setup=None, check=None, data_types=None,
+        max_workers=None):
+        """Constructor
+        parameters:
+        ----------
+        controller: callable
+            controller(client) returning the cycle function of a fresh
+            controller instance.
+        filepath: str
+            Path to FactoryIO tags file.
+        cycles: int
+            Number of scan cycles per scenario.
+        period: float
+            Scan period in seconds.
+        realtime: bool
+            Run scenarios in real time instead of virtual time.
+        setup: callable
+            setup(simulator) scripting the plant dynamics, called before
+            each scenario.
+        check: callable
+            check(client, simulator) returning True if the scenario passed,
+            called after the last cycle. Without check, scenarios pass
+            unless an exception is raised.
+        data_types: dict
+            Data types of register tags, see FactoryIOModbusClient.
+        max_workers: int
+            Number of worker processes. Defaults to the number of CPUs. 0
+            to run the scenarios in this process, e.g. for debugging.
+        """
+        if cycles < 1:
+            raise ValueError("The number of cycles must be positive")
+        if period <= 0:
+            raise ValueError("The cycle period must be positive")
+        self.controller= controller
+        self.filepath= filepath
+        self.config= {"cycles": cycles, "period": period,
+            "realtime": realtime, "setup": setup, "check": check,
+            "data_types": data_types}
+        self.max_workers= max_workers
+
+    def run(self, scenarios):
+        """Run scenarios.
+        parameters:
+        ----------
+        scenarios: iterable of dict
+            {"name": str, "faults": list of fault specifications}
+        returns:
+        -------
+        list of result dicts, in the order of scenarios, with "name",
+        "passed", "error" (None or exception message), "cycles",
+        "wall_time" (seconds), "cycle_time_us" (mean, p50, p99 and max
+        wall time of a cycle), "requests" served by the simulator and
+        "faults" (activation records, see campaign.FaultCampaign)
+        """
+        scenarios= [dict(scenario) for scenario in scenarios]
+        for idx, scenario in enumerate(scenarios):
+            scenario.setdefault("name", "scenario_{}".format(idx))
+        if self.max_workers == 0:
+            return [run_scenario(self.controller, self.filepath, scenario,
+                self.config) for scenario in scenarios]
+        with ProcessPoolExecutor(max_workers=self.max_workers,
+            initializer=_init_worker, initargs=(work_dir,)) as executor:
+            futures= [executor.submit(run_scenario, self.controller,
+                self.filepath, scenario, self.config)
+                for scenario in scenarios]
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def summary(results):
+        """Aggregate results of run.
+        returns:
+        -------
+        dict with "scenarios", "passed" and "failed" counts, "failures"
+        (names of failed scenarios), "cycles" and "wall_time" (sum of the
+        scenario wall times)
+        """
+        failures= [result["name"] for result in results
+            if not result["passed"]]
+        return {
+            "scenarios": len(results),
+            "passed": len(results) - len(failures),
+            "failed": len(failures),
+            "failures": failures,
+            "cycles": sum(result["cycles"] for result in results),
+            "wall_time": sum(result["wall_time"] for result in results)
+        }
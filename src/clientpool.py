@@ -0,0 +1,295 @@
+# Imports
+import os, importlib.util, sys, time, threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Self-defined imports
+# Long-styled import method is used to preserve import structure
+#   regardless of execution/import method
+# modbusclient
+work_dir= os.path.dirname(os.path.realpath(__file__))
+module_name= "modbusclient"
+file_path= work_dir + "/modbusclient.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+modbusclient = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = modbusclient
+spec.loader.exec_module(modbusclient)
+
+
+class SceneMetrics(object):
+    """Request counters of a scene.
+    attributes:
+    ----------
+    calls: int
+        Number of calls performed on the scene's client.
+    errors: int
+        Number of calls that raised an exception.
+    tags: int
+        Number of tags read or written.
+    busy_time: float
+        Total seconds spent in calls, not counting the wait for the
+        scene lock.
+    """
+    __slots__= ("calls", "errors", "tags", "busy_time")
+
+    def __init__(self):
+        self.calls= 0
+        self.errors= 0
+        self.tags= 0
+        self.busy_time= 0.0
+
+    def as_dict(self):
+        return {"calls": self.calls, "errors": self.errors,
+            "tags": self.tags, "busy_time": self.busy_time}
+
+
+class FactoryIOClientPool(object):
+    """Pool of FactoryIOModbusClient connections to several FactoryIO
+    scenes, driven by a bounded pool of worker threads.
+    Each scene has its own client (connection and tags file). Clients of
+    scenes using the same tags file share the parsed tag table. Calls on
+    the same scene are serialized, calls on different scenes run
+    concurrently on the workers.
+
+    Usage:
+    -----
+    with FactoryIOClientPool(max_workers=4) as pool:
+        pool.add_scene("cell1", "192.168.1.10", filepath="./tags.csv")
+        pool.add_scene("cell2", "192.168.1.11", filepath="./tags.csv")
+        pool.connect()
+        values= pool.read_tags({"cell1": ["S_AL1_B"], "cell2": ["S_AL1_B"]})
+    """
+
+    def __init__(self, max_workers=8):
+        """Constructor
+        parameters:
+        ----------
+        max_workers: int
+            Maximum number of worker threads.
+        """
+        self.executor= ThreadPoolExecutor(max_workers=max_workers,
+            thread_name_prefix="FactoryIOClientPool")
+        # scene -> client
+        self.clients= {}
+        # scene -> lock serializing calls on the scene's client
+        self._locks= {}
+        # scene -> SceneMetrics
+        self._metrics= {}
+        self._metrics_lock= threading.Lock()
+        # Tags file path -> shared tag table
+        self._tag_tables= {}
+        self._start_time= time.monotonic()
+
+    def add_scene(self, scene, host="127.0.0.1", port=502, *, filepath,
+        **kwargs):
+        """Create the client of a scene.
+        parameters:
+        ----------
+        scene: str
+            Scene name.
+        host: str
+            Host address of the scene's Modbus TCP server.
+        port: int
+            Host TCP port.
+        filepath: str
+            Path to the scene's FactoryIO tags file.
+        kwargs:
+            Other FactoryIOModbusClient keyword arguments.
+        returns:
+        -------
+        FactoryIOModbusClient
+        """
+        if scene in self.clients:
+            raise ValueError("Scene already in pool: {}".format(scene))
+        # Share tag tables of identical tags files
+        key= os.path.realpath(filepath)
+        client= modbusclient.FactoryIOModbusClient(host, port,
+            filepath=filepath, tag_table=self._tag_tables.get(key), **kwargs)
+        self._tag_tables.setdefault(key, client.tag_table)
+        self.clients[scene]= client
+        self._locks[scene]= threading.Lock()
+        self._metrics[scene]= SceneMetrics()
+        return client
+
+    def remove_scene(self, scene):
+        """Close and remove the client of a scene.
+        parameters:
+        ----------
+        scene: str
+            Scene name.
+        """
+        client= self[scene]
+        # Calls submitted earlier and still waiting for the lock see the
+        #   scene removed
+        with self._locks[scene]:
+            client.close()
+            del self.clients[scene]
+        del self._locks[scene]
+        with self._metrics_lock:
+            del self._metrics[scene]
+
+    def __getitem__(self, scene):
+        try:
+            return self.clients[scene]
+        except KeyError:
+            raise ValueError(
+                "No scene with specified scene name: {}".format(scene)) \
+                from None
+
+    def __contains__(self, scene):
+        return scene in self.clients
+
+    def __len__(self):
+        return len(self.clients)
+
+    # ===================================================================
+    # Scheduling
+    def _call(self, scene, client, lock, method, args, kwargs, n_tags):
+        """Call a method of the scene's client, as of submit time, under
+        the scene lock and record metrics.
+        """
+        with lock:
+            if self.clients.get(scene) is not client:
+                raise ValueError("Scene removed from pool: {}".format(scene))
+            # Time spent waiting for the lock is not busy time
+            start= time.perf_counter()
+            isError= False
+            try:
+                return getattr(client, method)(*args, **kwargs)
+            except BaseException:
+                isError= True
+                raise
+            finally:
+                elapsed= time.perf_counter() - start
+                with self._metrics_lock:
+                    metrics= self._metrics.get(scene)
+                    if metrics is not None:
+                        metrics.calls+= 1
+                        metrics.errors+= isError
+                        metrics.tags+= n_tags
+                        metrics.busy_time+= elapsed
+
+    def submit(self, scene, method, *args, **kwargs):
+        """Schedule a call of a client method on the worker pool.
+        parameters:
+        ----------
+        scene: str
+            Scene name.
+        method: str
+            Name of the FactoryIOModbusClient method, e.g. "read_tag".
+        args, kwargs:
+            Method arguments.
+        returns:
+        -------
+        concurrent.futures.Future of the method's return value
+        """
+        # Check scene
+        client= self[scene]
+        # Count tags transferred by tag methods
+        if method in ("read_tag", "write_tag"):
+            n_tags= 1
+        elif method in ("read_tags", "write_tags"):
+            n_tags= len(args[0])
+        else:
+            n_tags= 0
+        return self.executor.submit(self._call, scene, client,
+            self._locks[scene], method, args, kwargs, n_tags)
+
+    def _gather(self, futures):
+        """Wait for futures keyed by scene.
+        returns:
+        -------
+        dict mapping scenes to results. Raises the first exception raised.
+        """
+        return {scene: future.result() for scene, future in futures.items()}
+
+    def map(self, method, *args, scenes=None, **kwargs):
+        """Call a client method on several scenes concurrently.
+        parameters:
+        ----------
+        method: str
+            Name of the FactoryIOModbusClient method.
+        args, kwargs:
+            Method arguments.
+        scenes: iterable of str
+            Scenes to call. All scenes if None.
+        returns:
+        -------
+        dict mapping scenes to return values
+        """
+        if scenes is None:
+            scenes= list(self.clients)
+        return self._gather({scene: self.submit(scene, method, *args, **kwargs)
+            for scene in scenes})
+
+    def connect(self, scenes=None):
+        """Connect clients.
+        returns:
+        -------
+        dict mapping scenes to True on success and False otherwise
+        """
+        return self.map("connect", scenes=scenes)
+
+    def close(self):
+        """Close all clients and shut down the workers."""
+        for scene, client in self.clients.items():
+            with self._locks[scene]:
+                client.close()
+        self.executor.shutdown(wait=True)
+
+    def read_tags(self, requests, max_gap=8):
+        """Read tags of several scenes concurrently.
+        parameters:
+        ----------
+        requests: dict
+            Mapping of scenes to iterables of tags to read.
+        max_gap: int
+            See FactoryIOModbusClient.read_tags.
+        returns:
+        -------
+        dict mapping scenes to dicts of tag values
+        """
+        return self._gather({scene: self.submit(scene, "read_tags",
+            list(tags), max_gap) for scene, tags in requests.items()})
+
+    def write_tags(self, requests):
+        """Write tags of several scenes concurrently.
+        parameters:
+        ----------
+        requests: dict
+            Mapping of scenes to dicts of tags to values to write.
+        returns:
+        -------
+        dict mapping scenes to dicts of per-tag write success
+        """
+        return self._gather({scene: self.submit(scene, "write_tags", values)
+            for scene, values in requests.items()})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, klass, value, traceback):
+        self.close()
+
+    # ===================================================================
+    # Metrics
+    def metrics(self):
+        """Snapshot of the pool's throughput metrics.
+        returns:
+        -------
+        dict with per-scene counters ("scenes") and aggregate "calls",
+        "errors", "tags", "busy_time", "elapsed" (seconds since the pool
+        was created), "calls_per_second" and "tags_per_second"
+        """
+        with self._metrics_lock:
+            scenes= {scene: metrics.as_dict()
+                for scene, metrics in self._metrics.items()}
+        elapsed= time.monotonic() - self._start_time
+        total= {"calls": 0, "errors": 0, "tags": 0, "busy_time": 0.0}
+        for metrics in scenes.values():
+            for key in total:
+                total[key]+= metrics[key]
+        total["elapsed"]= elapsed
+        total["calls_per_second"]= total["calls"] / elapsed if elapsed else 0.0
+        total["tags_per_second"]= total["tags"] / elapsed if elapsed else 0.0
+        total["scenes"]= scenes
+        return total
@@ -0,0 +1,282 @@
+# Imports
+import struct
+from operator import itemgetter
+
+
+# struct format and number of 16-bit registers of each data type
+TYPE_FORMATS= {
+    "uint16": ("H", 1),
+    "int16": ("h", 1),
+    "uint32": ("I", 2),
+    "int32": ("i", 2),
+    "float32": ("f", 2)
+}
+
+# Word (register) and byte orders
+ORDERS= ("big", "little")
+
+
+class DataType(object):
+    """Data type of a register tag spanning one or more 16-bit registers.
+    Decoded values are raw * scale + offset, and encoded values are
+    (value - offset) / scale, rounded for integer types.
+    attributes:
+    ----------
+    name: str
+        "uint16", "int16", "uint32", "int32" or "float32".
+    length: int
+        Number of registers.
+    word_order: str
+        "big" if the first register holds the most significant word,
+        "little" otherwise.
+    byte_order: str
+        Byte order within each register, "big" or "little".
+    scale: int or float
+        Linear scaling factor.
+    offset: int or float
+        Linear scaling offset.
+    value_types: tuple of type
+        Python types accepted for writes.
+    """
+    __slots__= ("name", "format", "length", "word_order", "byte_order",
+        "scale", "offset", "value_types", "_struct", "_registers")
+
+    def __init__(self, name, word_order="big", byte_order="big", scale=1,
+        offset=0):
+        """Constructor
+        parameters:
+        ----------
+        name: str
+            Type name, see TYPE_FORMATS.
+        word_order: str
+            "big" or "little".
+        byte_order: str
+            "big" or "little".
+        scale: int or float
+            Linear scaling factor, must not be 0.
+        offset: int or float
+            Linear scaling offset.
+        """
+        if name not in TYPE_FORMATS:
+            raise ValueError("Invalid data type: {}. Expected one of {}"
+                .format(name, tuple(TYPE_FORMATS)))
+        if word_order not in ORDERS or byte_order not in ORDERS:
+            raise ValueError("Invalid word/byte order. Expected one of {}"
+                .format(ORDERS))
+        if scale == 0:
+            raise ValueError("The scaling factor must not be 0")
+        self.name= name
+        self.format, self.length= TYPE_FORMATS[name]
+        self.word_order= word_order
+        self.byte_order= byte_order
+        self.scale= scale
+        self.offset= offset
+        if name == "float32" or not self.is_identity():
+            self.value_types= (int, float)
+        else:
+            self.value_types= (int,)
+        # Value <-> big endian bytes
+        self._struct= struct.Struct(">" + self.format)
+        # Registers <-> bytes, in the register byte order
+        self._registers= struct.Struct(
+            (">" if byte_order == "big" else "<") + "H" * self.length)
+
+    def is_identity(self):
+        """True if values are not scaled."""
+        return self.scale == 1 and self.offset == 0
+
+    def is_big_endian(self):
+        """True if both word and byte orders are big endian."""
+        return self.word_order == "big" and self.byte_order == "big"
+
+    def spec(self):
+        """Constructor arguments, e.g. to serialize the data type.
+        returns:
+        -------
+        (name, word_order, byte_order, scale, offset) tuple
+        """
+        return (self.name, self.word_order, self.byte_order, self.scale,
+            self.offset)
+
+    def decode(self, registers):
+        """Decode a value.
+        parameters:
+        ----------
+        registers: sequence of int
+            The length registers of the value, in address order.
+        returns:
+        -------
+        int or float
+        """
+        if self.word_order == "little":
+            registers= registers[::-1]
+        value= self._struct.unpack(self._registers.pack(*registers))[0]
+        if self.scale != 1 or self.offset != 0:
+            value= value * self.scale + self.offset
+        return value
+
+    def decode_response(self, response):
+        """Decode the value of a read response."""
+        return self.decode(response.registers[:self.length])
+
+    def encode(self, value):
+        """Encode a value.
+        parameters:
+        ----------
+        value: int or float
+            Value to encode.
+        returns:
+        -------
+        list of int, the length registers of the value in address order
+        """
+        # Rounding an infinite or NaN value to an integer type fails too
+        try:
+            raw= value
+            if self.scale != 1 or self.offset != 0:
+                raw= (raw - self.offset) / self.scale
+            if self.format != "f":
+                raw= int(round(raw))
+            data= self._struct.pack(raw)
+        except (struct.error, OverflowError, ValueError):
+            raise ValueError("Value out of range of {}: {}".format(self.name,
+                value)) from None
+        registers= list(self._registers.unpack(data))
+        if self.word_order == "little":
+            registers.reverse()
+        return registers
+
+    def __eq__(self, other):
+        if not isinstance(other, DataType):
+            return NotImplemented
+        return self.spec() == other.spec()
+
+    def __hash__(self):
+        return hash(self.spec())
+
+    def __repr__(self):
+        return "DataType({!r}, word_order={!r}, byte_order={!r}, scale={!r}, "\
+            "offset={!r})".format(*self.spec())
+
+
+# Common data types
+UINT16= DataType("uint16")
+INT16= DataType("int16")
+UINT32= DataType("uint32")
+INT32= DataType("int32")
+FLOAT32= DataType("float32")
+
+# Default data type of FactoryIO "Data Type"s, raw registers otherwise
+DEFAULT_DATA_TYPES= {
+    "Int": INT16
+}
+
+def as_data_type(data_type):
+    """Data type from a DataType, a type name or a spec tuple.
+    parameters:
+    ----------
+    data_type: DataType, str or tuple
+        e.g. FLOAT32, "float32" or ("float32", "little", "big", 1, 0)
+    returns:
+    -------
+    DataType
+    """
+    if isinstance(data_type, DataType):
+        return data_type
+    # DataType of another import of this module (e.g. src.datatypes)
+    if hasattr(data_type, "spec"):
+        return DataType(*data_type.spec())
+    if isinstance(data_type, str):
+        return DataType(data_type)
+    return DataType(*data_type)
+
+
+class BlockCodec(object):
+    """Decoder of all values of a register block with a single struct
+    call.
+    The block registers are packed to bytes once. If all fields are big
+    endian and don't overlap, they are unpacked in place (unused registers
+    are skipped with pad bytes), otherwise the bytes of each field are
+    first gathered in big endian order with a single itemgetter.
+    """
+    __slots__= ("count", "names", "_pack", "_gather", "_struct", "_scaled")
+
+    def __init__(self, count, fields):
+        """Constructor
+        parameters:
+        ----------
+        count: int
+            Number of registers in the block.
+        fields: list of (name, offset, DataType) tuples
+            Values of the block, offset in registers from the block start.
+        """
+        fields= sorted(fields, key=itemgetter(1))
+        self.count= count
+        self.names= [name for name, _, _ in fields]
+        self._pack= struct.Struct(">{}H".format(count)).pack
+        # Fields needing scaling: (index, scale, offset)
+        self._scaled= [(idx, data_type.scale, data_type.offset)
+            for idx, (_, _, data_type) in enumerate(fields)
+            if not data_type.is_identity()]
+
+        in_place= all(data_type.is_big_endian() for _, _, data_type in fields)
+        position= 0
+        for _, offset, data_type in fields:
+            if offset < position:
+                in_place= False
+            position= offset + data_type.length
+        if position > count:
+            raise ValueError("Fields exceed the block of {} registers"
+                .format(count))
+
+        if in_place:
+            # Unpack from the block bytes, skipping unused registers
+            fmt= ""
+            position= 0
+            for _, offset, data_type in fields:
+                fmt+= "x" * (2 * (offset - position)) + data_type.format
+                position= offset + data_type.length
+            self._gather= None
+            self._struct= struct.Struct(">" + fmt + "x" * (2 * (count - position)))
+        else:
+            # Gather the bytes of each field in big endian order
+            indices= []
+            for _, offset, data_type in fields:
+                registers= range(offset, offset + data_type.length)
+                if data_type.word_order == "little":
+                    registers= reversed(registers)
+                for register in registers:
+                    if data_type.byte_order == "big":
+                        indices+= [2 * register, 2 * register + 1]
+                    else:
+                        indices+= [2 * register + 1, 2 * register]
+            self._gather= itemgetter(*indices)
+            self._struct= struct.Struct(">" + "".join(data_type.format
+                for _, _, data_type in fields))
+
+    def decode(self, registers):
+        """Decode the values of a block.
+        parameters:
+        ----------
+        registers: sequence of int
+            The count registers of the block.
+        returns:
+        -------
+        list of values, in the order of names
+        """
+        data= self._pack(*registers)
+        if self._gather is not None:
+            data= bytes(self._gather(data))
+        values= self._struct.unpack(data)
+        if self._scaled:
+            values= list(values)
+            for idx, scale, offset in self._scaled:
+                values[idx]= values[idx] * scale + offset
+        return values
+
+    def decode_dict(self, registers):
+        """Decode the values of a block.
+        returns:
+        -------
+        dict mapping names to values
+        """
+        return dict(zip(self.names, self.decode(registers)))
@@ -0,0 +1,282 @@
+# Imports
+import os, importlib.util, sys, struct
+from array import array
+from pymodbus.bit_read_message import ReadCoilsResponse, \
+    ReadDiscreteInputsResponse
+from pymodbus.register_read_message import ReadHoldingRegistersResponse, \
+    ReadInputRegistersResponse
+from pymodbus.utilities import unpack_bitstring
+
+# Self-defined imports
+# Long-styled import method is used to preserve import structure
+#   regardless of execution/import method
+# FMC_functions
+work_dir= os.path.dirname(os.path.realpath(__file__))
+module_name= "FMC_functions"
+file_path= work_dir + "/FMC_functions.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+FMC_functions = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = FMC_functions
+spec.loader.exec_module(FMC_functions)
+
+
+# ===================================================================
+# Raw read responses
+class RawBitsMixin(object):
+    """Read bits response keeping the packed payload. The bits list is
+    only built on first access, e.g. by getBit.
+    """
+    raw= None
+    _bits= None
+
+    def decode(self, data):
+        self.byte_count= data[0]
+        self.raw= data[1:]
+        self._bits= None
+
+    @property
+    def bits(self):
+        if self._bits is None:
+            self._bits= unpack_bitstring(self.raw) if self.raw else []
+        return self._bits
+
+    @bits.setter
+    def bits(self, values):
+        self._bits= values
+
+
+class RawRegistersMixin(object):
+    """Read registers response keeping the big endian payload. The
+    registers list is only built on first access, e.g. by getRegister.
+    """
+    raw= None
+    _registers= None
+
+    def decode(self, data):
+        self.byte_count= data[0]
+        self.raw= data[1:]
+        self._registers= None
+
+    @property
+    def registers(self):
+        if self._registers is None:
+            raw= self.raw or b""
+            self._registers= list(struct.unpack(
+                ">{}H".format(len(raw) // 2), raw))
+        return self._registers
+
+    @registers.setter
+    def registers(self, values):
+        self._registers= values
+
+
+class RawReadCoilsResponse(RawBitsMixin, ReadCoilsResponse):
+    pass
+
+class RawReadDiscreteInputsResponse(RawBitsMixin, ReadDiscreteInputsResponse):
+    pass
+
+class RawReadHoldingRegistersResponse(RawRegistersMixin,
+    ReadHoldingRegistersResponse):
+    pass
+
+class RawReadInputRegistersResponse(RawRegistersMixin,
+    ReadInputRegistersResponse):
+    pass
+
+# Registered in the client decoder, see FactoryIOModbusClient
+RAW_RESPONSES= (RawReadCoilsResponse, RawReadDiscreteInputsResponse,
+    RawReadHoldingRegistersResponse, RawReadInputRegistersResponse)
+
+
+# ===================================================================
+# Unpacking
+# BIT_TABLES[bit] translates a payload byte to the value of its bit
+BIT_TABLES= [bytes((value >> bit) & 1 for value in range(256))
+    for bit in range(8)]
+
+def unpack_bits_into(target, offset, count, data):
+    """Unpack a packed bits payload, one byte (0 or 1) per bit.
+    parameters:
+    ----------
+    target: bytearray or memoryview
+        Buffer receiving the bits.
+    offset: int
+        Position of the first bit in target.
+    count: int
+        Number of bits to unpack.
+    data: bytes
+        Packed payload, least significant bit first.
+    """
+    end= offset + count
+    for bit in range(min(8, count)):
+        # Bits bit, bit + 8, ... of the payload
+        target[offset + bit:end:8]= data[:(count - bit + 7) // 8].translate(
+            BIT_TABLES[bit])
+
+def unpack_registers_into(target, offset, count, data):
+    """Unpack a big endian registers payload.
+    parameters:
+    ----------
+    target: memoryview
+        Byte ("B") view of the native 16-bit registers buffer.
+    offset: int
+        Position of the first register in the registers buffer.
+    count: int
+        Number of registers to unpack.
+    data: bytes
+        Big endian payload.
+    """
+    start, end= 2 * offset, 2 * (offset + count)
+    data= memoryview(data)
+    if sys.byteorder == "little":
+        # Swap bytes with strided copies
+        target[start:end:2]= data[1:2 * count:2]
+        target[start + 1:end:2]= data[0:2 * count:2]
+    else:
+        target[start:end]= data[:2 * count]
+
+
+# ===================================================================
+# Image buffer
+class ImageBuffer(object):
+    """Preallocated buffers receiving the bulk reads of a set of tags.
+    Reads are planned once (see FMC_functions.plan_reads). Each address
+    space gets one buffer covering its planned blocks: a bytearray with one
+    byte (0 or 1) per bit, or a native 16-bit array of registers. Payloads
+    are unpacked straight into the buffers, such that repeated reads don't
+    build any per-request list or per-tag object.
+    Buffers hold the values on the wire, read faults are only applied by
+    item access.
+
+    Usage:
+    -----
+    image= client.image_buffer(["S_AL1_B", "AL1_X_POS"])
+    image.read()
+    space, offset= image.offsets["AL1_X_POS"]
+    position= image.views[space][offset]
+    """
+
+    def __init__(self, client, tags=None, max_gap=8):
+        """Constructor
+        parameters:
+        ----------
+        client: FactoryIOModbusClient
+            Client performing the reads.
+        tags: iterable of str
+            Tags to read. Defaults to all readable tags.
+        max_gap: int
+            Maximum number of unused addresses read in order to merge two
+            tags into one request, see FMC_functions.plan_reads.
+        """
+        self.client= client
+        if tags is None:
+            tags= [tag for tag in client.tag_index.values()
+                if tag.read_type is not None]
+        else:
+            tags= [client.get_tag(tag) for tag in tags]
+        self.tags= {tag.name: tag for tag in tags}
+        self.blocks= FMC_functions.plan_reads(tags, max_gap)
+
+        # Address range of each address space (read type)
+        ranges= {}
+        for block in self.blocks:
+            start, end= ranges.get(block.read_type,
+                (block.address, block.address))
+            ranges[block.read_type]= (min(start, block.address),
+                max(end, block.address + block.count))
+        # Buffers and their views, by read type
+        self.bases= {}
+        self.buffers= {}
+        self.views= {}
+        self._targets= {}
+        for read_type, (start, end) in ranges.items():
+            self.bases[read_type]= start
+            if read_type in FMC_functions.REGISTER_READ_TYPES:
+                buffer= array("H", bytes(2 * (end - start)))
+                self._targets[read_type]= memoryview(buffer).cast("B")
+            else:
+                buffer= bytearray(end - start)
+                self._targets[read_type]= memoryview(buffer)
+            self.buffers[read_type]= buffer
+            self.views[read_type]= memoryview(buffer)
+        # Tag name -> (read type, offset in buffer)
+        self.offsets= {tag.name: (tag.read_type,
+            tag.address - self.bases[tag.read_type]) for tag in tags}
+        # (block, unpack, target, offset), planned once
+        self._reads= [(block, unpack_registers_into
+            if block.read_type in FMC_functions.REGISTER_READ_TYPES
+            else unpack_bits_into, self._targets[block.read_type],
+            block.address - self.bases[block.read_type])
+            for block in self.blocks]
+
+    def read(self):
+        """Perform all planned reads into the buffers.
+        raises:
+        ------
+        pymodbus.exceptions.ModbusIOException if a read fails
+        """
+        client= self.client
+        views= self.views
+        # One snapshot in thread-safe mode
+        with client.lock:
+            for block, unpack, target, offset in self._reads:
+                response= client.read_block_response(block)
+                raw= getattr(response, "raw", None)
+                if isinstance(raw, bytes):
+                    unpack(target, offset, block.count, raw)
+                    continue
+                # Decoded response, e.g. from another decoder
+                end= offset + block.count
+                payload= block.payload(response)[:block.count]
+                if unpack is unpack_bits_into:
+                    target[offset:end]= bytes(payload)
+                else:
+                    views[block.read_type][offset:end]= array("H", payload)
+
+    def __getitem__(self, tag):
+        """Value of a tag from the last read, read faults applied.
+        parameters:
+        ----------
+        tag: str
+            Tag name
+        returns:
+        -------
+        bool, int or float
+        """
+        read_faults= self.client.fault_tags["read"]
+        if tag in read_faults:
+            return read_faults[tag]
+        try:
+            read_type, offset= self.offsets[tag]
+        except KeyError:
+            raise ValueError(
+                "No tag with specified tag name in image: {}".format(tag)) \
+                from None
+        view= self.views[read_type]
+        datatype= self.tags[tag].datatype
+        if datatype is not None:
+            return datatype.decode(view[offset:offset + datatype.length])
+        if read_type in FMC_functions.REGISTER_READ_TYPES:
+            return view[offset]
+        return bool(view[offset])
+
+    def __contains__(self, tag):
+        return tag in self.offsets
+
+    def array(self, read_type):
+        """NumPy array sharing the buffer of an address space.
+        parameters:
+        ----------
+        read_type: str
+            e.g. "read_input_registers"
+        returns:
+        -------
+        numpy.ndarray of bool (bits) or uint16 (registers)
+        """
+        # Optional dependency
+        import numpy as np
+        buffer= self.buffers[read_type]
+        if read_type in FMC_functions.REGISTER_READ_TYPES:
+            return np.frombuffer(buffer, dtype=np.uint16)
+        return np.frombuffer(buffer, dtype=np.bool_)
@@ -0,0 +1,280 @@
+# Imports
+import json, math
+from array import array
+
+
+# Histogram layout: values (nanoseconds) below 2 ** SUB_BITS have their own
+#   bucket, larger values are bucketed with SUB_BITS significant bits,
+#   i.e. a relative precision of 1 / 2 ** (SUB_BITS - 1) (6.25 %)
+SUB_BITS= 5
+# Values from 2 ** MAX_BITS ns (about 17 s) go to the overflow bucket, one
+#   past the bucket of 2 ** MAX_BITS - 1
+MAX_BITS= 34
+OVERFLOW_BUCKET= (MAX_BITS - SUB_BITS + 2) << (SUB_BITS - 1)
+N_BUCKETS= OVERFLOW_BUCKET + 1
+
+def bucket_index(value):
+    """Histogram bucket of a value.
+    parameters:
+    ----------
+    value: int
+        Value in nanoseconds, >= 0
+    returns:
+    -------
+    int
+    """
+    shift= value.bit_length() - SUB_BITS
+    if shift <= 0:
+        return value
+    if shift > MAX_BITS - SUB_BITS:
+        return OVERFLOW_BUCKET
+    return (shift << (SUB_BITS - 1)) + (value >> shift)
+
+def bucket_value(index):
+    """Lowest value of a histogram bucket, in nanoseconds."""
+    if index < 1 << SUB_BITS:
+        return index
+    shift= (index >> (SUB_BITS - 1)) - 1
+    return (index - (shift << (SUB_BITS - 1))) << shift
+
+
+class LatencyHistogram(object):
+    """HDR-style latency histogram with log-linear buckets.
+    Buckets are preallocated, such that recording a value is a few integer
+    operations and array updates.
+    attributes:
+    ----------
+    count: int
+        Number of values recorded.
+    errors: int
+        Number of failed operations, see record_error.
+    total: int
+        Sum of the values recorded, in nanoseconds.
+    max: int
+        Largest value recorded, in nanoseconds.
+    """
+    __slots__= ("buckets", "count", "errors", "total", "max")
+
+    def __init__(self):
+        self.buckets= array("Q", bytes(8 * N_BUCKETS))
+        self.count= 0
+        self.errors= 0
+        self.total= 0
+        self.max= 0
+
+    def record(self, value):
+        """Record a latency.
+        parameters:
+        ----------
+        value: int
+            Latency in nanoseconds
+        """
+        shift= value.bit_length() - SUB_BITS
+        if shift <= 0:
+            self.buckets[value]+= 1
+        elif shift <= MAX_BITS - SUB_BITS:
+            self.buckets[(shift << (SUB_BITS - 1)) + (value >> shift)]+= 1
+        else:
+            self.buckets[OVERFLOW_BUCKET]+= 1
+        self.count+= 1
+        self.total+= value
+        if value > self.max:
+            self.max= value
+
+    def record_error(self):
+        """Count a failed operation, its latency being recorded apart."""
+        self.errors+= 1
+
+    def percentile(self, percent):
+        """Nearest-rank percentile, in nanoseconds (lowest value of its
+        bucket), None if nothing is recorded.
+        """
+        if self.count == 0:
+            return None
+        rank= max(1, math.ceil(percent / 100 * self.count))
+        if rank >= self.count:
+            return self.max
+        seen= 0
+        for index, count in enumerate(self.buckets):
+            seen+= count
+            if seen >= rank:
+                return min(bucket_value(index), self.max)
+        return self.max
+
+    def merge(self, other):
+        """Add the values recorded by another histogram."""
+        for index, count in enumerate(other.buckets):
+            if count:
+                self.buckets[index]+= count
+        self.count+= other.count
+        self.errors+= other.errors
+        self.total+= other.total
+        self.max= max(self.max, other.max)
+
+    def snapshot(self):
+        """Summary of the histogram.
+        returns:
+        -------
+        dict with "count", "errors" and "mean_us", "p50_us", "p90_us",
+        "p99_us", "max_us" latencies in microseconds (None if empty)
+        """
+        summary= {"count": self.count, "errors": self.errors}
+        empty= self.count == 0
+        summary["mean_us"]= None if empty else self.total / self.count / 1e3
+        for percent in (50, 90, 99):
+            value= self.percentile(percent)
+            summary["p{}_us".format(percent)]= None if empty else value / 1e3
+        summary["max_us"]= None if empty else self.max / 1e3
+        return summary
+
+
+# Phases of a read_tag/write_tag call
+PHASES= ("lookup", "request", "decode")
+
+
+class ClientMetrics(object):
+    """Request counters and latency histograms of a FactoryIOModbusClient.
+    Requests are recorded per Modbus function code (network round trip,
+    including pymodbus encoding and decoding but not the wait for a
+    request queue). read_tag/write_tag calls are recorded per tag (whole
+    call) and per phase: tag lookup and value check, request (queue wait,
+    dispatch to pymodbus and round trip), and result decoding. Bulk
+    reads and writes are only recorded by function code.
+    Per tag histograms are created on the first call of each tag, later
+    calls only update preallocated counters. Updates don't take a lock:
+    with several threads, rare concurrent increments can be lost.
+    attributes:
+    ----------
+    function_codes: dict
+        Function code -> LatencyHistogram of requests.
+    tags: dict
+        Tag name -> LatencyHistogram of read_tag/write_tag calls.
+    phases: dict
+        Phase (see PHASES) -> LatencyHistogram.
+    retries: int
+        Number of retried requests, see record_retry.
+    """
+
+    def __init__(self):
+        self.function_codes= {}
+        self.tags= {}
+        self.phases= {phase: LatencyHistogram() for phase in PHASES}
+        self.retries= 0
+
+    def reset(self):
+        """Forget all recorded values."""
+        self.__init__()
+
+    def record_request(self, function_code, elapsed, isError=False):
+        """Record a request.
+        parameters:
+        ----------
+        function_code: int
+            Modbus function code
+        elapsed: int
+            Round trip in nanoseconds
+        isError: bool
+            True if the request failed
+        """
+        histogram= self.function_codes.get(function_code)
+        if histogram is None:
+            histogram= self.function_codes[function_code]= LatencyHistogram()
+        histogram.record(elapsed)
+        if isError:
+            histogram.record_error()
+
+    def record_tag(self, name, elapsed, isError=False):
+        """Record a read_tag/write_tag call, elapsed in nanoseconds."""
+        histogram= self.tags.get(name)
+        if histogram is None:
+            histogram= self.tags[name]= LatencyHistogram()
+        histogram.record(elapsed)
+        if isError:
+            histogram.record_error()
+
+    def record_retry(self):
+        """Record a retried request."""
+        self.retries+= 1
+
+    # ===================================================================
+    # Export
+    def snapshot(self, top=None):
+        """Summary of all metrics.
+        parameters:
+        ----------
+        top: int
+            Only include the top tags by total time spent. None for all.
+        returns:
+        -------
+        dict with "requests", "errors" and "retries" totals and
+        "function_codes", "phases" and "tags" summaries (see
+        LatencyHistogram.snapshot). Tags are ordered by total time spent.
+        """
+        tags= sorted(self.tags.items(), key=lambda item: item[1].total,
+            reverse=True)
+        if top is not None:
+            tags= tags[:top]
+        return {
+            "requests": sum(histogram.count
+                for histogram in self.function_codes.values()),
+            "errors": sum(histogram.errors
+                for histogram in self.function_codes.values()),
+            "retries": self.retries,
+            "function_codes": {function_code: histogram.snapshot()
+                for function_code, histogram
+                in sorted(self.function_codes.items())},
+            "phases": {phase: histogram.snapshot()
+                for phase, histogram in self.phases.items()},
+            "tags": {name: dict(histogram.snapshot(),
+                total_us=histogram.total / 1e3) for name, histogram in tags}
+        }
+
+    def to_json(self, top=None, **kwargs):
+        """snapshot as a JSON string, kwargs are passed to json.dumps."""
+        return json.dumps(self.snapshot(top), **kwargs)
+
+    def to_prometheus(self, prefix="factoryio"):
+        """Metrics in the Prometheus text exposition format. Histograms are
+        exported as summaries (quantiles, sum and count, in seconds).
+        parameters:
+        ----------
+        prefix: str
+            Prefix of the metric names.
+        returns:
+        -------
+        str
+        """
+        lines= []
+        def summary(name, help_text, label, histograms):
+            metric= "{}_{}_seconds".format(prefix, name)
+            lines.append("# HELP {} {}".format(metric, help_text))
+            lines.append("# TYPE {} summary".format(metric))
+            for key, histogram in histograms:
+                labels= '{}="{}"'.format(label,
+                    str(key).replace("\\", "\\\\").replace('"', '\\"'))
+                for quantile in (0.5, 0.9, 0.99):
+                    value= histogram.percentile(quantile * 100)
+                    lines.append('{}{{{},quantile="{}"}} {}'.format(metric,
+                        labels, quantile,
+                        "NaN" if value is None else value / 1e9))
+                lines.append("{}_sum{{{}}} {}".format(metric, labels,
+                    histogram.total / 1e9))
+                lines.append("{}_count{{{}}} {}".format(metric, labels,
+                    histogram.count))
+        summary("request", "Modbus request round trip.", "function_code",
+            sorted(self.function_codes.items()))
+        summary("phase", "read_tag/write_tag time by phase.", "phase",
+            self.phases.items())
+        summary("tag", "read_tag/write_tag time by tag.", "tag",
+            self.tags.items())
+        metric= "{}_request_errors_total".format(prefix)
+        lines.append("# HELP {} Failed Modbus requests.".format(metric))
+        lines.append("# TYPE {} counter".format(metric))
+        for function_code, histogram in sorted(self.function_codes.items()):
+            lines.append('{}{{function_code="{}"}} {}'.format(metric,
+                function_code, histogram.errors))
+        metric= "{}_request_retries_total".format(prefix)
+        lines.append("# HELP {} Retried Modbus requests.".format(metric))
+        lines.append("# TYPE {} counter".format(metric))
+        lines.append("{} {}".format(metric, self.retries))
+        return "\n".join(lines) + "\n"
@@ -1,7 +1,9 @@
 # Imports
-import os, importlib, sys
+import os, importlib.util, sys, time, threading, contextlib
+from time import perf_counter_ns
 from pymodbus.client.sync import ModbusTcpClient
-import pandas as pd
+from pymodbus.exceptions import ModbusException, ModbusIOException, \
+    ConnectionException
 
 # Self-defined imports
 # Long-styled import method is used to preserve import structure 
@@ -14,44 +16,417 @@ spec = importlib.util.spec_from_file_location(module_name, file_path)
 FMC_functions = importlib.util.module_from_spec(spec)
 sys.modules[module_name] = FMC_functions
 spec.loader.exec_module(FMC_functions)
+# poller
+module_name= "poller"
+file_path= work_dir + "/poller.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+poller = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = poller
+spec.loader.exec_module(poller)
+# imagebuffer
+module_name= "imagebuffer"
+file_path= work_dir + "/imagebuffer.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+imagebuffer = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = imagebuffer
+spec.loader.exec_module(imagebuffer)
+# instrumentation
+module_name= "instrumentation"
+file_path= work_dir + "/instrumentation.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+instrumentation = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = instrumentation
+spec.loader.exec_module(instrumentation)
+# resilience
+module_name= "resilience"
+file_path= work_dir + "/resilience.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+resilience = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = resilience
+spec.loader.exec_module(resilience)
+# requestqueue, shared with poller such that both see the same
+#   DeadlineExceededError
+requestqueue= poller.requestqueue
 
+# Raised by requests while the circuit breaker is open, catch this one: 
+#   resilience may be loaded twice (src.resilience and resilience)
+CircuitOpenError= resilience.CircuitOpenError
+# Raised by requests dropped by the request queue, see requestqueue
+DeadlineExceededError= requestqueue.DeadlineExceededError
 
-class FactoryIOModbusClient(ModbusTcpClient):
 
-    def __init__(self, host="127.0.0.1", port=502, *, filepath):
-        """Constructor
+class FactoryIOTagsMixin(object):
+    """Tags file loading, tag lookup and fault injection shared by the
+    synchronous and asynchronous FactoryIO Modbus clients.
+    The fault table is copy-on-write: injecting or clearing a fault swaps
+    in new dicts, such that readers (e.g. read_tag in a controller thread)
+    never take a lock and always see a consistent table.
+    """
+
+    def _init_tags(self, filepath, tag_table=None, cache_dir=None,
+        data_types=None):
+        """Load tags and initialize fault tags.
         parameters:
         ----------
-        host: str
-            Host address of the Modbus TCP server.
-        port: int
-            Host TCP port.
         filepath: str
             Path to FactoryIO tags file.
+        tag_table: tuple
+            tag_table of another client loaded from the same tags file, 
+            shared instead of loading filepath again.
+        cache_dir: str
+            Directory caching compiled tags files, see load_tags.
+        data_types: dict
+            Data types of register tags, by tag name or FactoryIO data type
+            (e.g. {"Real": "float32"}), see FMC_functions.apply_data_types.
         """
-        # Initialize fault tags
+        # Initialize fault tags, replaced on each change (copy-on-write)
         self.fault_tags= {"read": {}, "write": {}}
+        # Lock serializing fault table changes
+        self._fault_lock= threading.Lock()
         # Load tags
-        self.tags= self.load_tags(filepath)
-        # Call constructor of superclass
-        super().__init__(host, port=port)
+        if tag_table is None:
+            self.tags= self.load_tags(filepath, cache_dir)
+        else:
+            self.tags, self.tag_index= tag_table
+        # Typed register tags, the untyped index being kept for sharing
+        self._untyped_tag_index= self.tag_index
+        self.tag_index= FMC_functions.apply_data_types(self.tag_index, 
+            data_types)
+
+    @property
+    def tag_table(self):
+        """Loaded tags and compiled tag index before data types are
+        applied, (tags, tag_index). Can be shared between clients using 
+        the same tags file, each applying its own data types.
+        """
+        return (self.tags, self._untyped_tag_index)
 
-    def load_tags(self, filepath):
+    def load_tags(self, filepath, cache_dir=None):
         """Load FactoryIO tags file that maps signal names to Modbus
         addresses.
         parameters:
         ----------
         filepath: str
             Path to FactoryIO tags file
+        cache_dir: str
+            Directory caching compiled tags files, keyed by file content. 
+            None to always parse the tags file.
         returns:
         -------
-        Pandas dataframe with addresses reduced to their numeric values
+        dict mapping column names ("Name", "Type", "Data Type", "Address")
+        to lists, with addresses reduced to their numeric values.
+        The compiled tag index is stored in self.tag_index.
+        """
+        if cache_dir is not None:
+            tags, self.tag_index= FMC_functions.load_compiled_tags(filepath,
+                cache_dir)
+            self._untyped_tag_index= self.tag_index
+            return tags
+        tags= FMC_functions.read_tags_file(filepath)
+        # Compile read-only name -> Tag index used for O(1) lookups
+        self.tag_index= FMC_functions.build_tag_index(tags)
+        self._untyped_tag_index= self.tag_index
+
+        return tags
+
+    def tags_dataframe(self):
+        """Loaded tags as a pandas DataFrame. Requires pandas.
+        returns:
+        -------
+        pandas.core.frame.DataFrame
+        """
+        # pandas is optional, keep it off the import path
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError(
+                "pandas is required for the DataFrame view of the tags") \
+                from None
+        return pd.DataFrame(self.tags, columns=FMC_functions.TAGS_FILE_COLUMNS)
+
+    def get_tag(self, tag):
+        """Look up compiled tag descriptor by name.
+        parameters:
+        ----------
+        tag: str
+            Tag name
+        returns:
+        -------
+        FMC_functions.Tag
+        """
+        try:
+            return self.tag_index[tag]
+        except KeyError:
+            raise ValueError(
+                "No tag with specified tag name: {}".format(tag)) from None
+
+    def _apply_read_faults(self, tags, values):
+        """Override read values of tags with injected read faults.
+        parameters:
+        ----------
+        tags: list of FMC_functions.Tag
+            Tags read
+        values: dict
+            Mapping of tag names to read values
+        returns:
+        -------
+        dict mapping tag names to values, in the order of tags
+        """
+        read_faults= self.fault_tags["read"]
+        return {
+            tag.name: read_faults[tag.name] if tag.name in read_faults 
+                else values[tag.name]
+            for tag in tags
+        }
+
+    def _collect_writes(self, values):
+        """Validate values to write and apply injected write faults.
+        parameters:
+        ----------
+        values: dict
+            Mapping of tags to values to write
+        returns:
+        -------
+        list of (FMC_functions.Tag, value) tuples
+        """
+        items= []
+        write_faults= self.fault_tags["write"]
+        for name, value in values.items():
+            tag= self.get_tag(name)
+            FMC_functions.check_write_value(tag, value)
+            # Check if fault has been injected in tag
+            if tag.name in write_faults:
+                value= write_faults[tag.name]
+            items.append((tag, value))
+        return items
+
+    def check_fault_value(self, tag, kind, value):
+        """Check that a fault value matches the data type of a tag.
+        parameters:
+        ----------
+        tag: str
+            Tag name
+        kind: str
+            "read" (sensor) or "write" (actuator) fault.
+        value: bool, int or float
+            Value to inject
+        returns:
+        -------
+        FMC_functions.Tag
+        raises:
+        ------
+        ValueError if the tag can't take a fault of that kind or the value
+        doesn't match its data type
+        """
+        # Tag
+        tag= self.get_tag(tag)
+        if kind == "read":
+            access= tag.read_type
+            bool_access= ("read_discrete_inputs", "read_coils")
+        else:
+            access= tag.write_type
+            bool_access= ("write_coil",)
+        if access is None:
+            raise ValueError("Tag type error")
+        # Expected boolean
+        if access in bool_access:
+            expected= bool
+        # Expected integer or float, for typed registers
+        elif tag.datatype is not None:
+            FMC_functions.check_typed_value(tag, value)
+            return tag
+        # Expected integer
+        else:
+            expected= int
+        if type(value) != expected:
+            raise ValueError(
+                "The supplied value doesn't not match the data type.\n" \
+                + "'{}' required but '{}' supplied.".format(
+                    expected.__name__, type(value))
+            )
+        return tag
+
+    def read_fault(self, tag, value):
+        """Inject read (sensor) fault to specified tag.
+        parameters:
+        ----------
+        tag: str
+            Tag to inject read fault.
+        value: bool or int
+            Value to inject
+        returns:
+        True on success
+        raises:
+        ------
+        ValueError if the value doesn't match the data type of the tag
         """
-        tags_df= pd.read_csv(filepath)
-        clean_addresses= FMC_functions.extract_addresses(tags_df["Address"])
-        tags_df["Address"]= clean_addresses
+        tag= self.check_fault_value(tag, "read", value)
+        self._set_fault("read", tag.name, value)
+        return True
 
-        return tags_df
+    def write_fault(self, tag, value):
+        """Inject write (actuator) fault to specified tag.
+        parameters:
+        ----------
+        tag: str
+            Tag to inject write fault.
+        value: bool or int
+            Value to inject
+        returns:
+        True on success
+        raises:
+        ------
+        ValueError if the value doesn't match the data type of the tag
+        """
+        tag= self.check_fault_value(tag, "write", value)
+        self._set_fault("write", tag.name, value)
+        return True
+
+    def _set_fault(self, kind, name, value):
+        """Copy the fault table with one fault injected or removed.
+        parameters:
+        ----------
+        kind: str
+            "read" or "write"
+        name: str
+            Tag name
+        value: bool, int or float
+            Value to inject, None to remove the fault
+        """
+        with self._fault_lock:
+            faults= dict(self.fault_tags[kind])
+            if value is None:
+                faults.pop(name, None)
+            else:
+                faults[name]= value
+            fault_tags= dict(self.fault_tags)
+            fault_tags[kind]= faults
+            # Single reference swap, atomic for readers
+            self.fault_tags= fault_tags
+
+    def clear_fault(self, tag, kind=None):
+        """Remove the faults injected in a tag.
+        parameters:
+        ----------
+        tag: str
+            Tag name
+        kind: str
+            "read" or "write". None to remove both.
+        """
+        self.get_tag(tag)
+        for fault_kind in ("read", "write"):
+            if kind is None or kind == fault_kind:
+                self._set_fault(fault_kind, tag, None)
+
+    def clear_faults(self):
+        """Remove all injected faults."""
+        with self._fault_lock:
+            self.fault_tags= {"read": {}, "write": {}}
+
+
+class FactoryIOModbusClient(FactoryIOTagsMixin, ModbusTcpClient):
+
+    def __init__(self, host="127.0.0.1", port=502, *, filepath,
+        tag_table=None, cache_dir=None, data_types=None, write_cache=False,
+        write_deadband=0, write_refresh_interval=None, thread_safe=False,
+        instrument=False, timeout=None, retry=None, breaker=None,
+        request_queue=None):
+        """Constructor
+        parameters:
+        ----------
+        host: str
+            Host address of the Modbus TCP server.
+        port: int
+            Host TCP port.
+        filepath: str
+            Path to FactoryIO tags file.
+        tag_table: tuple
+            tag_table of another client loaded from the same tags file,
+            shared instead of loading filepath again.
+        cache_dir: str
+            Directory caching compiled tags files, keyed by file content.
+            Later constructions with an unchanged tags file skip parsing.
+        data_types: dict
+            Data types of register tags, by tag name or FactoryIO data type
+            (e.g. {"Real": "float32"}), see FMC_functions.apply_data_types.
+        write_cache: bool
+            Enable write suppression: writes of the last value confirmed 
+            for a tag are skipped. The cache is invalidated when the 
+            connection is closed or (re)opened.
+        write_deadband: int or float
+            With write_cache, register writes differing by at most this
+            amount from the last confirmed value are skipped too.
+        write_refresh_interval: float
+            With write_cache, cached values older than this many seconds
+            are written again. None to never force a refresh.
+        thread_safe: bool
+            Share the client between threads: multi-request calls 
+            (read_tags, write_tags, ...), write cache updates, connect and
+            close are serialized with self.lock. Single requests are always
+            serialized by pymodbus and the fault table is always safe to
+            change from another thread.
+        instrument: bool
+            Record request counters and latency histograms in self.metrics
+            (see instrumentation.ClientMetrics). Without instrumentation,
+            self.metrics is None and no call is timed.
+        timeout: float
+            Timeout of connections and responses, in seconds. Defaults to
+            the pymodbus default (3 s).
+        retry: resilience.RetryPolicy
+            Retry requests failing on the transport, reconnecting between
+            attempts. None to return or raise transport failures at once.
+        breaker: resilience.CircuitBreaker
+            Fail requests at once with resilience.CircuitOpenError after
+            repeated transport failures, see resilience.CircuitBreaker.
+        request_queue: requestqueue.RequestQueue
+            Send requests by priority class rather than arrival, e.g. 
+            writes before the pending reads of other threads, see 
+            priority. Subscription polls are sent with low priority, 
+            dropped when not sent within their period. Not available in
+            thread-safe mode, where multi-request calls are atomic.
+        """
+        if thread_safe and request_queue is not None:
+            raise ValueError("A request queue can't be used in thread-safe "
+                "mode")
+        # Load tags and initialize fault tags
+        self._init_tags(filepath, tag_table, cache_dir, data_types)
+        # Initialize write cache: tag name -> (value, response, timestamp)
+        self.write_cache= write_cache
+        self.write_deadband= write_deadband
+        self.write_refresh_interval= write_refresh_interval
+        self._write_cache= {}
+        # Background poller of subscribed tags, created on first use
+        self._poller= None
+        # Client lock, a no-op unless thread-safe
+        self.thread_safe= thread_safe
+        self.lock= threading.RLock() if thread_safe \
+            else contextlib.nullcontext()
+        # Retry policy and circuit breaker, see execute
+        self.retry= retry
+        self.breaker= breaker
+        # Priority queue of requests, see execute
+        self.request_queue= request_queue
+        # Cached output values to write again once reconnected
+        self._resync_pending= None
+        # Set while a thread executes a request, see close
+        self._transport= threading.local()
+        # Call constructor of superclass
+        if timeout is None:
+            super().__init__(host, port=port)
+        else:
+            super().__init__(host, port=port, timeout=timeout)
+        # Instrumentation: timed variants shadow the hot path methods, such
+        #   that uninstrumented clients don't pay for it
+        self.metrics= None
+        if instrument:
+            self.metrics= instrumentation.ClientMetrics()
+            self._round_trip= self._round_trip_instrumented
+            self.read_tag= self._read_tag_instrumented
+            self.write_tag= self._write_tag_instrumented
+        # Keep the payload of read responses, bits and registers lists 
+        #   being only built when accessed (see imagebuffer.ImageBuffer)
+        for response in imagebuffer.RAW_RESPONSES:
+            self.framer.decoder.register(response)
 
     def read_tag(self, tag):
         """Read tag
@@ -64,24 +439,91 @@ class FactoryIOModbusClient(ModbusTcpClient):
         bool or int
         """ 
         # Tag
-        try:
-            tag= self.tags[self.tags["Name"]==tag].iloc[0]
-        except:
-            raise ValueError(
-                "No tag with specified tag name: {}".format(tag))
-        # Evaluate reader
-        reader= FMC_functions.evaluate_reader(tag)
+        tag= self.get_tag(tag)
+        if tag.read_type is None:
+            raise ValueError("Tag type error")
         
         # Perform read 
-        read_step= eval("self." + reader["read_type"]) \
-                (tag["Address"], reader["length"], unit=reader["UNIT"])
+        read_step= tag.reader(self)(tag.address, tag.length, unit=tag.unit)
         # Check if fault is injected in tag
-        if tag["Name"] in self.fault_tags["read"]:
+        read_faults= self.fault_tags["read"]
+        if tag.name in read_faults:
             # Fault present
-            return self.fault_tags["read"][tag["Name"]]
+            return read_faults[tag.name]
         else:
             # No fault
-            return eval("read_step." + reader["unit_reader"])
+            return tag.decoder(read_step)
+
+    def read_tags(self, tags, max_gap=8):
+        """Read several tags using as few requests as possible.
+        Tags are grouped by function code and contiguous or nearby 
+        addresses are coalesced into single read requests.
+        parameters:
+        ----------
+        tags: iterable of str
+            Tags to read
+        max_gap: int
+            Maximum number of unused addresses read in order to merge
+            two tags into one request.
+        returns:
+        -------
+        dict mapping tag names to bool or int values
+        """
+        # Tags
+        tags= [self.get_tag(tag) for tag in tags]
+        # Perform reads, as one snapshot in thread-safe mode
+        values= {}
+        with self.lock:
+            for block in FMC_functions.plan_reads(tags, max_gap):
+                values.update(FMC_functions.block_values(block, 
+                    self.read_block(block)))
+        # Override values of tags with injected faults
+        return self._apply_read_faults(tags, values)
+
+    def read_block(self, block):
+        """Perform a coalesced read request.
+        Read faults are not applied.
+        parameters:
+        ----------
+        block: FMC_functions.ReadBlock
+            Read request to perform, see FMC_functions.plan_reads
+        returns:
+        -------
+        list of bits or registers read, starting at block.address
+        """
+        return block.payload(self.read_block_response(block))
+
+    def read_block_response(self, block):
+        """Perform a coalesced read request.
+        parameters:
+        ----------
+        block: FMC_functions.ReadBlock
+            Read request to perform, see FMC_functions.plan_reads
+        returns:
+        -------
+        pymodbus read response, see imagebuffer.RAW_RESPONSES
+        """
+        response= block.reader(self)(block.address, block.count, 
+            unit=block.unit)
+        if response.isError():
+            raise ModbusIOException(
+                "{} failed at address {}: {}".format(
+                    block.read_type, block.address, response))
+        return response
+
+    def image_buffer(self, tags=None, max_gap=8):
+        """Preallocated buffers for repeated bulk reads of tags.
+        parameters:
+        ----------
+        tags: iterable of str
+            Tags to read. Defaults to all readable tags.
+        max_gap: int
+            See read_tags.
+        returns:
+        -------
+        imagebuffer.ImageBuffer, filled by its read method
+        """
+        return imagebuffer.ImageBuffer(self, tags, max_gap)
 
     def write_tag(self, tag, value):
         """Write tag
@@ -97,139 +539,414 @@ class FactoryIOModbusClient(ModbusTcpClient):
         or
         pymodbus.bit_write_message.WriteSingleRegisterResponse
         """
+        tag, value= self._resolve_write(tag, value)
+        return self._write_resolved(tag, value)
+
+    def _resolve_write(self, tag, value):
+        """Tag and value actually written by write_tag, write fault 
+        applied.
+        returns:
+        -------
+        (FMC_functions.Tag, value)
+        """
         # Tag
-        try:
-            tag= self.tags[self.tags["Name"]==tag].iloc[0]
-        except:
-            raise ValueError("No tag with specified tag name: {}".format(tag))
-        
-        # Evaluate writer
-        writer= FMC_functions.evaluate_writer(tag)
+        tag= self.get_tag(tag)
         # Check if value matches type of Output to write
-        if writer["write_type"] == "write_coil":
-            # For coil output
-            if not type(value) == bool:
-                raise ValueError(
-                        "The supplied value doesn't not match the data type.\n" \
-                        + "'bool' required but '{}' supplied.".format(type(value))
-                    )
-        if writer["write_type"] == "write_register":
-            # For register output
-            if not type(value) == int:
-                raise ValueError(
-                        "The supplied value doesn't not match the data type.\n" \
-                        + "'int' required but '{}' supplied.".format(type(value))
-                    )
+        FMC_functions.check_write_value(tag, value)
         # Check if fault has been injected in specified tag
-        if tag["Name"] in self.fault_tags["write"]:
+        write_faults= self.fault_tags["write"]
+        if tag.name in write_faults:
             # If so, write the faulty value
-            value= self.fault_tags["write"][tag["Name"]]
+            value= write_faults[tag.name]
+        return tag, value
 
-        # Perform write 
-        return eval("self." + writer["write_type"]) \
-                (tag["Address"], value, unit=writer["UNIT"])
+    def _write_resolved(self, tag, value):
+        """Write a value resolved by _resolve_write, see write_tag."""
+        # Write cache check, write and cache update are atomic in 
+        #   thread-safe mode
+        with self.lock:
+            # Skip redundant write
+            if self.write_cache:
+                cached= self._write_cache.get(tag.name)
+                if cached is not None and self._is_cached(tag, value, cached):
+                    return cached[1]
 
+            # Perform write 
+            response= tag.writer(self)(tag.address, 
+                FMC_functions.encode_value(tag, value), unit=tag.unit)
+            # Remember confirmed value
+            if self.write_cache and not response.isError():
+                self._write_cache[tag.name]= (value, response, 
+                    time.monotonic())
+            return response
 
-    def read_fault(self, tag, value):
-        """Inject read (sensor) fault to specified tag.
+    def write_tags(self, values):
+        """Write several tags using as few requests as possible.
+        Values of tags with contiguous addresses are packed into multi-write
+        requests (write_coils/write_registers), the others are written with
+        single writes.
         parameters:
         ----------
-        tag: str
-            Tag to inject read fault.
+        values: dict
+            Mapping of tags to values to write
+        returns:
+        -------
+        dict mapping tag names to True on success and False otherwise
+        """
+        # Validate tags and values before writing anything
+        items= self._collect_writes(values)
+        status= {}
+        # Atomic in thread-safe mode
+        with self.lock:
+            # Skip redundant writes
+            if self.write_cache:
+                write_cache= self._write_cache
+                pending= []
+                for tag, value in items:
+                    cached= write_cache.get(tag.name)
+                    if cached is not None \
+                        and self._is_cached(tag, value, cached):
+                        status[tag.name]= True
+                    else:
+                        pending.append((tag, value))
+                items= pending
+            # Perform writes
+            for block in FMC_functions.plan_writes(items):
+                try:
+                    response= getattr(self, block.write_type)(
+                        block.address, block.payload(), unit=block.unit)
+                    isSuccess= not response.isError()
+                except ModbusException:
+                    isSuccess= False
+                for tag, value in zip(block.tags, block.values):
+                    status[tag.name]= isSuccess
+                    # Remember confirmed value
+                    if self.write_cache and isSuccess:
+                        self._write_cache[tag.name]= (value, response, 
+                            time.monotonic())
+
+            return status
+
+    def _is_cached(self, tag, value, cached):
+        """Check if writing value to tag is redundant.
+        parameters:
+        ----------
+        tag: FMC_functions.Tag
+            Tag to write
         value: bool or int
-            Value to inject
+            Value to write
+        cached: tuple
+            (value, response, timestamp) of the last confirmed write
         returns:
-        True on success and False otherwise
+        -------
+        True if the write can be skipped
         """
-        # Tag
-        try:
-            tag= self.tags[self.tags["Name"]==tag].iloc[0]
-        except:
-            raise ValueError("No tag with specified tag name: {}".format(tag))
-        # Evaluate fault
-        isValid= False
-        reader= FMC_functions.evaluate_reader(tag)
-        # Expected boolean
-        if reader["read_type"] == "read_discrete_inputs" \
-            or reader["read_type"] == "read_coils":
-            try:
-                assert type(value) == bool
-                isValid= True
-            except:
-                raise ValueError(
-                    "The supplied value doesn't not match the data type.\n" \
-                    + "'bool' required but '{}' supplied.".format(type(value))
-                )
-        # Expected integer
-        if reader["read_type"] == "read_input_registers" \
-            or reader["read_type"] == "read_holding_registers":
-            try:
-                assert type(value) == int
-                isValid= True
-            except:
-                raise ValueError(
-                    "The supplied value doesn't not match the data type.\n" \
-                    + "'int' required but '{}' supplied.".format(type(value))
-                )
-
-        # Validation successful
-        if isValid:
-            self.fault_tags["read"][tag["Name"]]= value
-            return True
-        else:
+        cached_value, _, timestamp= cached
+        # Forced refresh
+        if self.write_refresh_interval is not None \
+            and time.monotonic() - timestamp >= self.write_refresh_interval:
             return False
+        # Register deadband
+        if tag.write_type == "write_register":
+            return abs(value - cached_value) <= self.write_deadband
+        return value == cached_value
 
-
-    def write_fault(self, tag, value):
-        """Inject write (actuator) fault to specified tag.
+    def invalidate_write_cache(self, tag=None):
+        """Forget confirmed write values, such that the next writes are 
+        performed regardless of their value.
         parameters:
         ----------
         tag: str
-            Tag to inject write fault.
-        value: bool or int
-            Value to inject
+            Tag to invalidate. All tags if None.
+        """
+        if tag is None:
+            self._write_cache.clear()
+        else:
+            self._write_cache.pop(tag, None)
+
+    def connect(self):
+        """Connect to the Modbus TCP server.
+        The write cache is invalidated when a new connection is opened.
+        With a retry policy re-syncing outputs, its values are written
+        again before the next request (see execute).
         returns:
+        -------
         True on success and False otherwise
         """
-        # Tag
-        try:
-            tag= self.tags[self.tags["Name"]==tag].iloc[0]
-        except:
-            raise ValueError("No tag with specified tag name: {}".format(tag))
-        # Evaluate fault
-        isValid= False
-        writer= FMC_functions.evaluate_writer(tag)
-        # Expected boolean
-        if writer["write_type"] == "write_coil":
+        # Serialized in thread-safe mode
+        with self.lock:
+            isNew= not self.is_socket_open()
+            transport= self._transport
+            nested= getattr(transport, "active", False)
+            transport.active= True
             try:
-                assert type(value) == bool
-                isValid= True
-            except:
-                raise ValueError(
-                    "The supplied value doesn't not match the data type.\n" \
-                    + "'bool' required but '{}' supplied.".format(type(value))
-                )
-        # Expected integer
-        if writer["write_type"] == "write_register":
+                isConnected= super().connect()
+            finally:
+                transport.active= nested
+            if isNew:
+                if self.retry is not None and self.retry.resync \
+                    and self._write_cache:
+                    pending= self._resync_pending or {}
+                    pending.update((name, cached[0]) for name, cached 
+                        in self._write_cache.items())
+                    self._resync_pending= pending
+                self.invalidate_write_cache()
+            return isConnected
+
+    def close(self):
+        """Close the connection and invalidate the write cache. Polling of
+        subscribed tags is stopped.
+        Transport failures of a request only drop the socket: polling goes
+        on and the write cache is kept until the next connection.
+        """
+        # pymodbus closes the client on transport failures
+        if getattr(self._transport, "active", False):
+            ModbusTcpClient.close(self)
+            return
+        # Stop polling first, the poller may be waiting for the lock
+        if self._poller is not None:
+            self._poller.stop()
+        with self.lock:
+            super().close()
+            self.invalidate_write_cache()
+            self._resync_pending= None
+
+    # ===================================================================
+    # Resilience
+    def execute(self, request=None):
+        """Execute a request, see pymodbus ModbusTcpClient.execute.
+        With a retry policy, requests failing on the transport are retried
+        with backoff on a new connection, and raise ConnectionException or
+        ModbusIOException once retries are exhausted. With a circuit
+        breaker, requests raise resilience.CircuitOpenError while the
+        circuit is open. With a request queue, requests wait for the 
+        connection by priority class (see priority) and raise 
+        requestqueue.DeadlineExceededError when dropped at their deadline.
+        returns:
+        -------
+        pymodbus response
+        """
+        transport= self._transport
+        queue= self.request_queue
+        if queue is not None:
+            priority= getattr(transport, "priority", None)
+            if priority is None:
+                priority= requestqueue.default_priority(request.function_code)
+            if not queue.acquire(priority, 
+                getattr(transport, "deadline", None)):
+                raise DeadlineExceededError("Request dropped, not sent "
+                    "within its deadline[{}]".format(self))
+        nested= getattr(transport, "active", False)
+        transport.active= True
+        try:
+            return self._round_trip(request)
+        finally:
+            transport.active= nested
+            if queue is not None:
+                queue.release()
+
+    def _round_trip(self, request):
+        """Send a request on the connection, with retries and circuit
+        breaker if configured. Called by execute once the request holds
+        the request queue.
+        """
+        if self.retry is None and self.breaker is None:
+            return ModbusTcpClient.execute(self, request)
+        return self._execute_resilient(request)
+
+    @contextlib.contextmanager
+    def priority(self, priority, deadline=None):
+        """Send the requests made by the current thread in the block with a
+        priority class and deadline, with a request queue (see 
+        requestqueue.RequestQueue). Without, writes are sent with HIGH 
+        priority and reads with NORMAL priority.
+        parameters:
+        ----------
+        priority: int
+            requestqueue.HIGH, NORMAL or LOW
+        deadline: float
+            Seconds each request may wait for the connection. Defaults to
+            the deadline of the priority class.
+
+        Usage:
+        -----
+        with fmc.priority(requestqueue.HIGH):
+            fmc.write_tag("RP_AL1_ST_CLAMP", False)
+        """
+        transport= self._transport
+        previous= (getattr(transport, "priority", None), 
+            getattr(transport, "deadline", None))
+        transport.priority, transport.deadline= priority, deadline
+        try:
+            yield self
+        finally:
+            transport.priority, transport.deadline= previous
+
+    def _execute_resilient(self, request):
+        """execute with retry policy and/or circuit breaker."""
+        retry, breaker= self.retry, self.breaker
+        attempts= 1 if retry is None else retry.retries + 1
+        if breaker is not None and not breaker.allow():
+            raise resilience.CircuitOpenError(
+                "Circuit open, {}: next attempt in {:.3f} s".format(self, 
+                breaker.remaining()))
+        attempt= 1
+        while True:
             try:
-                assert type(value) == int
-                isValid= True
-            except:
-                raise ValueError(
-                    "The supplied value doesn't not match the data type.\n" \
-                    + "'int' required but '{}' supplied.".format(type(value))
-                )
-
-        # Validation successful
-        if isValid:
-            self.fault_tags["write"][tag["Name"]]= value
-            return True
-        else:
-            return False
-        
+                if not self.connect():
+                    raise ConnectionException(
+                        "Failed to connect[{}]".format(self))
+                if self._resync_pending is not None:
+                    self._resync_outputs()
+                response= ModbusTcpClient.execute(self, request)
+                # Missing or unreadable response
+                failure= response if isinstance(response, ModbusIOException) \
+                    else None
+            except (ConnectionException, ModbusIOException) as error:
+                failure= error
+            if failure is None:
+                if breaker is not None:
+                    breaker.record_success()
+                return response
+            if breaker is not None:
+                breaker.record_failure()
+            if attempt >= attempts or (breaker is not None 
+                and not breaker.allow()):
+                raise failure
+            # Retry on a new connection, a late response of the failed 
+            #   attempt must not be taken for the next one
+            if self.metrics is not None:
+                self.metrics.record_retry()
+            ModbusTcpClient.close(self)
+            retry.sleep(retry.delay(attempt))
+            attempt+= 1
 
+    def _resync_outputs(self):
+        """Write the output values cached before the connection was lost.
+        Values failing to write stay pending."""
+        with self.lock:
+            pending, self._resync_pending= self._resync_pending, None
+            if not pending:
+                return
+            # Class method, bypassing instance-level wrappers (e.g. 
+            #   tracelog.TraceRecorder): these are not controller writes
+            status= FactoryIOModbusClient.write_tags(self, pending)
+            failed= {name: value for name, value in pending.items() 
+                if not status.get(name)}
+            if failed:
+                failed.update(self._resync_pending or {})
+                self._resync_pending= failed
 
+    # ===================================================================
+    # Instrumentation
+    def _round_trip_instrumented(self, request):
+        """_round_trip, recording it by function code. Time spent waiting
+        for the request queue is not included (see
+        requestqueue.RequestQueue.waits).
+        """
+        start= perf_counter_ns()
+        try:
+            response= FactoryIOModbusClient._round_trip(self, request)
+        except ModbusException:
+            self.metrics.record_request(request.function_code, 
+                perf_counter_ns() - start, True)
+            raise
+        self.metrics.record_request(request.function_code, 
+            perf_counter_ns() - start, response.isError())
+        return response
 
+    def _read_tag_instrumented(self, tag):
+        """read_tag, recording its phases and the call by tag."""
+        metrics= self.metrics
+        phases= metrics.phases
+        start= perf_counter_ns()
+        name= tag
+        try:
+            # Lookup
+            tag= self.get_tag(tag)
+            name= tag.name
+            if tag.read_type is None:
+                raise ValueError("Tag type error")
+            t_request= perf_counter_ns()
+            phases["lookup"].record(t_request - start)
+            # Dispatch and round trip
+            read_step= tag.reader(self)(tag.address, tag.length, unit=tag.unit)
+            t_decode= perf_counter_ns()
+            phases["request"].record(t_decode - t_request)
+            # Decode
+            read_faults= self.fault_tags["read"]
+            if tag.name in read_faults:
+                value= read_faults[tag.name]
+            else:
+                value= tag.decoder(read_step)
+            end= perf_counter_ns()
+            phases["decode"].record(end - t_decode)
+        except Exception:
+            metrics.record_tag(name, perf_counter_ns() - start, True)
+            raise
+        metrics.record_tag(name, end - start)
+        return value
+
+    def _write_tag_instrumented(self, tag, value):
+        """write_tag, recording its phases and the call by tag."""
+        metrics= self.metrics
+        phases= metrics.phases
+        start= perf_counter_ns()
+        name= tag
+        try:
+            # Lookup
+            tag, value= self._resolve_write(tag, value)
+            name= tag.name
+            t_request= perf_counter_ns()
+            phases["lookup"].record(t_request - start)
+            # Dispatch and round trip, or write cache hit
+            response= self._write_resolved(tag, value)
+            end= perf_counter_ns()
+            phases["request"].record(end - t_request)
+        except Exception:
+            metrics.record_tag(name, perf_counter_ns() - start, True)
+            raise
+        metrics.record_tag(name, end - start, response.isError())
+        return response
 
+    # ===================================================================
+    # Subscriptions
+    @property
+    def poller(self):
+        """poller.TagPoller polling the subscribed tags."""
+        if self._poller is None:
+            self._poller= poller.TagPoller(self)
+        return self._poller
+
+    def subscribe(self, tags, period, callback=None, queue=None):
+        """Poll tags in a background thread and deliver changed values.
+        Tags subscribed with the same period are read together with as 
+        few requests as possible. The first poll delivers all values.
+        parameters:
+        ----------
+        tags: iterable of str
+            Tags to poll
+        period: float
+            Poll period in seconds.
+        callback: callable
+            Called from the poller thread with a dict mapping the tags that 
+            changed to their new values.
+        queue: queue.Queue
+            Queue receiving the dicts of changed values, instead of or on 
+            top of callback.
+        returns:
+        -------
+        poller.Subscription, to pass to unsubscribe
+        """
+        subscription= self.poller.subscribe(tags, period, callback, queue)
+        self._poller.start()
+        return subscription
 
-    
\ No newline at end of file
+    def unsubscribe(self, subscription):
+        """Stop polling the tags of a subscription.
+        parameters:
+        ----------
+        subscription: poller.Subscription
+            Subscription returned by subscribe.
+        """
+        self.poller.unsubscribe(subscription)
@@ -0,0 +1,319 @@
+# Imports
+import os, importlib.util, sys, logging, math, threading, time, contextlib
+from pymodbus.exceptions import ModbusException
+
+# Self-defined imports
+# Long-styled import method is used to preserve import structure
+#   regardless of execution/import method
+# FMC_functions
+work_dir= os.path.dirname(os.path.realpath(__file__))
+module_name= "FMC_functions"
+file_path= work_dir + "/FMC_functions.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+FMC_functions = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = FMC_functions
+spec.loader.exec_module(FMC_functions)
+# requestqueue
+module_name= "requestqueue"
+file_path= work_dir + "/requestqueue.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+requestqueue = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = requestqueue
+spec.loader.exec_module(requestqueue)
+
+# Priority class of polls with a request queue
+POLL_PRIORITY= requestqueue.LOW
+
+
+class Subscription(object):
+    """Tags polled at a fixed period, see TagPoller.subscribe.
+    attributes:
+    ----------
+    tags: list of FMC_functions.Tag
+        Tags polled.
+    period: float
+        Poll period in seconds.
+    callback: callable or None
+        Called with a dict of changed tag values.
+    queue: queue.Queue or None
+        Receives dicts of changed tag values.
+    values: dict
+        Last values delivered, by tag name.
+    """
+    __slots__= ("tags", "period", "callback", "queue", "values")
+
+    def __init__(self, tags, period, callback, queue):
+        self.tags= tags
+        self.period= period
+        self.callback= callback
+        self.queue= queue
+        self.values= {}
+
+    def deliver(self, values):
+        """Deliver the values that changed since the last delivery.
+        parameters:
+        ----------
+        values: dict
+            Mapping of tag names to values read, covering self.tags
+        returns:
+        -------
+        dict of changed values, empty if nothing changed
+        """
+        last= self.values
+        changed= {}
+        for tag in self.tags:
+            value= values[tag.name]
+            if tag.name not in last or last[tag.name] != value:
+                changed[tag.name]= value
+        if changed:
+            last.update(changed)
+            if self.callback is not None:
+                self.callback(changed)
+            if self.queue is not None:
+                self.queue.put(changed)
+        return changed
+
+    def __repr__(self):
+        return "Subscription({} tags, period={})".format(len(self.tags),
+            self.period)
+
+
+class PollGroup(object):
+    """Subscriptions sharing a poll period, read with coalesced requests.
+    attributes:
+    ----------
+    period: float
+        Poll period in seconds.
+    subscriptions: list of Subscription
+    blocks: list of FMC_functions.ReadBlock
+        Read requests covering the tags of all subscriptions.
+    next_due: float
+        Clock time of the next poll.
+    """
+    __slots__= ("period", "subscriptions", "blocks", "next_due")
+
+    def __init__(self, period, next_due):
+        self.period= period
+        self.subscriptions= []
+        self.blocks= []
+        self.next_due= next_due
+
+
+class TagPoller(object):
+    """Background poller of subscribed tags.
+    Subscriptions with the same period form a poll group. The tags of a
+    group are read with as few requests as possible (see
+    FMC_functions.plan_reads) and each subscriber only receives the values
+    that changed since its last delivery, the first poll delivering all
+    values. Read faults injected in the client are applied.
+    Callbacks run in the poller thread.
+
+    Usage:
+    -----
+    poller= TagPoller(client)
+    poller.subscribe(["AL1_ST_Z_POS"], 0.01, callback=on_position)
+    poller.subscribe(["S_AL1_B", "S_AL1_C"], 0.2, queue=sensor_queue)
+    poller.start()
+    """
+
+    def __init__(self, client, max_gap=8, clock=time.monotonic):
+        """Constructor
+        parameters:
+        ----------
+        client: FactoryIOModbusClient
+            Client performing the reads.
+        max_gap: int
+            See FactoryIOModbusClient.read_tags.
+        clock: callable
+            Monotonic clock returning seconds.
+        """
+        self.client= client
+        self.max_gap= max_gap
+        self.clock= clock
+        # period -> PollGroup
+        self.groups= {}
+        # Counters
+        self.polls= 0
+        self.errors= 0
+        # Polls dropped by the request queue at their deadline
+        self.dropped= 0
+        # Lock protecting the groups
+        self._lock= threading.Lock()
+        # Set to wake up the poller thread
+        self._wakeup= threading.Event()
+        self._running= False
+        self._thread= None
+
+    # ===================================================================
+    # Subscriptions
+    def subscribe(self, tags, period, callback=None, queue=None):
+        """Poll tags at a fixed period.
+        parameters:
+        ----------
+        tags: iterable of str
+            Tags to poll
+        period: float
+            Poll period in seconds.
+        callback: callable
+            Called with a dict mapping the tags that changed to their
+            new values.
+        queue: queue.Queue
+            Queue receiving the dicts of changed values, instead of or on
+            top of callback.
+        returns:
+        -------
+        Subscription, to pass to unsubscribe
+        """
+        if period <= 0:
+            raise ValueError("The poll period must be positive")
+        if callback is None and queue is None:
+            raise ValueError("A callback or a queue is required")
+        tags= [self.client.get_tag(tag) for tag in tags]
+        for tag in tags:
+            if tag.read_type is None:
+                raise ValueError("Tag type error")
+        subscription= Subscription(tags, period, callback, queue)
+        with self._lock:
+            group= self.groups.get(period)
+            if group is None:
+                group= self.groups[period]= PollGroup(period, self.clock())
+            group.subscriptions.append(subscription)
+            self._plan(group)
+        self._wakeup.set()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop polling the tags of a subscription.
+        parameters:
+        ----------
+        subscription: Subscription
+            Subscription returned by subscribe.
+        """
+        with self._lock:
+            group= self.groups.get(subscription.period)
+            if group is None or subscription not in group.subscriptions:
+                raise ValueError("Unknown subscription: {}".format(
+                    subscription))
+            group.subscriptions.remove(subscription)
+            if group.subscriptions:
+                self._plan(group)
+            else:
+                del self.groups[subscription.period]
+        self._wakeup.set()
+
+    def _plan(self, group):
+        """Plan the read requests of a group."""
+        tags= [tag for subscription in group.subscriptions
+            for tag in subscription.tags]
+        group.blocks= FMC_functions.plan_reads(tags, self.max_gap)
+
+    # ===================================================================
+    # Polling
+    def poll(self, period):
+        """Poll a group once and deliver changed values.
+        parameters:
+        ----------
+        period: float
+            Period of the group to poll.
+        returns:
+        -------
+        dict mapping the tag names of the group to the values read
+        """
+        with self._lock:
+            group= self.groups[period]
+        return self._poll_group(group)
+
+    def _poll_group(self, group):
+        """Poll a group once and deliver changed values.
+        returns:
+        -------
+        dict mapping the tag names of the group to the values read, None
+        if the group was removed
+        """
+        with self._lock:
+            if self.groups.get(group.period) is not group:
+                return None
+            blocks= group.blocks
+            subscriptions= list(group.subscriptions)
+        client= self.client
+        values= {}
+        # With a request queue, requests of other calls go first and polls
+        #   not sent within their period are dropped
+        if getattr(client, "request_queue", None) is not None:
+            priority= client.priority(POLL_PRIORITY, group.period)
+        else:
+            priority= contextlib.nullcontext()
+        # One snapshot in thread-safe mode
+        with client.lock, priority:
+            for block in blocks:
+                values.update(FMC_functions.block_values(block, 
+                    client.read_block(block)))
+        # Override values of tags with injected faults
+        read_faults= client.fault_tags["read"]
+        for name in values.keys() & read_faults.keys():
+            values[name]= read_faults[name]
+        self.polls+= 1
+        for subscription in subscriptions:
+            subscription.deliver(values)
+        return values
+
+    def start(self):
+        """Start polling in a background thread."""
+        if self._running:
+            return
+        self._running= True
+        self._thread= threading.Thread(target=self._run, daemon=True,
+            name="TagPoller")
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after the current poll."""
+        self._running= False
+        self._wakeup.set()
+        thread= self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._thread= None
+
+    @property
+    def running(self):
+        return self._running
+
+    def _run(self):
+        clock= self.clock
+        while self._running:
+            self._wakeup.clear()
+            # Earliest due group
+            with self._lock:
+                group= min(self.groups.values(),
+                    key=lambda group: group.next_due, default=None)
+            if group is None:
+                self._wakeup.wait()
+                continue
+            delay= group.next_due - clock()
+            if delay > 0:
+                # Woken up early on subscription changes and stop()
+                self._wakeup.wait(delay)
+                continue
+            try:
+                if self._poll_group(group) is None:
+                    # Group removed meanwhile
+                    continue
+            except requestqueue.DeadlineExceededError:
+                # Poll not sent within its period, on purpose
+                self.dropped+= 1
+            except ModbusException as error:
+                self.errors+= 1
+                logging.warning("Polling tags every {} s failed: {}".format(
+                    group.period, error))
+            except Exception:
+                # e.g. raised by a callback, keep polling
+                self.errors+= 1
+                logging.exception("Polling tags every {} s failed".format(
+                    group.period))
+            # Next poll, skipping missed polls
+            group.next_due+= group.period
+            now= clock()
+            if group.next_due < now:
+                group.next_due+= math.ceil(
+                    (now - group.next_due) / group.period) * group.period
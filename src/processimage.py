@@ -0,0 +1,209 @@
+# Imports
+import os, importlib.util, sys
+
+# Self-defined imports
+# Long-styled import method is used to preserve import structure
+#   regardless of execution/import method
+# FMC_functions
+work_dir= os.path.dirname(os.path.realpath(__file__))
+module_name= "FMC_functions"
+file_path= work_dir + "/FMC_functions.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+FMC_functions = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = FMC_functions
+spec.loader.exec_module(FMC_functions)
+
+# Images of ProcessImage
+BITS, REGISTERS, VALUES= range(3)
+
+
+class ProcessImage(object):
+    """PLC-style process image on top of a FactoryIOModbusClient.
+    Each call to scan() reads all image inputs with a fixed set of bulk
+    requests (planned once) into bit and register images, and
+    records which inputs changed since the previous scan. Outputs are
+    staged with item assignment and flush() only writes the outputs whose
+    value changed since they were last written.
+
+    Usage:
+    -----
+    image= ProcessImage(client)
+    while True:
+        image.scan()
+        if image["S_AL1_B"]:
+            image["P_AL1_B"]= True
+        image.flush()
+    """
+
+    def __init__(self, client, inputs=None, outputs=None, max_gap=8):
+        """Constructor
+        parameters:
+        ----------
+        client: FactoryIOModbusClient
+            Connected client used to perform reads and writes.
+        inputs: iterable of str
+            Tags scanned each cycle. Defaults to all readable Input tags.
+        outputs: iterable of str
+            Tags that can be staged for writing. Defaults to all writable
+            tags.
+        max_gap: int
+            Maximum number of unused addresses read in order to merge
+            two tags into one request, see FMC_functions.plan_reads.
+        """
+        self.client= client
+        tag_index= client.tag_index
+        # Inputs
+        if inputs is None:
+            inputs= [tag for tag in tag_index.values()
+                if tag.type == "Input" and tag.read_type is not None]
+        else:
+            inputs= [client.get_tag(name) for name in inputs]
+        # Outputs
+        if outputs is None:
+            outputs= [tag for tag in tag_index.values()
+                if tag.write_type is not None]
+        else:
+            outputs= [client.get_tag(name) for name in outputs]
+        self.outputs= {tag.name: tag for tag in outputs}
+        # Plan bulk reads once
+        self.blocks= FMC_functions.plan_reads(inputs, max_gap)
+
+        # Images, one slot per input tag. Registers are kept in a list
+        #   rather than an unsigned array: read faults inject any int, e.g.
+        #   -1, as read_tag returns it. Values of blocks with typed
+        #   registers (see FMC_functions.apply_data_types) are kept in a
+        #   list image too
+        # name -> (image, slot)
+        self.slots= {}
+        n_bits= 0
+        n_registers= 0
+        n_values= 0
+        for block in self.blocks:
+            is_bit= block.read_type in ("read_coils", "read_discrete_inputs")
+            for tag in block.tags:
+                if is_bit:
+                    self.slots[tag.name]= (BITS, n_bits)
+                    n_bits+= 1
+                elif block.codec is not None:
+                    self.slots[tag.name]= (VALUES, n_values)
+                    n_values+= 1
+                else:
+                    self.slots[tag.name]= (REGISTERS, n_registers)
+                    n_registers+= 1
+        self.bits= bytearray(n_bits)
+        self.registers= [0] * n_registers
+        self.values= [0] * n_values
+        self._images= (self.bits, self.registers, self.values)
+
+        # Inputs changed during the last scan
+        self.changed= []
+        # Number of completed scans
+        self.scan_count= 0
+        # Staged and last written output values
+        self._staged= {}
+        self._written= {}
+
+    def scan(self):
+        """Read all image inputs.
+        Read faults injected in the client are applied.
+        returns:
+        -------
+        list of names of the inputs that changed since the previous scan
+        (all inputs on the first scan)
+        """
+        read_faults= self.client.fault_tags["read"]
+        slots= self.slots
+        images= self._images
+        first_scan= self.scan_count == 0
+        changed= []
+        for block in self.blocks:
+            payload= self.client.read_block(block)
+            if block.codec is not None:
+                # Typed registers: decode the whole block at once
+                payload= block.codec.decode_dict(payload)
+                offset= None
+            else:
+                offset= block.address
+            for tag in block.tags:
+                name= tag.name
+                if name in read_faults:
+                    value= read_faults[name]
+                elif offset is None:
+                    value= payload[name]
+                else:
+                    value= payload[tag.address - offset]
+                kind, slot= slots[name]
+                image= images[kind]
+                if first_scan or image[slot] != value:
+                    image[slot]= value
+                    changed.append(name)
+        self.changed= changed
+        self.scan_count+= 1
+        return changed
+
+    def __getitem__(self, tag):
+        """Value of an input from the last scan, or of a staged output.
+        parameters:
+        ----------
+        tag: str
+            Tag name
+        returns:
+        -------
+        bool, int or float
+        """
+        try:
+            kind, slot= self.slots[tag]
+        except KeyError:
+            if tag in self._staged:
+                return self._staged[tag]
+            raise ValueError(
+                "No tag with specified tag name in image: {}".format(tag)) \
+                from None
+        if kind == BITS:
+            return bool(self.bits[slot])
+        return self._images[kind][slot]
+
+    def __setitem__(self, tag, value):
+        """Stage an output value, written on the next flush().
+        parameters:
+        ----------
+        tag: str
+            Tag name
+        value: bool or int
+            Value to write
+        """
+        try:
+            FMC_functions.check_write_value(self.outputs[tag], value)
+        except KeyError:
+            raise ValueError(
+                "No tag with specified tag name in image: {}".format(tag)) \
+                from None
+        self._staged[tag]= value
+
+    def __contains__(self, tag):
+        return tag in self.slots or tag in self._staged
+
+    def flush(self):
+        """Write staged outputs whose value changed since they were last
+        successfully written.
+        returns:
+        -------
+        dict mapping written tag names to True on success and False
+        otherwise. Failed writes are retried on the next flush.
+        """
+        written= self._written
+        pending= {name: value for name, value in self._staged.items()
+            if name not in written or written[name] != value}
+        if not pending:
+            return {}
+        status= self.client.write_tags(pending)
+        for name, isSuccess in status.items():
+            if isSuccess:
+                written[name]= pending[name]
+        return status
+
+    def invalidate(self):
+        """Forget written output values (e.g. after a reconnect), such
+        that the next flush() rewrites all staged outputs.
+        """
+        self._written= {}
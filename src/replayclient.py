@@ -0,0 +1,325 @@
+# Imports
+import os, importlib.util, sys, bisect, statistics, time
+from array import array
+from pymodbus.bit_write_message import WriteSingleCoilResponse
+from pymodbus.register_write_message import WriteSingleRegisterResponse, \
+    WriteMultipleRegistersResponse
+
+# Self-defined imports
+# Long-styled import method is used to preserve import structure
+#   regardless of execution/import method
+work_dir= os.path.dirname(os.path.realpath(__file__))
+# modbusclient
+module_name= "modbusclient"
+file_path= work_dir + "/modbusclient.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+modbusclient = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = modbusclient
+spec.loader.exec_module(modbusclient)
+# scanscheduler
+module_name= "scanscheduler"
+file_path= work_dir + "/scanscheduler.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+scanscheduler = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = scanscheduler
+spec.loader.exec_module(scanscheduler)
+# tracelog
+module_name= "tracelog"
+file_path= work_dir + "/tracelog.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+tracelog = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = tracelog
+spec.loader.exec_module(tracelog)
+
+FMC_functions= modbusclient.FMC_functions
+
+# Tolerance of trace and schedule times, in seconds, absorbing the rounding
+#   of clocks accumulating periods
+TIME_EPSILON= 1e-9
+
+# Initial value of tags, by value type (see tracelog.tag_value_type)
+INITIAL_VALUES= {"bool": False, "int": 0, "float": 0.0}
+
+
+class ReplayClient(modbusclient.FactoryIOTagsMixin):
+    """In-memory stand-in for FactoryIOModbusClient, driven by a recorded
+    trace and/or scripted inputs, in virtual time.
+    Tag values live in a dict: reads return them (read faults applied),
+    writes update them (write faults applied). Input values come from
+    a recorded session (see tracelog.TraceRecorder), replayed by time,
+    from a schedule of (time, tag, value) events and from scripted
+    dynamics, e.g. simulator.follow. Time only advances between cycles,
+    by one period, such that controller loops run as fast as the CPU
+    allows. Controllers needing the time use client.clock().
+
+    Usage:
+    -----
+    client= ReplayClient(filepath="./tags.csv", trace="./session.trace")
+    client.script("AL1_ST_X_POS", follow("AL1_ST_X_SET", 500))
+    stats= client.run(make_cycle(client), period=0.1, duration=3600)
+    print(stats["speedup"], stats["logic_us"])
+    """
+
+    def __init__(self, *, filepath, tag_table=None, cache_dir=None,
+        data_types=None, trace=None, clock=None):
+        """Constructor
+        parameters:
+        ----------
+        filepath: str
+            Path to FactoryIO tags file.
+        tag_table: tuple
+            tag_table of another client loaded from the same tags file,
+            shared instead of loading filepath again.
+        cache_dir: str
+            Directory caching compiled tags files, see FactoryIOModbusClient.
+        data_types: dict
+            Data types of register tags, see FactoryIOModbusClient.
+        trace: tracelog.TraceLog or str
+            Recorded session, or path of its log, replaying the values
+            read by the recorded controller through a tracelog.TraceReplay
+            (replay attribute).
+        clock: scanscheduler.VirtualClock
+            Virtual clock. Defaults to a clock starting at 0.
+        """
+        # Load tags and initialize fault tags
+        self._init_tags(filepath, tag_table, cache_dir, data_types)
+        self.virtual= scanscheduler.VirtualClock() if clock is None else clock
+        self.clock= self.virtual.clock
+        self.sleep= self.virtual.sleep
+        # Tag values
+        self.values= {name: INITIAL_VALUES[tracelog.tag_value_type(tag)]
+            for name, tag in self.tag_index.items()}
+        # Recorded session
+        self.replay= None if trace is None else tracelog.TraceReplay(trace)
+        self.trace= None if trace is None else self.replay.trace
+        # Scheduled inputs, sorted by time
+        self._schedule= []
+        self._schedule_times= []
+        self._next_event= 0
+        # Scripted dynamics: tag name -> function
+        self.dynamics= {}
+        # Counters
+        self.reads= 0
+        self.writes= 0
+        # Seconds spent in the client API, see run
+        self.io_time= 0.0
+
+    # ===================================================================
+    # Inputs
+    def get_value(self, tag):
+        """Current value of a tag, without fault."""
+        return self.values[self.get_tag(tag).name]
+
+    def set_value(self, tag, value):
+        """Set the value of a tag, e.g. a sensor."""
+        self.values[self.get_tag(tag).name]= value
+
+    def schedule(self, events):
+        """Schedule input values.
+        parameters:
+        ----------
+        events: iterable of (time, tag, value)
+            Values set at the start of the first scan at or after time,
+            in seconds of virtual time.
+        """
+        events= [(t, self.get_tag(tag).name, value) for t, tag, value
+            in events]
+        pending= self._schedule[self._next_event:] + events
+        pending.sort(key=lambda event: event[0])
+        self._schedule= pending
+        self._schedule_times= [event[0] for event in pending]
+        self._next_event= 0
+
+    def script(self, tag, function):
+        """Script the dynamics of a tag, see FactoryIOSimulator.script.
+        parameters:
+        ----------
+        tag: str
+            Tag name
+        function: callable
+            function(client, t, value) returning the new value of the tag,
+            called at the start of each scan. None to remove the tag's
+            dynamics.
+        """
+        name= self.get_tag(tag).name
+        if function is None:
+            self.dynamics.pop(name, None)
+        else:
+            self.dynamics[name]= function
+
+    def advance(self, t=None, period=0.0):
+        """Apply the inputs due at the start of a scan: recorded reads,
+        scheduled events and scripted dynamics.
+        parameters:
+        ----------
+        t: float
+            Virtual time of the scan start. Defaults to now.
+        period: float
+            Scan period. Recorded scans starting during the scan, i.e.
+            before t + period, are applied, such that the jitter of the
+            recorded scans doesn't delay them by one scan.
+        """
+        if t is None:
+            t= self.clock()
+        values= self.values
+        # Recorded scans
+        if self.replay is not None:
+            limit= t + max(period - TIME_EPSILON, TIME_EPSILON)
+            scan= self.replay.peek_scan()
+            while scan is not None and (scan.t is None or scan.t <= limit):
+                for name, reads in self.replay.next_scan().reads.items():
+                    values[name]= reads[-1]
+                scan= self.replay.peek_scan()
+        # Scheduled events
+        end= bisect.bisect_right(self._schedule_times, t + TIME_EPSILON,
+            self._next_event)
+        for _, name, value in self._schedule[self._next_event:end]:
+            values[name]= value
+        self._next_event= end
+        # Dynamics
+        for name, function in list(self.dynamics.items()):
+            values[name]= function(self, t, values[name])
+
+    # ===================================================================
+    # Simulation
+    def run(self, cycle, period=0.1, *, cycles=None, duration=None):
+        """Run a controller cycle in virtual time.
+        Inputs are advanced before each cycle (see advance), then time
+        advances by one period. Wall time of each cycle is split into I/O
+        (time spent in the client API) and logic.
+        parameters:
+        ----------
+        cycle: callable
+            Controller cycle using this client, called without arguments.
+        period: float
+            Scan period in seconds of virtual time.
+        cycles: int
+            Number of cycles to run.
+        duration: float
+            Virtual time to run for, in seconds. Without cycles and
+            duration, the run ends with the recorded trace.
+        returns:
+        -------
+        dict with "cycles", "virtual_time" and "wall_time" (seconds),
+        "speedup" (virtual over wall time), and "logic_us" and "io_us"
+        statistics (mean, p50, p99, max) per cycle
+        """
+        if cycles is None and duration is not None:
+            cycles= int(round(duration / period))
+        if cycles is None and self.trace is None:
+            raise ValueError("Without trace, cycles or duration is required")
+        perf_counter= time.perf_counter
+        logic, io= array("d"), array("d")
+        def scan():
+            self.advance(period=period)
+            io_start= self.io_time
+            start= perf_counter()
+            cycle()
+            elapsed= perf_counter() - start
+            spent= self.io_time - io_start
+            io.append(spent)
+            logic.append(elapsed - spent)
+            # Last recorded scan replayed
+            if cycles is None and self.replay.peek_scan() is None:
+                scheduler.stop()
+        scheduler= scanscheduler.ScanScheduler(scan, period,
+            overrun_policy="skip", clock=self.clock, sleep=self.sleep)
+        t0= self.clock()
+        wall_start= perf_counter()
+        scheduler.run(cycles=cycles)
+        wall_time= perf_counter() - wall_start
+        virtual_time= self.clock() - t0
+        return {
+            "cycles": len(logic),
+            "virtual_time": virtual_time,
+            "wall_time": wall_time,
+            "speedup": virtual_time / wall_time if wall_time > 0 else None,
+            "logic_us": _summary(logic),
+            "io_us": _summary(io)
+        }
+
+    # ===================================================================
+    # Client API
+    def connect(self):
+        return True
+
+    def close(self):
+        pass
+
+    def is_socket_open(self):
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, klass, value, traceback):
+        self.close()
+
+    def read_tag(self, tag):
+        """Read tag, see FactoryIOModbusClient.read_tag."""
+        start= time.perf_counter()
+        tag= self.get_tag(tag)
+        if tag.read_type is None:
+            raise ValueError("Tag type error")
+        self.reads+= 1
+        read_faults= self.fault_tags["read"]
+        if tag.name in read_faults:
+            value= read_faults[tag.name]
+        else:
+            value= self.values[tag.name]
+        self.io_time+= time.perf_counter() - start
+        return value
+
+    def read_tags(self, tags, max_gap=8):
+        """Read several tags, see FactoryIOModbusClient.read_tags."""
+        start= time.perf_counter()
+        tags= [self.get_tag(tag) for tag in tags]
+        for tag in tags:
+            if tag.read_type is None:
+                raise ValueError("Tag type error")
+        self.reads+= len(tags)
+        values= self._apply_read_faults(tags, self.values)
+        self.io_time+= time.perf_counter() - start
+        return values
+
+    def write_tag(self, tag, value):
+        """Write tag, see FactoryIOModbusClient.write_tag.
+        returns:
+        -------
+        pymodbus write response, as returned by the server
+        """
+        start= time.perf_counter()
+        tag, value= self._collect_writes({tag: value})[0]
+        self.values[tag.name]= value
+        self.writes+= 1
+        if tag.write_type == "write_coil":
+            response= WriteSingleCoilResponse(tag.address, value)
+        elif tag.length > 1:
+            response= WriteMultipleRegistersResponse(tag.address, tag.length)
+        else:
+            response= WriteSingleRegisterResponse(tag.address, value)
+        self.io_time+= time.perf_counter() - start
+        return response
+
+    def write_tags(self, values):
+        """Write several tags, see FactoryIOModbusClient.write_tags."""
+        start= time.perf_counter()
+        items= self._collect_writes(values)
+        for tag, value in items:
+            self.values[tag.name]= value
+        self.writes+= len(items)
+        self.io_time+= time.perf_counter() - start
+        return {tag.name: True for tag, _ in items}
+
+
+def _summary(samples):
+    """mean, p50, p99 and max of samples in seconds, in microseconds."""
+    if not samples:
+        return None
+    ordered= sorted(samples)
+    return {
+        "mean": statistics.fmean(ordered) * 1e6,
+        "p50": ordered[len(ordered) // 2] * 1e6,
+        "p99": ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] * 1e6,
+        "max": ordered[-1] * 1e6
+    }
@@ -0,0 +1,208 @@
+# Imports
+import os, importlib.util, sys, heapq, itertools, json, threading, time
+from pymodbus.exceptions import ModbusException
+
+# Self-defined imports
+# Long-styled import method is used to preserve import structure
+#   regardless of execution/import method
+# instrumentation
+work_dir= os.path.dirname(os.path.realpath(__file__))
+module_name= "instrumentation"
+file_path= work_dir + "/instrumentation.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+instrumentation = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = instrumentation
+spec.loader.exec_module(instrumentation)
+
+
+# Priority classes, lowest first served
+HIGH= 0
+NORMAL= 1
+LOW= 2
+PRIORITIES= {HIGH: "high", NORMAL: "normal", LOW: "low"}
+
+# Modbus write function codes: write coil(s), write register(s)
+WRITE_FUNCTION_CODES= frozenset((0x05, 0x06, 0x0F, 0x10))
+
+def default_priority(function_code):
+    """Priority class of a request without explicit priority: writes are
+    HIGH, reads NORMAL."""
+    return HIGH if function_code in WRITE_FUNCTION_CODES else NORMAL
+
+
+class DeadlineExceededError(ModbusException):
+    """Raised by FactoryIOModbusClient instead of sending a request the
+    request queue dropped at its deadline."""
+
+
+# States of a queued request
+WAITING= 0
+GRANTED= 1
+DROPPED= 2
+
+
+class _Waiter(object):
+    __slots__= ("event", "state", "deadline", "ident")
+
+    def __init__(self, deadline, ident):
+        self.event= threading.Event()
+        self.state= WAITING
+        self.deadline= deadline
+        # Thread of the request, holding the connection once granted
+        self.ident= ident
+
+
+class RequestQueue(object):
+    """Priority queue of the requests of one client connection.
+    One request is on the connection at a time. Requests arriving while
+    the connection is busy wait, and the connection goes to the waiting
+    request of highest priority class (HIGH, NORMAL, LOW), then earliest
+    arrival, such that e.g. an emergency actuator write jumps ahead of
+    pending bulk reads. Requests with a deadline are dropped once they
+    waited past it without being sent: stale polls aren't sent late,
+    after fresher ones.
+    A request being sent isn't preempted, while requests of another call
+    can be sent between the requests of a multi-request call (e.g.
+    read_tags): a queue can't be combined with the thread-safe mode of
+    FactoryIOModbusClient, making such calls atomic.
+    Requests made on the connection holder's thread (e.g. writes
+    re-syncing outputs during a request) don't queue.
+    attributes:
+    ----------
+    depth: int
+        Number of waiting requests.
+    max_depth: int
+        Largest number of waiting requests seen.
+    waits: dict
+        Priority class -> instrumentation.LatencyHistogram of the time
+        requests waited for the connection.
+    dropped: dict
+        Priority class -> number of requests dropped at their deadline.
+    """
+
+    def __init__(self, deadlines=None, clock=time.monotonic):
+        """Constructor
+        parameters:
+        ----------
+        deadlines: dict
+            Default deadline by priority class, in seconds of waiting,
+            e.g. {NORMAL: 0.5}. Classes without default deadline wait
+            until sent.
+        clock: callable
+            Monotonic clock returning seconds, timing waits.
+        """
+        self.deadlines= dict(deadlines or {})
+        self.clock= clock
+        self._lock= threading.Lock()
+        # (priority, arrival, waiter) of waiting requests; dropped waiters
+        #   are removed lazily
+        self._heap= []
+        self._arrivals= itertools.count()
+        # Thread holding the connection and number of nested requests
+        self._owner= None
+        self._nested= 0
+        self.depth= 0
+        self.reset()
+
+    def reset(self):
+        """Forget recorded metrics."""
+        self.max_depth= self.depth
+        self.waits= {priority: instrumentation.LatencyHistogram()
+            for priority in PRIORITIES}
+        self.dropped= {priority: 0 for priority in PRIORITIES}
+
+    def acquire(self, priority=NORMAL, deadline=None):
+        """Wait for the connection, to release once the request is done.
+        parameters:
+        ----------
+        priority: int
+            Priority class: HIGH, NORMAL or LOW.
+        deadline: float
+            Seconds the request may wait. Defaults to the deadline of its
+            priority class.
+        returns:
+        -------
+        True once the connection is held, False if the request was
+        dropped at its deadline
+        """
+        if priority not in PRIORITIES:
+            raise ValueError("Unknown priority class: {}".format(priority))
+        ident= threading.get_ident()
+        with self._lock:
+            # Nested request of the connection holder
+            if self._owner == ident:
+                self._nested+= 1
+                return True
+            if self._owner is None:
+                self._owner= ident
+                self.waits[priority].record(0)
+                return True
+            if deadline is None:
+                deadline= self.deadlines.get(priority)
+            start= self.clock()
+            waiter= _Waiter(None if deadline is None else start + deadline,
+                ident)
+            heapq.heappush(self._heap, (priority, next(self._arrivals),
+                waiter))
+            self.depth+= 1
+            if self.depth > self.max_depth:
+                self.max_depth= self.depth
+        waiter.event.wait(deadline)
+        with self._lock:
+            if waiter.state == WAITING:
+                # Deadline passed while waiting
+                waiter.state= DROPPED
+                self.depth-= 1
+                self.dropped[priority]+= 1
+            if waiter.state == DROPPED:
+                return False
+        # Granted: the connection is held, metrics updates are serialized
+        self.waits[priority].record(int((self.clock() - start) * 1e9))
+        return True
+
+    def release(self):
+        """Release the connection to the next waiting request."""
+        with self._lock:
+            if self._nested:
+                self._nested-= 1
+                return
+            now= self.clock()
+            while self._heap:
+                priority, _, waiter= heapq.heappop(self._heap)
+                if waiter.state != WAITING:
+                    continue
+                self.depth-= 1
+                if waiter.deadline is not None and now > waiter.deadline:
+                    waiter.state= DROPPED
+                    self.dropped[priority]+= 1
+                    waiter.event.set()
+                    continue
+                # Connection handed over
+                waiter.state= GRANTED
+                self._owner= waiter.ident
+                waiter.event.set()
+                return
+            self._owner= None
+
+    # ===================================================================
+    # Export
+    def snapshot(self):
+        """Summary of the queue metrics.
+        returns:
+        -------
+        dict with "depth", "max_depth", and by priority class name
+        "waits" (see instrumentation.LatencyHistogram.snapshot) and
+        "dropped" counts
+        """
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "waits": {name: self.waits[priority].snapshot()
+                for priority, name in PRIORITIES.items()},
+            "dropped": {name: self.dropped[priority]
+                for priority, name in PRIORITIES.items()}
+        }
+
+    def to_json(self, **kwargs):
+        """snapshot as a JSON string, kwargs are passed to json.dumps."""
+        return json.dumps(self.snapshot(), **kwargs)
@@ -0,0 +1,170 @@
+# Imports
+import threading, time
+from pymodbus.exceptions import ConnectionException
+
+
+# Circuit breaker states
+CLOSED= "closed"
+OPEN= "open"
+HALF_OPEN= "half_open"
+
+
+class CircuitOpenError(ConnectionException):
+    """Raised instead of sending a request while the circuit breaker of
+    the client is open."""
+
+
+class RetryPolicy(object):
+    """Retry policy of FactoryIOModbusClient requests failing on the
+    transport, i.e. connection failures and missing or unreadable
+    responses. Exception responses of the server are not retried.
+    Between attempts, the socket is dropped and the client waits with
+    exponential backoff, the next attempt reconnecting.
+
+    Usage:
+    -----
+    fmc= FactoryIOModbusClient(host, port, filepath="./tags.csv",
+        timeout=0.2, retry=RetryPolicy(retries=2, backoff=0.05))
+    """
+
+    def __init__(self, retries=3, backoff=0.05, backoff_max=1.0,
+        resync=True, sleep=time.sleep):
+        """Constructor
+        parameters:
+        ----------
+        retries: int
+            Number of retries of a failed request, on top of the first
+            attempt.
+        backoff: float
+            Delay before the first retry, in seconds, doubled for each
+            further retry.
+        backoff_max: float
+            Largest delay between attempts, in seconds.
+        resync: bool
+            Write the values of the write cache again after a reconnect,
+            such that outputs confirmed before the connection dropped are
+            restored (see FactoryIOModbusClient write_cache).
+        sleep: callable
+            Sleep function taking seconds, e.g. of a virtual clock.
+        """
+        if retries < 0:
+            raise ValueError("Number of retries must be >= 0")
+        self.retries= retries
+        self.backoff= backoff
+        self.backoff_max= backoff_max
+        self.resync= resync
+        self.sleep= sleep
+
+    def delay(self, attempt):
+        """Delay after a failed attempt, in seconds.
+        parameters:
+        ----------
+        attempt: int
+            Number of the failed attempt, starting at 1.
+        returns:
+        -------
+        float
+        """
+        return min(self.backoff_max, self.backoff * 2 ** (attempt - 1))
+
+
+class CircuitBreaker(object):
+    """Circuit breaker of a client connection.
+    After failure_threshold consecutive transport failures the circuit
+    opens: requests fail at once with CircuitOpenError instead of waiting
+    for the socket timeout, such that a scan loop degrades to fast errors
+    while the server is gone. After reset_timeout seconds, the circuit is
+    half open: the next request is a trial, closing the circuit on success
+    and opening it again on failure. Other requests fail at once while the
+    trial is in flight, a trial without outcome after reset_timeout being
+    taken for lost and replaced by the next request.
+    attributes:
+    ----------
+    state: str
+        CLOSED, OPEN or HALF_OPEN
+    failures: int
+        Consecutive failures.
+    opened: int
+        Number of times the circuit opened.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=5.0,
+        clock=time.monotonic):
+        """Constructor
+        parameters:
+        ----------
+        failure_threshold: int
+            Consecutive failures opening the circuit.
+        reset_timeout: float
+            Seconds the circuit stays open before a trial request.
+        clock: callable
+            Monotonic clock returning seconds.
+        """
+        if failure_threshold < 1:
+            raise ValueError("Failure threshold must be >= 1")
+        self.failure_threshold= failure_threshold
+        self.reset_timeout= reset_timeout
+        self.clock= clock
+        self.state= CLOSED
+        self.failures= 0
+        self.opened= 0
+        self._opened_at= None
+        # Start of the trial request in flight, None without trial
+        self._trial_at= None
+        # Serializes callers of concurrent requests
+        self._lock= threading.Lock()
+
+    def allow(self):
+        """Check if a request may be sent, moving an open circuit to half
+        open once reset_timeout elapsed. Half open, only the trial request
+        is allowed, until record_success or record_failure.
+        returns:
+        -------
+        bool
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now= self.clock()
+            if self.state == OPEN:
+                if now - self._opened_at < self.reset_timeout:
+                    return False
+                self.state= HALF_OPEN
+            elif self._trial_at is not None \
+                and now - self._trial_at < self.reset_timeout:
+                # Trial request in flight
+                return False
+            self._trial_at= now
+            return True
+
+    def remaining(self):
+        """Seconds until the circuit lets a trial request through, 0 if
+        it does now."""
+        if self.state == OPEN:
+            since= self._opened_at
+        elif self.state == HALF_OPEN and self._trial_at is not None:
+            since= self._trial_at
+        else:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self.clock() - since))
+
+    def record_success(self):
+        with self._lock:
+            self.failures= 0
+            self.state= CLOSED
+            self._trial_at= None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures+= 1
+            if self.state == HALF_OPEN \
+                or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened+= 1
+                self.state= OPEN
+                self._opened_at= self.clock()
+            self._trial_at= None
+
+    def reset(self):
+        """Close the circuit."""
+        self.record_success()
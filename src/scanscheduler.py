@@ -0,0 +1,211 @@
+# Imports
+import logging, math, time
+from array import array
+
+
+# Overrun policies
+# skip: missed cycles are dropped, the next cycle starts at the next
+#   period boundary
+# catch_up: missed cycles are run back-to-back until the schedule is met
+# warn: a warning is logged and the schedule restarts from the end of the
+#   overrunning cycle
+OVERRUN_POLICIES= ("skip", "catch_up", "warn")
+
+
+class ScanScheduler(object):
+    """Fixed-rate scan scheduler.
+    Runs a cycle function at a fixed period against a monotonic clock.
+    Cycle release times are computed from the start of the schedule, so
+    the time spent in I/O and logic is compensated instead of adding up
+    to the period. Per-cycle latency (cycle execution time) and jitter
+    (delay between the scheduled and the actual cycle start) are kept in
+    ring buffers.
+
+    Usage:
+    -----
+    def cycle():
+        inputs= client.read_tags(INPUT_TAGS)
+        ...
+        client.write_tags(outputs)
+
+    scheduler= ScanScheduler(cycle, 0.1)
+    scheduler.run()
+    """
+
+    def __init__(self, cycle, period, *, overrun_policy="skip", history=1000,
+        clock=time.monotonic, sleep=time.sleep):
+        """Constructor
+        parameters:
+        ----------
+        cycle: callable
+            Cycle function, called without arguments.
+        period: float
+            Cycle period in seconds.
+        overrun_policy: str
+            What to do when a cycle ends after the next cycle should have
+            started: "skip", "catch_up" or "warn" (see OVERRUN_POLICIES).
+        history: int
+            Number of cycles kept in the latency/jitter ring buffers, at
+            least 1.
+        clock: callable
+            Monotonic clock returning seconds.
+        sleep: callable
+            Function sleeping for the supplied number of seconds.
+        """
+        if period <= 0:
+            raise ValueError("The cycle period must be positive")
+        if history < 1:
+            raise ValueError("The history must hold at least one cycle")
+        if overrun_policy not in OVERRUN_POLICIES:
+            raise ValueError(
+                "Invalid overrun policy: {}. Expected one of {}".format(
+                    overrun_policy, OVERRUN_POLICIES))
+        self.cycle= cycle
+        self.period= period
+        self.overrun_policy= overrun_policy
+        self.clock= clock
+        self.sleep= sleep
+        # Ring buffers
+        self.history= history
+        self._latencies= array("d", bytes(8 * history))
+        self._jitters= array("d", bytes(8 * history))
+        self._index= 0
+        # Counters
+        self.cycles= 0
+        self.overruns= 0
+        self.skipped= 0
+        self._running= False
+
+    def run(self, cycles=None):
+        """Run the schedule until stop() is called or the supplied number
+        of cycles has run.
+        parameters:
+        ----------
+        cycles: int
+            Number of cycles to run. None to run until stop() is called.
+        """
+        clock= self.clock
+        period= self.period
+        self._running= True
+        n= 0
+        release= clock()
+        while self._running and (cycles is None or n < cycles):
+            start= clock()
+            self.cycle()
+            end= clock()
+            self._record(end - start, max(0.0, start - release))
+            n+= 1
+            # Next release
+            release+= period
+            if end > release:
+                self.overruns+= 1
+                if self.overrun_policy == "skip":
+                    missed= math.ceil((end - release) / period)
+                    self.skipped+= missed
+                    release+= missed * period
+                elif self.overrun_policy == "warn":
+                    logging.warning(
+                        "Scan cycle {} overran its period of {} s by {:.6f} s"
+                        .format(self.cycles - 1, period, end - release))
+                    release= end
+                # catch_up: keep the release time, i.e. start immediately
+            delay= release - clock()
+            if delay > 0:
+                self.sleep(delay)
+        self._running= False
+
+    def stop(self):
+        """Stop the schedule after the current cycle."""
+        self._running= False
+
+    @property
+    def running(self):
+        return self._running
+
+    def _record(self, latency, jitter):
+        """Record cycle latency and jitter in the ring buffers."""
+        self._latencies[self._index]= latency
+        self._jitters[self._index]= jitter
+        self._index= (self._index + 1) % self.history
+        self.cycles+= 1
+
+    def latencies(self):
+        """Latencies of the recorded cycles (at most history), oldest first.
+        returns:
+        -------
+        list of float
+        """
+        return self._ordered(self._latencies)
+
+    def jitters(self):
+        """Jitters of the recorded cycles (at most history), oldest first.
+        returns:
+        -------
+        list of float
+        """
+        return self._ordered(self._jitters)
+
+    def _ordered(self, ring):
+        if self.cycles < self.history:
+            return ring[:self.cycles].tolist()
+        return ring[self._index:].tolist() + ring[:self._index].tolist()
+
+    def percentiles(self, percents=(50, 90, 99, 100), values=None):
+        """Nearest-rank percentiles of the recorded latencies.
+        parameters:
+        ----------
+        percents: iterable of float
+            Percentiles to compute, between 0 and 100.
+        values: list of float
+            Values to use instead of the recorded latencies, e.g.
+            jitters().
+        returns:
+        -------
+        dict mapping percents to values (None if nothing is recorded)
+        """
+        if values is None:
+            values= self.latencies()
+        values= sorted(values)
+        result= {}
+        for percent in percents:
+            if not values:
+                result[percent]= None
+                continue
+            rank= max(1, math.ceil(percent / 100 * len(values)))
+            result[percent]= values[rank - 1]
+        return result
+
+    def stats(self):
+        """Snapshot of the scheduler statistics.
+        returns:
+        -------
+        dict with "cycles", "overruns", "skipped" counters and "latency" and
+        "jitter" percentiles (p50, p90, p99 and max) in seconds
+        """
+        latency= self.percentiles()
+        jitter= self.percentiles(values=self.jitters())
+        return {
+            "cycles": self.cycles,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "latency": {"p50": latency[50], "p90": latency[90],
+                "p99": latency[99], "max": latency[100]},
+            "jitter": {"p50": jitter[50], "p90": jitter[90],
+                "p99": jitter[99], "max": jitter[100]}
+        }
+
+
+class VirtualClock(object):
+    """Clock advancing only when sleeping, e.g. to run a ScanScheduler as
+    fast as possible with deterministic timing:
+        virtual= VirtualClock()
+        ScanScheduler(cycle, 0.1, clock=virtual.clock, sleep=virtual.sleep)
+    """
+    def __init__(self, now=0.0):
+        self.now= now
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now+= seconds
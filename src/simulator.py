@@ -0,0 +1,292 @@
+# Imports
+import os, importlib.util, sys, socket, threading, time
+from pymodbus.datastore import ModbusSequentialDataBlock, \
+    ModbusSlaveContext, ModbusServerContext
+from pymodbus.server.sync import ModbusTcpServer, \
+    ModbusConnectedRequestHandler
+
+# Self-defined imports
+# Long-styled import method is used to preserve import structure
+#   regardless of execution/import method
+# modbusclient
+work_dir= os.path.dirname(os.path.realpath(__file__))
+module_name= "modbusclient"
+file_path= work_dir + "/modbusclient.py"
+spec = importlib.util.spec_from_file_location(module_name, file_path)
+modbusclient = importlib.util.module_from_spec(spec)
+sys.modules[module_name] = modbusclient
+spec.loader.exec_module(modbusclient)
+
+# Modbus read function code of each address space (Modbus data model)
+#   1: coils, 2: discrete inputs, 3: holding registers, 4: input registers
+BIT_FUNCTION_CODES= (0x01, 0x02)
+
+
+class _SimulatorRequestHandler(ModbusConnectedRequestHandler):
+    """Request handler delaying responses by the simulator latency and
+    serializing datastore accesses with the scripted dynamics.
+    """
+
+    def execute(self, request):
+        simulator= self.server.simulator
+        if simulator.latency:
+            time.sleep(simulator.latency)
+        with simulator.lock:
+            simulator.requests+= 1
+            super().execute(request)
+
+
+class _SimulatorServer(ModbusTcpServer):
+    # Don't wait for connected clients on shutdown
+    daemon_threads= True
+    block_on_close= False
+
+
+class FactoryIOSimulator(modbusclient.FactoryIOTagsMixin):
+    """Local Modbus TCP stand-in for the FactoryIO Modbus server.
+    Serves the coils, discrete inputs, holding and input registers of the
+    tags in a FactoryIO tags file, such that clients can be exercised
+    without FactoryIO. Responses can be delayed by a fixed latency and
+    tag values can follow scripted dynamics.
+
+    Usage:
+    -----
+    with FactoryIOSimulator(filepath="./data/tags.csv") as simulator:
+        # Sensor toggling every second
+        simulator.script("S_AL1_B", lambda sim, t, value: int(t) % 2 == 0)
+        client= FactoryIOModbusClient(*simulator.address,
+            filepath="./data/tags.csv")
+        ...
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, *, filepath,
+        tag_table=None, cache_dir=None, data_types=None, latency=0.0,
+        tick=0.01):
+        """Constructor
+        parameters:
+        ----------
+        host: str
+            Address to bind to.
+        port: int
+            TCP port to bind to. 0 to pick a free port, see address.
+        filepath: str
+            Path to FactoryIO tags file.
+        tag_table: tuple
+            tag_table of a client loaded from the same tags file, shared
+            instead of loading filepath again.
+        cache_dir: str
+            Directory caching compiled tags files, keyed by file content.
+            Later constructions with an unchanged tags file skip parsing.
+        data_types: dict
+            Data types of register tags, by tag name or FactoryIO data type,
+            see FMC_functions.apply_data_types.
+        latency: float
+            Seconds each request is delayed by.
+        tick: float
+            Seconds between updates of scripted dynamics. None to only 
+            update them with step(), e.g. in virtual time.
+        """
+        # Load tags
+        self._init_tags(filepath, tag_table, cache_dir, data_types)
+        self.host= host
+        self.port= port
+        self.latency= latency
+        self.tick= tick
+        # Number of requests served
+        self.requests= 0
+        # Lock serializing datastore accesses
+        self.lock= threading.RLock()
+        # Scripted dynamics: tag name -> function
+        self.dynamics= {}
+
+        # Datastore sized to the highest address of each address space
+        sizes= {0x01: 1, 0x02: 1, 0x03: 1, 0x04: 1}
+        for tag in self.tag_index.values():
+            if tag.read_fc is not None and isinstance(tag.address, int):
+                sizes[tag.read_fc]= max(sizes[tag.read_fc],
+                    tag.address + tag.length)
+        self.store= ModbusSlaveContext(
+            co=ModbusSequentialDataBlock(0, [False] * sizes[0x01]),
+            di=ModbusSequentialDataBlock(0, [False] * sizes[0x02]),
+            hr=ModbusSequentialDataBlock(0, [0] * sizes[0x03]),
+            ir=ModbusSequentialDataBlock(0, [0] * sizes[0x04]),
+            zero_mode=True)
+
+        self.server= None
+        self._threads= []
+        self._stopped= threading.Event()
+        self._start_time= None
+
+    # ===================================================================
+    # Server
+    def start(self):
+        """Start serving in background threads.
+        returns:
+        -------
+        (host, port) the server is bound to
+        """
+        if self.server is not None:
+            return self.address
+        self.server= _SimulatorServer(
+            ModbusServerContext(slaves=self.store, single=True),
+            address=(self.host, self.port),
+            handler=_SimulatorRequestHandler, allow_reuse_address=True)
+        self.server.simulator= self
+        self._stopped.clear()
+        self._start_time= time.monotonic()
+        self._threads= [
+            threading.Thread(target=self.server.serve_forever, 
+                kwargs={"poll_interval": 0.05}, daemon=True,
+                name="FactoryIOSimulator-server")
+        ]
+        if self.tick is not None:
+            self._threads.append(threading.Thread(target=self._run_dynamics,
+                daemon=True, name="FactoryIOSimulator-dynamics"))
+        for thread in self._threads:
+            thread.start()
+        return self.address
+
+    def stop(self):
+        """Stop serving and disconnect clients."""
+        if self.server is None:
+            return
+        self._stopped.set()
+        self.server.shutdown()
+        # Wake up connected client handlers
+        for handler in list(self.server.threads):
+            handler.running= False
+            try:
+                handler.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self.server= None
+
+    @property
+    def address(self):
+        """(host, port) the server is bound to."""
+        if self.server is None:
+            return (self.host, self.port)
+        return self.server.server_address[:2]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, klass, value, traceback):
+        self.stop()
+
+    # ===================================================================
+    # Values
+    def get_value(self, tag):
+        """Current value of a tag.
+        parameters:
+        ----------
+        tag: str
+            Tag name
+        returns:
+        -------
+        bool, int or float
+        """
+        tag= self.get_tag(tag)
+        if tag.read_fc is None:
+            raise ValueError("Tag type error")
+        with self.lock:
+            values= self.store.getValues(tag.read_fc, tag.address, tag.length)
+        if tag.read_fc in BIT_FUNCTION_CODES:
+            return bool(values[0])
+        if tag.datatype is not None:
+            return tag.datatype.decode(values)
+        return values[0]
+
+    def set_value(self, tag, value):
+        """Set the value of a tag, e.g. a sensor.
+        parameters:
+        ----------
+        tag: str
+            Tag name
+        value: bool, int or float
+            Value. Values of typed registers are encoded with the tag data
+            type, other register values are rounded and truncated to 16
+            bits.
+        """
+        tag= self.get_tag(tag)
+        if tag.read_fc is None:
+            raise ValueError("Tag type error")
+        if tag.read_fc in BIT_FUNCTION_CODES:
+            values= [bool(value)]
+        elif tag.datatype is not None:
+            values= tag.datatype.encode(value)
+        else:
+            values= [int(round(value)) & 0xFFFF]
+        with self.lock:
+            self.store.setValues(tag.read_fc, tag.address, values)
+
+    # ===================================================================
+    # Dynamics
+    def script(self, tag, function):
+        """Script the dynamics of a tag.
+        parameters:
+        ----------
+        tag: str
+            Tag name
+        function: callable
+            function(simulator, t, value) returning the new value of the
+            tag, called every tick with the seconds since start and the
+            current value. None to remove the tag's dynamics.
+        """
+        # Check tag
+        self.get_tag(tag)
+        with self.lock:
+            if function is None:
+                self.dynamics.pop(tag, None)
+            else:
+                self.dynamics[tag]= function
+
+    def step(self, t=None):
+        """Update all scripted tags once.
+        parameters:
+        ----------
+        t: float
+            Seconds since start. Defaults to the time since start().
+        """
+        if t is None:
+            t= time.monotonic() - (self._start_time or time.monotonic())
+        with self.lock:
+            for tag, function in list(self.dynamics.items()):
+                self.set_value(tag, function(self, t, self.get_value(tag)))
+
+    def _run_dynamics(self):
+        while not self._stopped.wait(self.tick):
+            self.step()
+
+
+def follow(target, speed):
+    """Dynamics moving a value towards the value of another tag.
+    e.g. a position sensor following its set point:
+        simulator.script("AL1_ST_X_POS", follow("AL1_ST_X_SET", 500))
+    parameters:
+    ----------
+    target: str
+        Name of the tag followed.
+    speed: float
+        Maximum change per second.
+    returns:
+    -------
+    function to pass to FactoryIOSimulator.script
+    """
+    state= {"t": None}
+
+    def dynamics(simulator, t, value):
+        last_t, state["t"]= state["t"], t
+        if last_t is None:
+            return value
+        setpoint= simulator.get_value(target)
+        max_step= speed * (t - last_t)
+        if abs(setpoint - value) <= max_step:
+            return setpoint
+        return value + max_step if setpoint > value else value - max_step
+
+    return dynamics
@@ -0,0 +1,688 @@
+# Imports
+import json, queue, struct, sys, threading, time, zlib
+from array import array
+
+
+# ===================================================================
+# Log format
+# File: header, then chunks appended by the writer thread.
+# Header: MAGIC, version and metadata length (HEADER), then the metadata
+#   as UTF-8 JSON: {"tags": [[name, type], ...], "start": wall time,
+#   "compress": bool}, type being "bool", "int" or "float".
+# Chunk: CHUNK_MAGIC, number of events and payload length (CHUNK_HEADER),
+#   then the payload, zlib compressed if "compress": the event columns,
+#   one after the other, little endian: kinds (uint8), tag ids (uint32,
+#   index in "tags") and values (float64).
+MAGIC= b"FIOTRACE"
+VERSION= 1
+HEADER= struct.Struct("<8sHI")
+CHUNK_MAGIC= b"CHNK"
+CHUNK_HEADER= struct.Struct("<4sII")
+
+# Event kinds
+# SCAN: start of a scan, value is the time since the recording start
+# READ, WRITE: value read/written by the controller
+# READ_FAULT, WRITE_FAULT: fault injected, value is the injected value
+# CLEAR_READ_FAULT, CLEAR_WRITE_FAULT: fault removed
+SCAN, READ, WRITE, READ_FAULT, WRITE_FAULT, CLEAR_READ_FAULT, \
+    CLEAR_WRITE_FAULT= range(7)
+# Tag id of events without tag
+NO_TAG= 0xFFFFFFFF
+
+# Fault table kind -> (set event, clear event)
+FAULT_EVENTS= {"read": (READ_FAULT, CLEAR_READ_FAULT),
+    "write": (WRITE_FAULT, CLEAR_WRITE_FAULT)}
+
+def tag_value_type(tag):
+    """Type of the values of a tag in a log: "bool", "int" or "float"."""
+    if tag.read_type in ("read_coils", "read_discrete_inputs") \
+        or tag.write_type == "write_coil":
+        return "bool"
+    if tag.datatype is not None and float in tag.datatype.value_types:
+        return "float"
+    return "int"
+
+# Little endian tag id and value
+TAG_ID= struct.Struct("<I")
+VALUE= struct.Struct("<d")
+NO_TAG_ID= TAG_ID.pack(NO_TAG)
+# Maximum number of tag sets whose packed tag ids are cached
+TAG_ID_CACHE_SIZE= 64
+
+
+# ===================================================================
+# Recorder
+class TraceRecorder(object):
+    """Records the values read and written by a controller, the injected
+    faults and the scan timestamps of a client session to a log file.
+    While recording, read_tag, read_tags, write_tag and write_tags of the
+    client append one event per tag value to in-memory columns. Full
+    columns, and columns older than flush_interval, are handed to a
+    background thread, which compresses and appends them to the log, such
+    that the scan never waits for the disk and a crash loses at most the
+    last flush_interval of the session.
+    Faults are recorded at scan starts, by comparing the fault table with
+    the table of the previous scan (the table being copy-on-write, an
+    unchanged table costs one identity check).
+    Reads through image buffers, process images and subscriptions are not
+    recorded.
+
+    Usage:
+    -----
+    with TraceRecorder(client, "./session.trace") as recorder:
+        while True:
+            recorder.scan()
+            cycle()
+    """
+
+    # Client methods shadowed while recording
+    METHODS= ("read_tag", "read_tags", "write_tag", "write_tags")
+
+    def __init__(self, client, filepath, *, tags=None, chunk_events=16384,
+        flush_interval=1.0, compress=True, clock=time.monotonic):
+        """Constructor
+        parameters:
+        ----------
+        client: FactoryIOModbusClient
+            Client to record.
+        filepath: str
+            Path of the log file, overwritten.
+        tags: iterable of str
+            Tags whose reads and writes are recorded. Defaults to all tags.
+            Faults are recorded for all tags.
+        chunk_events: int
+            Number of events per chunk handed to the writer thread.
+        flush_interval: float
+            Seconds after which recorded events are handed to the writer
+            thread, even if fewer than chunk_events.
+        compress: bool
+            zlib compress the chunks.
+        clock: callable
+            Monotonic clock returning seconds, e.g. the clock of the scan
+            scheduler.
+        """
+        self.client= client
+        self.filepath= filepath
+        self.chunk_events= chunk_events
+        self.flush_interval= flush_interval
+        self.compress= compress
+        self.clock= clock
+        # Tag ids, in the order of the tag index
+        self.tag_names= list(client.tag_index)
+        self.ids= {name: idx for idx, name in enumerate(self.tag_names)}
+        if tags is None:
+            self.recorded= None
+        else:
+            self.recorded= {client.get_tag(tag).name for tag in tags}
+        # Event columns, packed little endian
+        self._kinds= bytearray()
+        self._tags= bytearray()
+        self._values= bytearray()
+        # Tag names of a bulk read/write -> packed tag ids
+        self._tag_id_cache= {}
+        # Serializes appends of concurrent controller threads
+        self._lock= threading.Lock()
+        # Fault table at the last scan
+        self._faults= {"read": {}, "write": {}}
+        # Number of scans and events recorded
+        self.scans= 0
+        self.events= 0
+        # Writer
+        self._queue= None
+        self._thread= None
+        self._file= None
+        self._saved= None
+        self.error= None
+        self.t0= None
+        self._flushed_at= None
+
+    # ===================================================================
+    # Session
+    def start(self):
+        """Write the log header, start the writer thread and start
+        recording the client.
+        """
+        if self._thread is not None:
+            return
+        metadata= {"tags": [[name, tag_value_type(self.client.tag_index[name])]
+            for name in self.tag_names], "start": time.time(),
+            "compress": self.compress}
+        metadata= json.dumps(metadata).encode("utf-8")
+        self._file= open(self.filepath, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, len(metadata)))
+        self._file.write(metadata)
+        self._file.flush()
+        self._queue= queue.Queue()
+        self._thread= threading.Thread(target=self._write_chunks,
+            daemon=True, name="TraceRecorder-writer")
+        self._thread.start()
+        self.t0= self._flushed_at= self.clock()
+        self._attach()
+
+    def close(self):
+        """Stop recording, write the pending events and close the log.
+        raises:
+        ------
+        OSError if the writer thread failed to write the log
+        """
+        if self._thread is None:
+            return
+        self._detach()
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        self._thread= None
+        self._file.close()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, klass, value, traceback):
+        self.close()
+
+    def _attach(self):
+        """Shadow the read/write methods of the client with recording
+        wrappers, keeping any method already shadowed (e.g. by the client
+        instrumentation).
+        """
+        client= self.client
+        self._saved= {name: vars(client).get(name) for name in self.METHODS}
+        lock= self._lock
+        kinds, tag_ids, values= self._kinds, self._tags, self._values
+        ids= self.ids
+        packed_ids= [TAG_ID.pack(idx) for idx in range(len(self.tag_names))]
+        pack_value= VALUE.pack
+        recorded= self.recorded
+        tag_id_cache= self._tag_id_cache
+        maybe_flush= self._maybe_flush
+        _read_tag= client.read_tag
+        _read_tags= client.read_tags
+        _write_tag= client.write_tag
+        _write_tags= client.write_tags
+
+        def record(kind, name, value):
+            if recorded is None or name in recorded:
+                with lock:
+                    kinds.append(kind)
+                    tag_ids.extend(packed_ids[ids[name]])
+                    values.extend(pack_value(value))
+                maybe_flush()
+
+        def record_many(kind, items):
+            if recorded is not None:
+                items= {name: value for name, value in items.items()
+                    if name in recorded}
+            count= len(items)
+            # Bulk calls of a controller usually repeat the same tag sets
+            key= tuple(items)
+            packed= tag_id_cache.get(key)
+            if packed is None:
+                if len(tag_id_cache) >= TAG_ID_CACHE_SIZE:
+                    tag_id_cache.clear()
+                packed= tag_id_cache[key]= struct.pack(
+                    "<{}I".format(count), *map(ids.__getitem__, key))
+            packed_values= struct.pack("<{}d".format(count), *items.values())
+            with lock:
+                kinds.extend(bytes((kind,)) * count)
+                tag_ids.extend(packed)
+                values.extend(packed_values)
+            maybe_flush()
+
+        def read_tag(tag):
+            value= _read_tag(tag)
+            record(READ, tag, value)
+            return value
+
+        def read_tags(tags, max_gap=8):
+            result= _read_tags(tags, max_gap)
+            record_many(READ, result)
+            return result
+
+        def write_tag(tag, value):
+            response= _write_tag(tag, value)
+            record(WRITE, tag, value)
+            return response
+
+        def write_tags(values):
+            status= _write_tags(values)
+            record_many(WRITE, values)
+            return status
+
+        client.read_tag= read_tag
+        client.read_tags= read_tags
+        client.write_tag= write_tag
+        client.write_tags= write_tags
+
+    def _detach(self):
+        """Restore the client methods."""
+        client= self.client
+        for name, method in self._saved.items():
+            if method is None:
+                vars(client).pop(name, None)
+            else:
+                setattr(client, name, method)
+
+    # ===================================================================
+    # Recording
+    def scan(self):
+        """Mark the start of a scan. Faults injected or cleared since the
+        previous scan are recorded.
+        """
+        t= self.clock() - self.t0
+        fault_tags= self.client.fault_tags
+        with self._lock:
+            self._kinds.append(SCAN)
+            self._tags.extend(NO_TAG_ID)
+            self._values.extend(VALUE.pack(t))
+            if fault_tags is not self._faults:
+                self._record_faults(self._faults, fault_tags)
+                self._faults= fault_tags
+        self.scans+= 1
+        self._maybe_flush()
+
+    def _record_faults(self, old_table, new_table):
+        """Record the differences between two fault tables."""
+        for kind, (set_kind, clear_kind) in FAULT_EVENTS.items():
+            old, new= old_table[kind], new_table[kind]
+            if old is new:
+                continue
+            for name, value in new.items():
+                if name not in old or old[name] != value:
+                    self._kinds.append(set_kind)
+                    self._tags.extend(TAG_ID.pack(self.ids[name]))
+                    self._values.extend(VALUE.pack(value))
+            for name in old:
+                if name not in new:
+                    self._kinds.append(clear_kind)
+                    self._tags.extend(TAG_ID.pack(self.ids[name]))
+                    self._values.extend(VALUE.pack(0.0))
+
+    def wrap(self, cycle):
+        """Cycle function marking the scan before each cycle, e.g. for a
+        ScanScheduler.
+        parameters:
+        ----------
+        cycle: callable
+            Controller cycle, called without arguments.
+        returns:
+        -------
+        callable
+        """
+        scan= self.scan
+        def recorded_cycle():
+            scan()
+            cycle()
+        return recorded_cycle
+
+    def _maybe_flush(self):
+        if len(self._kinds) >= self.chunk_events \
+            or self.clock() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Hand the recorded events to the writer thread."""
+        with self._lock:
+            self._flushed_at= self.clock()
+            count= len(self._kinds)
+            if count == 0 or self._queue is None:
+                return
+            chunk= (count, bytes(self._kinds), bytes(self._tags),
+                bytes(self._values))
+            # Columns are cleared in place, the wrappers keep references
+            del self._kinds[:]
+            del self._tags[:]
+            del self._values[:]
+        self.events+= count
+        self._queue.put(chunk)
+
+    def _write_chunks(self):
+        """Writer thread: compress and append chunks to the log."""
+        while True:
+            chunk= self._queue.get()
+            if chunk is None:
+                return
+            if self.error is not None:
+                continue
+            count, kinds, tags, values= chunk
+            payload= kinds + tags + values
+            if self.compress:
+                payload= zlib.compress(payload, 1)
+            try:
+                self._file.write(CHUNK_HEADER.pack(CHUNK_MAGIC, count,
+                    len(payload)))
+                self._file.write(payload)
+                # Readable up to the last chunk if the session crashes
+                self._file.flush()
+            except OSError as error:
+                self.error= error
+
+
+# ===================================================================
+# Reader
+class Scan(object):
+    """Events of one recorded scan.
+    attributes:
+    ----------
+    index: int
+        Scan number, -1 for the events recorded before the first scan.
+    t: float
+        Seconds since the recording start, None for index -1.
+    reads: dict
+        Tag name -> list of the values read, in order.
+    writes: dict
+        Tag name -> last value written.
+    faults: list
+        (event kind, tag name, value) of the faults injected or cleared
+        before the scan.
+    """
+    __slots__= ("index", "t", "reads", "writes", "faults")
+
+    def __init__(self, index, t):
+        self.index= index
+        self.t= t
+        self.reads= {}
+        self.writes= {}
+        self.faults= []
+
+    def __repr__(self):
+        return "Scan({}, t={}, reads={}, writes={}, faults={})".format(
+            self.index, self.t, len(self.reads), len(self.writes),
+            len(self.faults))
+
+
+class TraceLog(object):
+    """Recorded log file, see TraceRecorder.
+    Chunks are read lazily, such that long sessions are not loaded in
+    memory at once. A log truncated by a crash is read up to its last
+    complete chunk.
+
+    Usage:
+    -----
+    log= TraceLog("./session.trace")
+    for scan in log.scans():
+        print(scan.t, scan.reads, scan.writes)
+    """
+
+    def __init__(self, filepath):
+        """Constructor
+        parameters:
+        ----------
+        filepath: str
+            Path of the log file.
+        raises:
+        ------
+        ValueError if the file is not a trace log
+        """
+        self.filepath= filepath
+        with open(filepath, "rb") as log_file:
+            header= log_file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError("Not a trace log: {}".format(filepath))
+            magic, version, length= HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError("Not a trace log: {}".format(filepath))
+            if version != VERSION:
+                raise ValueError(
+                    "Unsupported trace log version: {}".format(version))
+            self.metadata= json.loads(log_file.read(length).decode("utf-8"))
+            self._offset= log_file.tell()
+        self.tag_names= [name for name, _ in self.metadata["tags"]]
+        self.types= dict(self.metadata["tags"])
+        self.compress= self.metadata["compress"]
+
+    def chunks(self):
+        """Event columns of each chunk.
+        returns:
+        -------
+        generator of (kinds, tag ids, values) arrays
+        """
+        with open(self.filepath, "rb") as log_file:
+            log_file.seek(self._offset)
+            while True:
+                header= log_file.read(CHUNK_HEADER.size)
+                if len(header) < CHUNK_HEADER.size:
+                    return
+                magic, count, length= CHUNK_HEADER.unpack(header)
+                payload= log_file.read(length)
+                if magic != CHUNK_MAGIC or len(payload) < length:
+                    return
+                if self.compress:
+                    payload= zlib.decompress(payload)
+                kinds, tags, values= array("B"), array("I"), array("d")
+                kinds.frombytes(payload[:count])
+                tags.frombytes(payload[count:5 * count])
+                values.frombytes(payload[5 * count:13 * count])
+                if sys.byteorder == "big":
+                    tags.byteswap()
+                    values.byteswap()
+                yield kinds, tags, values
+
+    def events(self):
+        """Recorded events.
+        returns:
+        -------
+        generator of (event kind, tag name or None, value) tuples, values
+        of tag events having the type of the tag
+        """
+        names= self.tag_names
+        casts= [{"bool": bool, "int": int}.get(self.types[name], float)
+            for name in names]
+        for kinds, tags, values in self.chunks():
+            for kind, tag, value in zip(kinds, tags, values):
+                if tag == NO_TAG:
+                    yield kind, None, value
+                elif kind in (CLEAR_READ_FAULT, CLEAR_WRITE_FAULT):
+                    yield kind, names[tag], None
+                else:
+                    yield kind, names[tag], casts[tag](value)
+
+    def scans(self):
+        """Recorded scans.
+        returns:
+        -------
+        generator of Scan
+        """
+        scan= Scan(-1, None)
+        for kind, name, value in self.events():
+            if kind == SCAN:
+                if scan.index >= 0 or scan.reads or scan.writes \
+                    or scan.faults:
+                    yield scan
+                scan= Scan(scan.index + 1, value)
+            elif kind == READ:
+                scan.reads.setdefault(name, []).append(value)
+            elif kind == WRITE:
+                scan.writes[name]= value
+            else:
+                scan.faults.append((kind, name, value))
+        if scan.index >= 0 or scan.reads or scan.writes or scan.faults:
+            yield scan
+
+
+# ===================================================================
+# Replay
+class _ReplayResponse(object):
+    """Write response of a replayed write."""
+    def isError(self):
+        return False
+
+
+class TraceReplay(object):
+    """Stand-in for FactoryIOModbusClient replaying a recorded session,
+    without server. Each scan serves the values read during the same
+    recorded scan (in order, the last one being repeated), or the last
+    value recorded for the tag in earlier scans. Writes are collected and
+    compared with the recorded writes.
+    Faults injected through the replay client override the values read.
+    Recorded faults are already part of the recorded values and are
+    exposed in recorded_faults.
+
+    Usage:
+    -----
+    replay= TraceReplay("./session.trace")
+    cycle= make_cycle(replay)
+    mismatches= replay.replay(cycle)
+    """
+
+    def __init__(self, trace):
+        """Constructor
+        parameters:
+        ----------
+        trace: TraceLog or str
+            Log, or path of the log file.
+        """
+        self.trace= trace if isinstance(trace, TraceLog) else TraceLog(trace)
+        self._scans= self.trace.scans()
+        self._upcoming= next(self._scans, None)
+        self.scan= None
+        # Last value recorded of each tag
+        self.last_values= {}
+        # Writes of the current scan
+        self.writes= {}
+        self.fault_tags= {"read": {}, "write": {}}
+        # Recorded fault table
+        self.recorded_faults= {"read": {}, "write": {}}
+
+    def next_scan(self):
+        """Advance to the next recorded scan.
+        returns:
+        -------
+        Scan, None at the end of the log
+        """
+        if self.scan is not None:
+            for name, values in self.scan.reads.items():
+                self.last_values[name]= values[-1]
+        self.scan= self._upcoming
+        self.writes= {}
+        if self.scan is not None:
+            self._upcoming= next(self._scans, None)
+            for kind, name, value in self.scan.faults:
+                if kind in (READ_FAULT, WRITE_FAULT):
+                    table= "read" if kind == READ_FAULT else "write"
+                    self.recorded_faults[table][name]= value
+                else:
+                    table= "read" if kind == CLEAR_READ_FAULT else "write"
+                    self.recorded_faults[table].pop(name, None)
+        return self.scan
+
+    def peek_scan(self):
+        """Next recorded scan, without advancing to it.
+        returns:
+        -------
+        Scan, None at the end of the log
+        """
+        return self._upcoming
+
+    def replay(self, cycle, scans=None):
+        """Run a controller cycle once per recorded scan.
+        parameters:
+        ----------
+        cycle: callable
+            Controller cycle using this object as client.
+        scans: int
+            Maximum number of scans to replay. None for all.
+        returns:
+        -------
+        list of mismatches, dicts with "scan", "tag", "recorded" and
+        "replayed" values written (None if not written)
+        """
+        mismatches= []
+        replayed= 0
+        while scans is None or replayed < scans:
+            scan= self.next_scan()
+            if scan is None:
+                break
+            if scan.index < 0:
+                continue
+            cycle()
+            replayed+= 1
+            for name in list(scan.writes) + [name for name in self.writes
+                if name not in scan.writes]:
+                recorded= scan.writes.get(name)
+                value= self.writes.get(name)
+                if recorded != value:
+                    mismatches.append({"scan": scan.index, "tag": name,
+                        "recorded": recorded, "replayed": value})
+        return mismatches
+
+    # ===================================================================
+    # Client API
+    def connect(self):
+        return True
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, klass, value, traceback):
+        self.close()
+
+    def _check_tag(self, tag):
+        if tag not in self.trace.types:
+            raise ValueError(
+                "No tag with specified tag name: {}".format(tag))
+
+    def read_tag(self, tag):
+        """Recorded value of a tag, read faults applied.
+        raises:
+        ------
+        ValueError if no value of the tag is recorded yet
+        """
+        read_faults= self.fault_tags["read"]
+        if tag in read_faults:
+            return read_faults[tag]
+        if self.scan is not None:
+            values= self.scan.reads.get(tag)
+            if values:
+                return values.pop(0) if len(values) > 1 else values[0]
+        try:
+            return self.last_values[tag]
+        except KeyError:
+            self._check_tag(tag)
+            raise ValueError(
+                "No recorded value of tag: {}".format(tag)) from None
+
+    def read_tags(self, tags, max_gap=8):
+        return {tag: self.read_tag(tag) for tag in tags}
+
+    def write_tag(self, tag, value):
+        self._check_tag(tag)
+        self.writes[tag]= value
+        return _ReplayResponse()
+
+    def write_tags(self, values):
+        for tag, value in values.items():
+            self.write_tag(tag, value)
+        return {tag: True for tag in values}
+
+    def read_fault(self, tag, value):
+        self._check_tag(tag)
+        self._set_fault("read", tag, value)
+        return True
+
+    def write_fault(self, tag, value):
+        self._check_tag(tag)
+        self._set_fault("write", tag, value)
+        return True
+
+    def _set_fault(self, kind, name, value):
+        faults= dict(self.fault_tags[kind])
+        if value is None:
+            faults.pop(name, None)
+        else:
+            faults[name]= value
+        self.fault_tags= dict(self.fault_tags, **{kind: faults})
+
+    def clear_fault(self, tag, kind=None):
+        self._check_tag(tag)
+        for fault_kind in ("read", "write"):
+            if kind is None or kind == fault_kind:
+                self._set_fault(fault_kind, tag, None)
+
+    def clear_faults(self):
+        self.fault_tags= {"read": {}, "write": {}}
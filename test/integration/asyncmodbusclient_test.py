@@ -0,0 +1,186 @@
+# Imports
+import unittest, os, asyncio, threading
+import pandas as pd
+from pymodbus.datastore import ModbusSequentialDataBlock, \
+    ModbusSlaveContext, ModbusServerContext
+from pymodbus.server.sync import ModbusTcpServer
+from pymodbus.exceptions import ConnectionException
+
+# Self-defined imports
+from src.asyncmodbusclient import AsyncFactoryIOModbusClient
+
+class AsyncFactoryIOModbusClientTest(unittest.IsolatedAsyncioTestCase):
+    # Setup mock FactoryIO tags
+    mock_tags_dict= {
+        "Name": ["S_AL1_B", "S_AL1_B1", "AL2_ST_GRAB", "AL2_ST_Z_POS",
+            "AL1_Z_SET", "AL1_Y_SET"],
+        "Type": ["Input", "Input", "Output", "Input", "Output", "Output"],
+        "Data Type": ["Bool", "Bool", "Bool", "Real", "Real", "Real"],
+        "Address": ["Input 0", "Input 3", "Coil 54", "Input Reg 11",
+            "Holding Reg 2", "Holding Reg 3"]
+    }
+    MOCK_TAGS_PATH= "./test/integration/mock_async_tags.csv"
+
+    # SETUP
+    # ===================================================================================
+    @classmethod
+    def setUpClass(cls):
+        # Create mock tags dataframe
+        mock_tags_df= pd.DataFrame.from_dict(
+            AsyncFactoryIOModbusClientTest.mock_tags_dict)
+        # Save to file
+        mock_tags_df.to_csv(AsyncFactoryIOModbusClientTest.MOCK_TAGS_PATH,
+            index=False)
+        # Start local Modbus TCP server
+        cls.store= ModbusSlaveContext(
+            di=ModbusSequentialDataBlock(0, [0] * 100),
+            co=ModbusSequentialDataBlock(0, [0] * 100),
+            hr=ModbusSequentialDataBlock(0, [0] * 100),
+            ir=ModbusSequentialDataBlock(0, [0] * 100),
+            zero_mode=True)
+        cls.server= ModbusTcpServer(ModbusServerContext(slaves=cls.store,
+            single=True), address=("127.0.0.1", 0))
+        cls.server_thread= threading.Thread(target=cls.server.serve_forever,
+            daemon=True)
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        # Stop server
+        cls.server.shutdown()
+        cls.server.server_close()
+        # Delete
+        os.remove(AsyncFactoryIOModbusClientTest.MOCK_TAGS_PATH)
+
+    async def asyncSetUp(self):
+        # Server values
+        self.store.setValues(2, 0, [1, 0, 0, 1])
+        self.store.setValues(4, 11, [321])
+        # Initialize and connect AsyncFactoryIOModbusClient object
+        self.fmc= AsyncFactoryIOModbusClient("127.0.0.1", 
+            self.server.server_address[1],
+            filepath= AsyncFactoryIOModbusClientTest.MOCK_TAGS_PATH)
+        self.assertTrue(await self.fmc.connect())
+
+    async def asyncTearDown(self):
+        await self.fmc.close()
+
+    # ===================================================================================
+    # TESTING
+    # ===================================================================================
+    # __init__
+    def test_constructor(self):
+        self.assertEqual(
+            self.fmc.fault_tags,
+            { "read": {}, "write": {} }
+        )
+        self.assertEqual(self.fmc.tag_index["AL2_ST_GRAB"].address, 54)
+
+    # ===================================================================================
+    # read_tag
+    async def test_read_tag1(self):
+        self.assertIs(await self.fmc.read_tag("S_AL1_B"), True)
+        self.assertIs(await self.fmc.read_tag("S_AL1_B1"), True)
+        self.assertEqual(await self.fmc.read_tag("AL2_ST_Z_POS"), 321)
+
+    async def test_read_tag2(self):
+        # Pipelined requests over one connection
+        names= ["S_AL1_B", "S_AL1_B1", "AL2_ST_Z_POS"] * 10
+        tasks= [asyncio.ensure_future(self.fmc.read_tag(name)) 
+            for name in names]
+        await asyncio.sleep(0)
+        self.assertEqual(len(self.fmc._pending), len(names))
+        values= await asyncio.gather(*tasks)
+        self.assertEqual(values, [True, True, 321] * 10)
+
+    async def test_read_tag3(self):
+        # Read fault
+        self.assertTrue(self.fmc.read_fault("AL2_ST_Z_POS", 500))
+        self.assertEqual(await self.fmc.read_tag("AL2_ST_Z_POS"), 500)
+
+    async def test_read_tag_fail1(self):
+        with self.assertRaises(ValueError):
+            await self.fmc.read_tag("TAG_NOT_PRESENT")
+
+    # ===================================================================================
+    # read_tags
+    async def test_read_tags1(self):
+        self.assertTrue(self.fmc.read_fault("S_AL1_B1", False))
+        self.assertEqual(
+            await self.fmc.read_tags(["S_AL1_B", "S_AL1_B1", "AL2_ST_Z_POS"]),
+            {"S_AL1_B": True, "S_AL1_B1": False, "AL2_ST_Z_POS": 321})
+
+    # ===================================================================================
+    # write_tag
+    async def test_write_tag1(self):
+        response= await self.fmc.write_tag("AL2_ST_GRAB", True)
+        self.assertFalse(response.isError())
+        self.assertEqual(self.store.getValues(1, 54, 1), [True])
+        # Write fault
+        self.assertTrue(self.fmc.write_fault("AL1_Z_SET", 400))
+        await self.fmc.write_tag("AL1_Z_SET", 700)
+        self.assertEqual(self.store.getValues(3, 2, 1), [400])
+
+    async def test_write_tag_fail1(self):
+        with self.assertRaises(ValueError):
+            await self.fmc.write_tag("AL2_ST_GRAB", 5)
+
+    # ===================================================================================
+    # write_tags
+    async def test_write_tags1(self):
+        status= await self.fmc.write_tags({"AL2_ST_GRAB": False, 
+            "AL1_Z_SET": 5, "AL1_Y_SET": 6})
+        self.assertEqual(status, 
+            {"AL2_ST_GRAB": True, "AL1_Z_SET": True, "AL1_Y_SET": True})
+        self.assertEqual(self.store.getValues(1, 54, 1), [False])
+        self.assertEqual(self.store.getValues(3, 2, 2), [5, 6])
+
+    async def test_write_tags2(self):
+        # Transport error reported as failed writes
+        async def drain():
+            raise ConnectionResetError("Connection reset by peer")
+        self.fmc._writer.drain= drain
+        self.assertEqual(await self.fmc.write_tags({"AL2_ST_GRAB": True,
+            "AL1_Z_SET": 5}), {"AL2_ST_GRAB": False, "AL1_Z_SET": False})
+
+    # ===================================================================================
+    # close
+    async def test_close1(self):
+        await self.fmc.close()
+        self.assertFalse(self.fmc.is_socket_open())
+        with self.assertRaises(ConnectionException):
+            await self.fmc.read_tag("S_AL1_B")
+
+    async def test_close2(self):
+        # Receiver failure raised by the outstanding requests at once, the
+        #   connection dropped
+        self.fmc.timeout= 10
+        def decode(pdu):
+            raise RuntimeError("Decoder failure")
+        self.fmc.decoder.decode= decode
+        with self.assertRaisesRegex(RuntimeError, "Decoder failure"):
+            await asyncio.wait_for(self.fmc.read_tag("S_AL1_B"), 2)
+        self.assertFalse(self.fmc.is_socket_open())
+        with self.assertRaises(ConnectionException):
+            await self.fmc.read_tag("S_AL1_B")
+
+    async def test_close3(self):
+        # Malformed response header fails the connection
+        async def handle(reader, writer):
+            await reader.read(12)
+            writer.write(b"\x00\x01\x00\x00\x00\x00\x01")
+            await writer.drain()
+        server= await asyncio.start_server(handle, "127.0.0.1", 0)
+        fmc= AsyncFactoryIOModbusClient("127.0.0.1",
+            server.sockets[0].getsockname()[1],
+            filepath= AsyncFactoryIOModbusClientTest.MOCK_TAGS_PATH)
+        fmc.timeout= 10
+        try:
+            self.assertTrue(await fmc.connect())
+            with self.assertRaisesRegex(ConnectionException, "MBAP length"):
+                await asyncio.wait_for(fmc.read_tag("S_AL1_B"), 2)
+            self.assertFalse(fmc.is_socket_open())
+        finally:
+            await fmc.close()
+            server.close()
+            await server.wait_closed()
@@ -0,0 +1,177 @@
+# Imports
+import unittest, os, json
+from unittest.mock import MagicMock
+import pandas as pd
+
+# Self-defined imports
+from src.modbusclient import FactoryIOModbusClient
+from src.scanscheduler import ScanScheduler, VirtualClock
+from src.campaign import FaultCampaign, read_schedule
+
+class FaultCampaignTest(unittest.TestCase):
+    # Setup mock FactoryIO tags
+    mock_tags_dict= {
+        "Name": ["ST_AL1_ST1", "AL1_ST_Z_POS", "AL1_ST_X_SET", "AL1_GRAB"],
+        "Type": ["Input", "Input", "Output", "Output"],
+        "Data Type": ["Bool", "Real", "Real", "Bool"],
+        "Address": ["Input 0", "Input Reg 11", "Holding Reg 2", "Coil 4"]
+    }
+    MOCK_TAGS_PATH= "./test/integration/mock_campaign_tags.csv"
+    MOCK_SCHEDULE_PATH= "./test/integration/mock_campaign.json"
+
+    # SETUP
+    # ===================================================================================
+    @classmethod
+    def setUpClass(cls):
+        # Create mock tags dataframe
+        mock_tags_df= pd.DataFrame.from_dict(FaultCampaignTest.mock_tags_dict)
+        # Save to file
+        mock_tags_df.to_csv(FaultCampaignTest.MOCK_TAGS_PATH, index=False)
+        # Mock schedule
+        with open(FaultCampaignTest.MOCK_SCHEDULE_PATH, "w") as schedule_file:
+            json.dump({"faults": [
+                {"tag": "AL1_ST_X_SET", "mode": "stuck", "value": 700, 
+                    "at": 0.5, "duration": 0.5},
+                {"tag": "ST_AL1_ST1", "mode": "flip", "every": 5}
+            ]}, schedule_file)
+
+    @classmethod
+    def tearDownClass(cls):
+        # Delete
+        os.remove(FaultCampaignTest.MOCK_TAGS_PATH)
+        os.remove(FaultCampaignTest.MOCK_SCHEDULE_PATH)
+
+    def setUp(self):
+        # Initialize FactoryIOModbusClient object
+        self.fmc= FactoryIOModbusClient("127.0.0.1",
+            filepath= FaultCampaignTest.MOCK_TAGS_PATH)
+        # Stub sensor reads
+        self.fmc.read_discrete_inputs= MagicMock()
+        self.fmc.read_discrete_inputs.return_value.getBit.return_value= False
+        self.virtual= VirtualClock()
+
+    def run_campaign(self, schedule, cycles, period=0.1):
+        """Run a campaign for cycles scans of period seconds, returning the
+        fault table seen by each cycle."""
+        campaign= FaultCampaign(self.fmc, schedule, clock=self.virtual.clock)
+        seen= []
+        def cycle():
+            seen.append(self.fmc.fault_tags)
+        scheduler= ScanScheduler(campaign.wrap(cycle), period, 
+            clock=self.virtual.clock, sleep=self.virtual.sleep)
+        scheduler.run(cycles=cycles)
+        campaign.finish()
+        return campaign, seen
+
+    # ===================================================================================
+    # TESTING
+    # ===================================================================================
+    # read_schedule
+    def test_read_schedule1(self):
+        schedule= read_schedule(FaultCampaignTest.MOCK_SCHEDULE_PATH)
+        self.assertEqual(len(schedule), 2)
+        self.assertEqual(schedule[1]["mode"], "flip")
+
+    # ===================================================================================
+    # step
+    def test_step1(self):
+        # Stuck write fault during its time window
+        campaign, seen= self.run_campaign([{"tag": "AL1_ST_X_SET", 
+            "value": 700, "at": 0.5, "duration": 0.375}], 10, period=0.125)
+        self.assertEqual([faults["write"].get("AL1_ST_X_SET") 
+            for faults in seen], [None] * 4 + [700] * 3 + [None] * 3)
+        self.assertEqual(campaign.records, [{"tag": "AL1_ST_X_SET", 
+            "kind": "write", "mode": "stuck", "value": 700, "start": 0.5,
+            "start_scan": 4, "end": 0.875, "end_scan": 7}])
+
+    def test_step2(self):
+        # Flip every 5th scan
+        campaign, seen= self.run_campaign([{"tag": "ST_AL1_ST1", 
+            "mode": "flip", "every": 5}], 12)
+        self.assertEqual([faults["read"].get("ST_AL1_ST1") for faults in seen],
+            [True, None, None, None, None] * 2 + [True, None])
+        self.assertEqual([record["start_scan"] for record in 
+            campaign.records], [0, 5, 10])
+        self.assertEqual(campaign.records[-1]["end_scan"], 11)
+        # Faults cleared when the campaign ends
+        self.assertEqual(self.fmc.fault_tags, {"read": {}, "write": {}})
+
+    def test_step3(self):
+        # Ramp over a scan window
+        campaign, seen= self.run_campaign([{"tag": "AL1_ST_Z_POS", 
+            "mode": "ramp", "value": 0, "end_value": 400, "at_scan": 2,
+            "scans": 4}], 8)
+        self.assertEqual([faults["read"].get("AL1_ST_Z_POS") 
+            for faults in seen], [None, None, 0, 100, 200, 300, None, None])
+        self.assertEqual(len(campaign.records), 1)
+
+    def test_step4(self):
+        # Faults of the schedule file, applied concurrently
+        schedule= read_schedule(FaultCampaignTest.MOCK_SCHEDULE_PATH)
+        campaign, seen= self.run_campaign(schedule, 10)
+        self.assertEqual(seen[5], {"read": {"ST_AL1_ST1": True}, 
+            "write": {"AL1_ST_X_SET": 700}})
+        self.assertEqual(len(campaign.records), 3)
+
+    def test_step5(self):
+        # Flip of the live value, on every scan of the window
+        campaign= FaultCampaign(self.fmc, [{"tag": "ST_AL1_ST1",
+            "mode": "flip", "at_scan": 1, "scans": 3}],
+            clock=self.virtual.clock)
+        getBit= self.fmc.read_discrete_inputs.return_value.getBit
+        injected= []
+        for sensor in [False, False, True, True, False]:
+            getBit.return_value= sensor
+            campaign.step()
+            injected.append(self.fmc.fault_tags["read"].get("ST_AL1_ST1"))
+        self.assertEqual(injected, [None, True, False, False, None])
+        self.assertEqual(len(campaign.records), 1)
+
+    def test_step6(self):
+        # Fault injected by hand restored at the end of the window
+        self.fmc.read_fault("AL1_ST_Z_POS", 5)
+        campaign, seen= self.run_campaign([{"tag": "AL1_ST_Z_POS",
+            "value": 100, "at_scan": 1, "scans": 2}], 4)
+        self.assertEqual([faults["read"].get("AL1_ST_Z_POS")
+            for faults in seen], [5, 100, 100, 5])
+        self.assertEqual(self.fmc.fault_tags["read"], {"AL1_ST_Z_POS": 5})
+
+    @unittest.expectedFailure
+    def test_campaign_fail1(self):
+        # Unknown tag
+        FaultCampaign(self.fmc, [{"tag": "TAG_NOT_PRESENT", "value": True}])
+
+    @unittest.expectedFailure
+    def test_campaign_fail2(self):
+        # Flip of a register
+        FaultCampaign(self.fmc, [{"tag": "AL1_ST_Z_POS", "mode": "flip"}])
+
+    @unittest.expectedFailure
+    def test_campaign_fail3(self):
+        # Ramp without window length
+        FaultCampaign(self.fmc, [{"tag": "AL1_ST_Z_POS", "mode": "ramp",
+            "value": 0, "end_value": 10, "at": 1}])
+
+    @unittest.expectedFailure
+    def test_campaign_fail4(self):
+        # Value type not matching the tag, rejected before the campaign
+        FaultCampaign(self.fmc, [{"tag": "AL1_ST_X_SET", "value": True,
+            "at": 100}])
+
+    @unittest.expectedFailure
+    def test_campaign_fail6(self):
+        # Scan window start with a time window length
+        FaultCampaign(self.fmc, [{"tag": "AL1_ST_Z_POS", "value": 5,
+            "at_scan": 2, "duration": 1.0}])
+
+    @unittest.expectedFailure
+    def test_campaign_fail7(self):
+        # Time and scan window lengths
+        FaultCampaign(self.fmc, [{"tag": "AL1_ST_Z_POS", "value": 5,
+            "duration": 1.0, "scans": 3}])
+
+    @unittest.expectedFailure
+    def test_campaign_fail5(self):
+        # Ramp to a float on an untyped register
+        FaultCampaign(self.fmc, [{"tag": "AL1_ST_Z_POS", "mode": "ramp",
+            "value": 0, "end_value": 10.5, "scans": 10}])
@@ -0,0 +1,187 @@
+# Imports
+import unittest, os, threading, time
+import pandas as pd
+from pymodbus.datastore import ModbusSequentialDataBlock, \
+    ModbusSlaveContext, ModbusServerContext
+from pymodbus.server.sync import ModbusTcpServer
+
+# Self-defined imports
+from src.clientpool import FactoryIOClientPool
+
+class FactoryIOClientPoolTest(unittest.TestCase):
+    # Setup mock FactoryIO tags
+    mock_tags_dict= {
+        "Name": ["S_AL1_B", "AL2_ST_GRAB", "AL2_ST_Z_POS", "AL1_Z_SET"],
+        "Type": ["Input", "Output", "Input", "Output"],
+        "Data Type": ["Bool", "Bool", "Real", "Real"],
+        "Address": ["Input 0", "Coil 54", "Input Reg 11", "Holding Reg 2"]
+    }
+    MOCK_TAGS_PATH= "./test/integration/mock_pool_tags.csv"
+    mock_tags_dict2= {
+        "Name": ["S1", "A1"],
+        "Type": ["Input", "Output"],
+        "Data Type": ["Bool", "Bool"],
+        "Address": ["Input 1", "Coil 2"]
+    }
+    MOCK_TAGS_PATH2= "./test/integration/mock_pool_tags2.csv"
+
+    # SETUP
+    # ===================================================================================
+    @classmethod
+    def setUpClass(cls):
+        # Create mock tags files
+        pd.DataFrame.from_dict(FactoryIOClientPoolTest.mock_tags_dict).to_csv(
+            FactoryIOClientPoolTest.MOCK_TAGS_PATH, index=False)
+        pd.DataFrame.from_dict(FactoryIOClientPoolTest.mock_tags_dict2).to_csv(
+            FactoryIOClientPoolTest.MOCK_TAGS_PATH2, index=False)
+        # Start local Modbus TCP server
+        cls.store= ModbusSlaveContext(
+            di=ModbusSequentialDataBlock(0, [1, 1] + [0] * 98),
+            co=ModbusSequentialDataBlock(0, [0] * 100),
+            hr=ModbusSequentialDataBlock(0, [0] * 100),
+            ir=ModbusSequentialDataBlock(0, [0] * 11 + [321] + [0] * 88),
+            zero_mode=True)
+        cls.server= ModbusTcpServer(ModbusServerContext(slaves=cls.store,
+            single=True), address=("127.0.0.1", 0))
+        cls.server_thread= threading.Thread(target=cls.server.serve_forever,
+            daemon=True)
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        # Stop server
+        cls.server.shutdown()
+        cls.server.server_close()
+        # Delete
+        os.remove(FactoryIOClientPoolTest.MOCK_TAGS_PATH)
+        os.remove(FactoryIOClientPoolTest.MOCK_TAGS_PATH2)
+
+    def setUp(self):
+        port= self.server.server_address[1]
+        self.pool= FactoryIOClientPool(max_workers=2)
+        self.pool.add_scene("cell1", "127.0.0.1", port,
+            filepath=FactoryIOClientPoolTest.MOCK_TAGS_PATH)
+        self.pool.add_scene("cell2", "127.0.0.1", port,
+            filepath=FactoryIOClientPoolTest.MOCK_TAGS_PATH)
+        self.pool.add_scene("dummy", "127.0.0.1", port,
+            filepath=FactoryIOClientPoolTest.MOCK_TAGS_PATH2)
+
+    def tearDown(self):
+        self.pool.close()
+
+    # ===================================================================================
+    # TESTING
+    # ===================================================================================
+    # add_scene
+    def test_add_scene1(self):
+        self.assertEqual(len(self.pool), 3)
+        # Tag tables are shared between scenes with the same tags file
+        self.assertIs(self.pool["cell1"].tag_index, 
+            self.pool["cell2"].tag_index)
+        self.assertIsNot(self.pool["cell1"].tag_index, 
+            self.pool["dummy"].tag_index)
+        # But fault tags are not
+        self.pool["cell1"].read_fault("S_AL1_B", False)
+        self.assertEqual(self.pool["cell2"].fault_tags["read"], {})
+
+    def test_add_scene2(self):
+        # Scenes sharing a tags file decode tags with their own data types,
+        #   whichever scene comes first
+        port= self.server.server_address[1]
+        with FactoryIOClientPool(max_workers=1) as pool:
+            typed= pool.add_scene("typed", "127.0.0.1", port,
+                filepath=FactoryIOClientPoolTest.MOCK_TAGS_PATH,
+                data_types={"Real": "float32"})
+            raw= pool.add_scene("raw", "127.0.0.1", port,
+                filepath=FactoryIOClientPoolTest.MOCK_TAGS_PATH)
+            self.assertEqual(typed.get_tag("AL2_ST_Z_POS").length, 2)
+            self.assertIsNone(raw.get_tag("AL2_ST_Z_POS").datatype)
+            self.assertEqual(raw.get_tag("AL2_ST_Z_POS").length, 1)
+            self.assertIs(raw.tags, typed.tags)
+
+    @unittest.expectedFailure
+    def test_add_scene_fail1(self):
+        # Duplicate scene
+        self.pool.add_scene("cell1", 
+            filepath=FactoryIOClientPoolTest.MOCK_TAGS_PATH)
+
+    def test_remove_scene1(self):
+        self.pool.remove_scene("cell2")
+        self.assertFalse("cell2" in self.pool)
+        self.assertFalse("cell2" in self.pool.metrics()["scenes"])
+
+    def test_remove_scene2(self):
+        # Call submitted before the scene is removed, run after
+        release= threading.Event()
+        blockers= [self.pool.executor.submit(release.wait) for _ in range(2)]
+        future= self.pool.submit("cell2", "read_tag", "AL2_ST_Z_POS")
+        self.pool.remove_scene("cell2")
+        release.set()
+        for blocker in blockers:
+            blocker.result()
+        with self.assertRaisesRegex(ValueError, "removed"):
+            future.result()
+
+    # ===================================================================================
+    # connect / read_tags / write_tags
+    def test_read_tags1(self):
+        self.assertEqual(self.pool.connect(), 
+            {"cell1": True, "cell2": True, "dummy": True})
+        values= self.pool.read_tags({
+            "cell1": ["S_AL1_B", "AL2_ST_Z_POS"],
+            "cell2": ["AL2_ST_Z_POS"],
+            "dummy": ["S1"]
+        })
+        self.assertEqual(values, {
+            "cell1": {"S_AL1_B": True, "AL2_ST_Z_POS": 321},
+            "cell2": {"AL2_ST_Z_POS": 321},
+            "dummy": {"S1": True}
+        })
+
+    def test_write_tags1(self):
+        self.pool.connect()
+        status= self.pool.write_tags({
+            "cell1": {"AL2_ST_GRAB": True, "AL1_Z_SET": 7},
+            "dummy": {"A1": True}
+        })
+        self.assertEqual(status, {
+            "cell1": {"AL2_ST_GRAB": True, "AL1_Z_SET": True},
+            "dummy": {"A1": True}
+        })
+        self.assertEqual(self.store.getValues(1, 54, 1), [True])
+        self.assertEqual(self.store.getValues(1, 2, 1), [True])
+        self.assertEqual(self.store.getValues(3, 2, 1), [7])
+
+    def test_submit1(self):
+        self.pool.connect()
+        future= self.pool.submit("cell2", "read_tag", "AL2_ST_Z_POS")
+        self.assertEqual(future.result(), 321)
+
+    @unittest.expectedFailure
+    def test_submit_fail1(self):
+        self.pool.submit("cell3", "read_tag", "AL2_ST_Z_POS")
+
+    # ===================================================================================
+    # metrics
+    def test_metrics1(self):
+        self.pool.connect()
+        self.pool.read_tags({"cell1": ["S_AL1_B", "AL2_ST_Z_POS"]})
+        with self.assertRaises(ValueError):
+            self.pool.submit("cell2", "read_tag", "TAG_NOT_PRESENT").result()
+        metrics= self.pool.metrics()
+        self.assertEqual(metrics["calls"], 5)
+        self.assertEqual(metrics["errors"], 1)
+        self.assertEqual(metrics["tags"], 3)
+        self.assertEqual(metrics["scenes"]["cell1"]["tags"], 2)
+        self.assertGreater(metrics["tags_per_second"], 0)
+
+    def test_metrics2(self):
+        # Time waiting for the scene lock is not busy time
+        lock= self.pool._locks["cell1"]
+        lock.acquire()
+        future= self.pool.submit("cell1", "connect")
+        time.sleep(0.2)
+        lock.release()
+        self.assertTrue(future.result())
+        self.assertLess(self.pool.metrics()["scenes"]["cell1"]["busy_time"],
+            0.2)
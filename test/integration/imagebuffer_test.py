@@ -0,0 +1,115 @@
+# Imports
+import unittest, os
+from array import array
+import pandas as pd
+
+# Self-defined imports
+from src.modbusclient import FactoryIOModbusClient
+from src.simulator import FactoryIOSimulator
+import src.imagebuffer as imagebuffer
+
+class ImageBufferTest(unittest.TestCase):
+    # Setup mock FactoryIO tags
+    mock_tags_dict= {
+        "Name": ["S_AL1_B", "S_AL1_C", "S_AL1_D", "AL2_ST_GRAB", 
+            "AL1_ST_Z_POS", "AL1_ST_X_POS", "AL1_Z_SET"],
+        "Type": ["Input", "Input", "Input", "Output", "Input", "Input", 
+            "Output"],
+        "Data Type": ["Bool", "Bool", "Bool", "Bool", "Real", "Int", "Real"],
+        "Address": ["Input 0", "Input 3", "Input 10", "Coil 54", 
+            "Input Reg 11", "Input Reg 14", "Holding Reg 2"]
+    }
+    MOCK_TAGS_PATH= "./test/integration/mock_imagebuffer_tags.csv"
+
+    # SETUP
+    # ===================================================================================
+    @classmethod
+    def setUpClass(cls):
+        # Create mock tags dataframe
+        mock_tags_df= pd.DataFrame.from_dict(ImageBufferTest.mock_tags_dict)
+        # Save to file
+        mock_tags_df.to_csv(ImageBufferTest.MOCK_TAGS_PATH, index=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        # Delete
+        os.remove(ImageBufferTest.MOCK_TAGS_PATH)
+
+    def setUp(self):
+        # Start simulator and connect client
+        self.simulator= FactoryIOSimulator(
+            filepath= ImageBufferTest.MOCK_TAGS_PATH)
+        host, port= self.simulator.start()
+        self.fmc= FactoryIOModbusClient(host, port,
+            filepath= ImageBufferTest.MOCK_TAGS_PATH)
+        self.assertTrue(self.fmc.connect())
+
+    def tearDown(self):
+        self.fmc.close()
+        self.simulator.stop()
+
+    # ===================================================================================
+    # TESTING
+    # ===================================================================================
+    # unpack_bits_into / unpack_registers_into
+    def test_unpack_bits_into1(self):
+        bits= bytearray(12)
+        # 0b00000101, 0b10
+        imagebuffer.unpack_bits_into(bits, 1, 10, bytes([0x05, 0x02]))
+        self.assertEqual(list(bits), [0, 1, 0, 1, 0, 0, 0, 0, 0, 0, 1, 0])
+
+    def test_unpack_registers_into1(self):
+        registers= array("H", [0] * 4)
+        imagebuffer.unpack_registers_into(memoryview(registers).cast("B"), 
+            1, 2, bytes([0x01, 0x02, 0xFF, 0xFE]))
+        self.assertEqual(list(registers), [0, 0x0102, 0xFFFE, 0])
+
+    # ===================================================================================
+    # read
+    def test_read1(self):
+        image= self.fmc.image_buffer()
+        # One buffer per address space, covering the planned blocks
+        self.assertEqual(len(image.views["read_discrete_inputs"]), 11)
+        self.assertEqual(len(image.views["read_input_registers"]), 4)
+        self.assertEqual(image.offsets["AL1_ST_X_POS"], 
+            ("read_input_registers", 3))
+        self.simulator.set_value("S_AL1_C", True)
+        self.simulator.set_value("S_AL1_D", True)
+        self.simulator.set_value("AL1_ST_Z_POS", 410)
+        self.simulator.set_value("AL1_ST_X_POS", -2)
+        image.read()
+        self.assertEqual(bytes(image.views["read_discrete_inputs"]),
+            bytes([0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 1]))
+        self.assertEqual(image.views["read_input_registers"][0], 410)
+        self.assertEqual(image["AL1_ST_X_POS"], -2)
+        self.assertIs(image["S_AL1_C"], True)
+        self.assertIs(image["S_AL1_B"], False)
+
+    def test_read2(self):
+        # Buffers are reused, read faults applied by item access
+        image= self.fmc.image_buffer(["S_AL1_B", "AL1_ST_Z_POS"])
+        buffers= dict(image.buffers)
+        image.read()
+        self.simulator.set_value("AL1_ST_Z_POS", 7)
+        self.fmc.read_fault("S_AL1_B", True)
+        image.read()
+        self.assertEqual(image.buffers, buffers)
+        self.assertIs(image.buffers["read_input_registers"],
+            buffers["read_input_registers"])
+        self.assertEqual(image["AL1_ST_Z_POS"], 7)
+        self.assertIs(image["S_AL1_B"], True)
+        self.assertEqual(image.views["read_discrete_inputs"][0], 0)
+
+    def test_read3(self):
+        # Raw responses still decode for per tag reads
+        self.simulator.set_value("AL1_ST_Z_POS", 12)
+        self.simulator.set_value("S_AL1_C", True)
+        self.assertEqual(self.fmc.read_tag("AL1_ST_Z_POS"), 12)
+        self.assertEqual(self.fmc.read_tags(["S_AL1_B", "S_AL1_C"]),
+            {"S_AL1_B": False, "S_AL1_C": True})
+
+    @unittest.expectedFailure
+    def test_getitem_fail1(self):
+        # Tag not in image
+        image= self.fmc.image_buffer(["S_AL1_B"])
+        image["AL1_ST_Z_POS"]
@@ -0,0 +1,180 @@
+# Imports
+import unittest, os, json
+import pandas as pd
+from pymodbus.exceptions import ModbusException
+
+# Self-defined imports
+from src.modbusclient import FactoryIOModbusClient
+from src.simulator import FactoryIOSimulator
+import src.instrumentation as instrumentation
+
+class InstrumentationTest(unittest.TestCase):
+    # Setup mock FactoryIO tags
+    mock_tags_dict= {
+        "Name": ["S_AL1_B", "S_AL1_C", "AL2_ST_GRAB", "AL1_ST_X_POS",
+            "AL1_Z_SET"],
+        "Type": ["Input", "Input", "Output", "Input", "Output"],
+        "Data Type": ["Bool", "Bool", "Bool", "Int", "Int"],
+        "Address": ["Input 0", "Input 3", "Coil 54", "Input Reg 14",
+            "Holding Reg 2"]
+    }
+    MOCK_TAGS_PATH= "./test/integration/mock_instrumentation_tags.csv"
+
+    # SETUP
+    # ===================================================================================
+    @classmethod
+    def setUpClass(cls):
+        # Create mock tags dataframe
+        mock_tags_df= pd.DataFrame.from_dict(InstrumentationTest.mock_tags_dict)
+        # Save to file
+        mock_tags_df.to_csv(InstrumentationTest.MOCK_TAGS_PATH, index=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        # Delete
+        os.remove(InstrumentationTest.MOCK_TAGS_PATH)
+
+    def setUp(self):
+        # Start simulator and connect an instrumented client
+        self.simulator= FactoryIOSimulator(
+            filepath= InstrumentationTest.MOCK_TAGS_PATH)
+        host, port= self.simulator.start()
+        self.fmc= FactoryIOModbusClient(host, port,
+            filepath= InstrumentationTest.MOCK_TAGS_PATH, instrument=True)
+        self.assertTrue(self.fmc.connect())
+
+    def tearDown(self):
+        self.fmc.close()
+        self.simulator.stop()
+
+    # ===================================================================================
+    # TESTING
+    # ===================================================================================
+    # LatencyHistogram
+    def test_bucket1(self):
+        # Bucket lower bounds within the histogram precision
+        for value in list(range(100)) + [1000, 12345, 10**6, 987654321]:
+            low= instrumentation.bucket_value(
+                instrumentation.bucket_index(value))
+            self.assertLessEqual(low, value)
+            self.assertGreaterEqual(low * 1.0625, value)
+        # Values out of range go to the last bucket
+        self.assertEqual(instrumentation.bucket_index(2**40),
+            instrumentation.N_BUCKETS - 1)
+
+    def test_bucket2(self):
+        # The last value in range and the first out of range have their
+        #   own buckets
+        last= 2**instrumentation.MAX_BITS - 1
+        self.assertLess(instrumentation.bucket_index(last),
+            instrumentation.OVERFLOW_BUCKET)
+        self.assertEqual(instrumentation.bucket_index(last + 1),
+            instrumentation.OVERFLOW_BUCKET)
+        self.assertEqual(instrumentation.bucket_value(
+            instrumentation.OVERFLOW_BUCKET), last + 1)
+        histogram= instrumentation.LatencyHistogram()
+        for _ in range(9):
+            histogram.record(last)
+        histogram.record(2**40)
+        # In range values are not reported as overflow
+        self.assertLess(histogram.percentile(90), last + 1)
+        self.assertEqual(histogram.percentile(100), 2**40)
+
+    def test_histogram1(self):
+        histogram= instrumentation.LatencyHistogram()
+        self.assertIsNone(histogram.percentile(50))
+        for value in range(1, 1001):
+            histogram.record(value * 1000)
+        self.assertEqual(histogram.count, 1000)
+        self.assertEqual(histogram.max, 10**6)
+        self.assertAlmostEqual(histogram.percentile(50), 500000,
+            delta=500000 * 0.0625)
+        self.assertAlmostEqual(histogram.percentile(99), 990000,
+            delta=990000 * 0.0625)
+        self.assertEqual(histogram.percentile(100), 10**6)
+        # Merge
+        other= instrumentation.LatencyHistogram()
+        other.record(2 * 10**6)
+        other.record_error()
+        histogram.merge(other)
+        self.assertEqual(histogram.count, 1001)
+        self.assertEqual(histogram.errors, 1)
+        self.assertEqual(histogram.max, 2 * 10**6)
+
+    # ===================================================================================
+    # Client
+    def test_uninstrumented1(self):
+        fmc= FactoryIOModbusClient(*self.simulator.address,
+            filepath= InstrumentationTest.MOCK_TAGS_PATH)
+        self.assertIsNone(fmc.metrics)
+        self.assertNotIn("read_tag", vars(fmc))
+
+    def test_read_tag1(self):
+        self.simulator.set_value("AL1_ST_X_POS", 42)
+        for _ in range(10):
+            self.assertEqual(self.fmc.read_tag("AL1_ST_X_POS"), 42)
+        self.fmc.read_tag("S_AL1_B")
+        metrics= self.fmc.metrics
+        self.assertEqual(metrics.tags["AL1_ST_X_POS"].count, 10)
+        self.assertEqual(metrics.tags["S_AL1_B"].count, 1)
+        for phase in instrumentation.PHASES:
+            self.assertEqual(metrics.phases[phase].count, 11)
+        # Function codes 4 (input registers) and 2 (discrete inputs)
+        self.assertEqual(metrics.function_codes[4].count, 10)
+        self.assertEqual(metrics.function_codes[2].count, 1)
+        # Whole call includes the request
+        self.assertGreaterEqual(metrics.tags["AL1_ST_X_POS"].total,
+            metrics.function_codes[4].total)
+
+    def test_write_tag1(self):
+        self.assertFalse(self.fmc.write_tag("AL1_Z_SET", 7).isError())
+        self.fmc.write_tag("AL2_ST_GRAB", True)
+        self.fmc.write_tags({"AL1_Z_SET": 8})
+        metrics= self.fmc.metrics
+        self.assertEqual(self.simulator.get_value("AL1_Z_SET"), 8)
+        self.assertEqual(metrics.tags["AL1_Z_SET"].count, 1)
+        self.assertEqual(metrics.phases["lookup"].count, 2)
+        self.assertEqual(metrics.phases["decode"].count, 0)
+        # Write single register and coil, write_tags by function code only
+        self.assertEqual(metrics.function_codes[6].count, 2)
+        self.assertEqual(metrics.function_codes[5].count, 1)
+        self.assertEqual(metrics.snapshot()["requests"], 3)
+
+    def test_errors1(self):
+        with self.assertRaises(ValueError):
+            self.fmc.write_tag("AL2_ST_GRAB", 5)
+        self.assertEqual(self.fmc.metrics.tags["AL2_ST_GRAB"].errors, 1)
+        # Failed requests
+        self.simulator.stop()
+        self.fmc.close()
+        with self.assertRaises(ModbusException):
+            self.fmc.read_tag("S_AL1_C")
+        self.assertEqual(self.fmc.metrics.tags["S_AL1_C"].errors, 1)
+        self.assertEqual(self.fmc.metrics.function_codes[2].errors, 1)
+        self.assertEqual(self.fmc.metrics.snapshot()["errors"], 1)
+
+    # ===================================================================================
+    # Export
+    def test_snapshot1(self):
+        for _ in range(3):
+            self.fmc.read_tag("S_AL1_B")
+        self.fmc.read_tag("S_AL1_C")
+        snapshot= json.loads(self.fmc.metrics.to_json(top=1))
+        self.assertEqual(snapshot["requests"], 4)
+        self.assertEqual(snapshot["retries"], 0)
+        self.assertEqual(list(snapshot["tags"]), ["S_AL1_B"])
+        self.assertEqual(snapshot["tags"]["S_AL1_B"]["count"], 3)
+        self.assertEqual(snapshot["function_codes"]["2"]["count"], 4)
+        self.fmc.metrics.reset()
+        self.assertEqual(self.fmc.metrics.snapshot()["tags"], {})
+
+    def test_prometheus1(self):
+        self.fmc.read_tag("S_AL1_B")
+        text= self.fmc.metrics.to_prometheus()
+        self.assertIn("# TYPE factoryio_request_seconds summary", text)
+        self.assertIn('factoryio_request_seconds_count{function_code="2"} 1',
+            text)
+        self.assertIn('factoryio_tag_seconds_count{tag="S_AL1_B"} 1', text)
+        self.assertIn('factoryio_request_errors_total{function_code="2"} 0',
+            text)
+        self.assertIn("factoryio_request_retries_total 0", text)
@@ -1,5 +1,5 @@
 # Imports
-import unittest, os
+import unittest, os, shutil, tempfile
 from unittest.mock import MagicMock
 import pandas as pd
 
@@ -58,6 +58,44 @@ class FactoryIOModbusClientTest(unittest.TestCase):
         self.assertEqual(loaded_tags["Data Type"][1], 
             FactoryIOModbusClientTest.mock_tags_dict["Data Type"][1])
 
+    def test_tags_dataframe(self):
+        tags_df= self.fmc.tags_dataframe()
+        # Assertions
+        self.assertIsInstance(tags_df, pd.DataFrame)
+        self.assertEqual(list(tags_df.columns), 
+            list(FactoryIOModbusClientTest.mock_tags_dict))
+        self.assertEqual(tags_df["Address"].tolist(), [0, 54, 187, 11, 2])
+
+    def test_load_tags_index(self):
+        self.fmc.load_tags(FactoryIOModbusClientTest.MOCK_TAGS_PATH)
+        # Assertions
+        self.assertEqual(len(self.fmc.tag_index), 
+            len(FactoryIOModbusClientTest.mock_tags_dict["Name"]))
+        self.assertEqual(self.fmc.tag_index["AL2_ST_GRAB"].address, 54)
+        self.assertEqual(self.fmc.tag_index["AL2_ST_Z_POS"].read_type,
+            "read_input_registers")
+        self.assertEqual(
+            self.fmc.tag_index["Machining Center 3 (Reset)"].write_type,
+            "write_coil")
+
+    def test_load_tags_cache(self):
+        cache_dir= tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        fmc1= FactoryIOModbusClient("127.0.0.1", 
+            filepath= FactoryIOModbusClientTest.MOCK_TAGS_PATH, 
+            cache_dir=cache_dir)
+        fmc2= FactoryIOModbusClient("127.0.0.1", 
+            filepath= FactoryIOModbusClientTest.MOCK_TAGS_PATH, 
+            cache_dir=cache_dir)
+        # Assertions
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        self.assertEqual(fmc2.tags, self.fmc.tags)
+        self.assertEqual(list(fmc2.tag_index), list(self.fmc.tag_index))
+        self.assertEqual(fmc2.tag_index["Machining Center 3 (Reset)"].address,
+            fmc1.tag_index["Machining Center 3 (Reset)"].address)
+        self.assertEqual(fmc2.get_tag("AL1_Z_SET").write_type, 
+            "write_register")
+
     # ===================================================================================
     # read_tag
     def test_read_tag1(self):
@@ -120,12 +158,77 @@ class FactoryIOModbusClientTest(unittest.TestCase):
             exp_args["Address"], exp_args["length"], unit= exp_args["UNIT"]
             )
 
+    def test_read_tag_value(self):
+        # Stub read responses
+        self.fmc.read_discrete_inputs= MagicMock()
+        self.fmc.read_discrete_inputs.return_value.getBit.return_value= True
+        self.fmc.read_holding_registers= MagicMock()
+        self.fmc.read_holding_registers.return_value.getRegister.return_value= 42
+        # Assert that the decoded values are returned
+        self.assertIs(self.fmc.read_tag("S_AL1_B"), True)
+        self.fmc.read_discrete_inputs.return_value.getBit.assert_called_with(0)
+        self.assertEqual(self.fmc.read_tag("AL1_Z_SET"), 42)
+        self.fmc.read_holding_registers.return_value.getRegister.assert_called_with(0)
+
     @unittest.expectedFailure
     def test_read_tag_fail1(self):
         # Invalid tag name (Tag not present in supplied tags)
         self.fmc.read_tag("TAG_NOT_PRESENT")
 
 
+    # ===================================================================================
+    # read_tags
+    def test_read_tags1(self):
+        # Stub read responses
+        self.fmc.read_discrete_inputs= MagicMock()
+        self.fmc.read_discrete_inputs.return_value.isError.return_value= False
+        self.fmc.read_discrete_inputs.return_value.bits= [True] + [False] * 7
+        self.fmc.read_coils= MagicMock()
+        self.fmc.read_coils.return_value.isError.return_value= False
+        self.fmc.read_coils.return_value.bits= [True] + [False] * 7
+        self.fmc.read_input_registers= MagicMock()
+        self.fmc.read_input_registers.return_value.isError.return_value= False
+        self.fmc.read_input_registers.return_value.registers= [321]
+        # Read tags
+        values= self.fmc.read_tags(["S_AL1_B", "AL2_ST_GRAB", "AL2_ST_Z_POS"])
+        # Assertions
+        self.assertEqual(values, {
+            "S_AL1_B": True, "AL2_ST_GRAB": True, "AL2_ST_Z_POS": 321
+        })
+        self.fmc.read_discrete_inputs.assert_called_once_with(0, 1, unit=0x1)
+        self.fmc.read_coils.assert_called_once_with(54, 1, unit=0x1)
+        self.fmc.read_input_registers.assert_called_once_with(11, 1, unit=0x1)
+
+    def test_read_tags2(self):
+        # Coils 54 and 187 are coalesced with a large enough gap tolerance
+        self.fmc.read_coils= MagicMock()
+        self.fmc.read_coils.return_value.isError.return_value= False
+        bits= [False] * 136
+        bits[133]= True
+        self.fmc.read_coils.return_value.bits= bits
+        # Read fault is still applied
+        self.fmc.read_fault("AL2_ST_GRAB", True)
+        values= self.fmc.read_tags(["Machining Center 3 (Reset)", 
+            "AL2_ST_GRAB"], max_gap=200)
+        # Assertions
+        self.assertEqual(values, {
+            "Machining Center 3 (Reset)": True, "AL2_ST_GRAB": True
+        })
+        self.fmc.read_coils.assert_called_once_with(54, 134, unit=0x1)
+
+    @unittest.expectedFailure
+    def test_read_tags_fail1(self):
+        # Invalid tag name (Tag not present in supplied tags)
+        self.fmc.read_tags(["S_AL1_B", "TAG_NOT_PRESENT"])
+
+    @unittest.expectedFailure
+    def test_read_tags_fail2(self):
+        # Error response
+        self.fmc.read_discrete_inputs= MagicMock()
+        self.fmc.read_discrete_inputs.return_value.isError.return_value= True
+        self.fmc.read_tags(["S_AL1_B"])
+
+
     # ===================================================================================
     # write_tag
     def test_write_tag1(self):
@@ -180,6 +283,114 @@ class FactoryIOModbusClientTest(unittest.TestCase):
         # Write a float to an Output Reg Real tag
         self.fmc.write_tag("AL1_Z_SET", 5.2)
 
+    def test_write_tag_fail5(self):
+        # Write a float out of range of a float32 tag
+        fmc= FactoryIOModbusClient("127.0.0.1", 
+            filepath= FactoryIOModbusClientTest.MOCK_TAGS_PATH,
+            data_types= {"Real": "float32"})
+        fmc.write_registers= MagicMock()
+        with self.assertRaisesRegex(ValueError, "AL1_Z_SET"):
+            fmc.write_tag("AL1_Z_SET", 1e40)
+        fmc.write_registers.assert_not_called()
+
+
+    # ===================================================================================
+    # write_tags
+    def test_write_tags1(self):
+        # Spy on FactoryIOModbusClient object methods
+        self.fmc.write_coil= MagicMock()
+        self.fmc.write_coil.return_value.isError.return_value= False
+        self.fmc.write_register= MagicMock()
+        self.fmc.write_register.return_value.isError.return_value= True
+        # Write fault is applied
+        self.fmc.write_fault("AL1_Z_SET", 400)
+        # Write tags
+        status= self.fmc.write_tags({
+            "AL2_ST_GRAB": True, 
+            "Machining Center 3 (Reset)": False,
+            "AL1_Z_SET": 700
+        })
+        # Assertions
+        self.assertEqual(status, {
+            "AL2_ST_GRAB": True,
+            "Machining Center 3 (Reset)": True,
+            "AL1_Z_SET": False
+        })
+        self.fmc.write_coil.assert_any_call(54, True, unit=0x1)
+        self.fmc.write_coil.assert_any_call(187, False, unit=0x1)
+        self.fmc.write_register.assert_called_once_with(2, 400, unit=0x1)
+
+    @unittest.expectedFailure
+    def test_write_tags_fail1(self):
+        # Write an integer to an Output Bool tag
+        self.fmc.write_tags({"AL1_Z_SET": 5, "AL2_ST_GRAB": 5})
+
+    @unittest.expectedFailure
+    def test_write_tags_fail2(self):
+        # Write to an Input Bool tag
+        self.fmc.write_tags({"S_AL1_B": True})
+
+
+    # ===================================================================================
+    # write cache
+    def test_write_cache1(self):
+        fmc= FactoryIOModbusClient("127.0.0.1", 
+            filepath= FactoryIOModbusClientTest.MOCK_TAGS_PATH,
+            write_cache=True)
+        fmc.write_coil= MagicMock()
+        fmc.write_coil.return_value.isError.return_value= False
+        # Redundant writes are skipped
+        response= fmc.write_tag("AL2_ST_GRAB", True)
+        self.assertIs(fmc.write_tag("AL2_ST_GRAB", True), response)
+        self.assertEqual(fmc.write_coil.call_count, 1)
+        fmc.write_tag("AL2_ST_GRAB", False)
+        self.assertEqual(fmc.write_coil.call_count, 2)
+        # Also in batched writes
+        self.assertEqual(fmc.write_tags({"AL2_ST_GRAB": False}), 
+            {"AL2_ST_GRAB": True})
+        self.assertEqual(fmc.write_coil.call_count, 2)
+        # Invalidation
+        fmc.close()
+        fmc.write_tag("AL2_ST_GRAB", False)
+        self.assertEqual(fmc.write_coil.call_count, 3)
+
+    def test_write_cache2(self):
+        fmc= FactoryIOModbusClient("127.0.0.1", 
+            filepath= FactoryIOModbusClientTest.MOCK_TAGS_PATH,
+            write_cache=True, write_deadband=2)
+        fmc.write_register= MagicMock()
+        fmc.write_register.return_value.isError.return_value= False
+        # Changes within the deadband are skipped
+        fmc.write_tag("AL1_Z_SET", 100)
+        fmc.write_tag("AL1_Z_SET", 102)
+        fmc.write_tag("AL1_Z_SET", 98)
+        self.assertEqual(fmc.write_register.call_count, 1)
+        fmc.write_tag("AL1_Z_SET", 103)
+        self.assertEqual(fmc.write_register.call_count, 2)
+        # Failed writes are not cached
+        fmc.write_register.return_value.isError.return_value= True
+        fmc.write_tag("AL1_Z_SET", 200)
+        fmc.write_tag("AL1_Z_SET", 200)
+        self.assertEqual(fmc.write_register.call_count, 4)
+
+    def test_write_cache3(self):
+        fmc= FactoryIOModbusClient("127.0.0.1", 
+            filepath= FactoryIOModbusClientTest.MOCK_TAGS_PATH,
+            write_cache=True, write_refresh_interval=0)
+        fmc.write_coil= MagicMock()
+        fmc.write_coil.return_value.isError.return_value= False
+        # Cached values are refreshed
+        fmc.write_tag("AL2_ST_GRAB", True)
+        fmc.write_tag("AL2_ST_GRAB", True)
+        self.assertEqual(fmc.write_coil.call_count, 2)
+
+    def test_write_cache4(self):
+        # Cache is disabled by default
+        self.fmc.write_coil= MagicMock()
+        self.fmc.write_tag("AL2_ST_GRAB", True)
+        self.fmc.write_tag("AL2_ST_GRAB", True)
+        self.assertEqual(self.fmc.write_coil.call_count, 2)
+
 
     # ===================================================================================
     # read_fault
@@ -255,6 +466,18 @@ class FactoryIOModbusClientTest(unittest.TestCase):
         # assertions
         self.fmc.read_fault(tag_name, forced_value)
 
+    def test_read_fault_fail5(self):
+        # Typed tag: read and write faults checked alike
+        fmc= FactoryIOModbusClient("127.0.0.1", 
+            filepath= FactoryIOModbusClientTest.MOCK_TAGS_PATH,
+            data_types= {"Real": "int16"})
+        for fault in (fmc.read_fault, fmc.write_fault):
+            with self.assertRaises(ValueError):
+                fault("AL1_Z_SET", 5.5)
+            with self.assertRaises(ValueError):
+                fault("AL1_Z_SET", 70000)
+        self.assertEqual(fmc.fault_tags, {"read": {}, "write": {}})
+
 
     # ===================================================================================
     # write_fault
@@ -313,3 +536,21 @@ class FactoryIOModbusClientTest(unittest.TestCase):
         forced_value= False
         # assertions
         self.fmc.write_fault(tag_name, forced_value)
+
+    # ===================================================================================
+    # clear_fault / fault table
+    def test_clear_fault1(self):
+        self.fmc.read_fault("S_AL1_B", True)
+        self.fmc.write_fault("AL1_Z_SET", 400)
+        # Copy-on-write: snapshots held by readers are never modified
+        snapshot= self.fmc.fault_tags
+        self.fmc.clear_fault("S_AL1_B")
+        self.assertEqual(snapshot["read"], {"S_AL1_B": True})
+        self.assertEqual(self.fmc.fault_tags, 
+            {"read": {}, "write": {"AL1_Z_SET": 400}})
+        self.fmc.clear_faults()
+        self.assertEqual(self.fmc.fault_tags, {"read": {}, "write": {}})
+
+    @unittest.expectedFailure
+    def test_clear_fault_fail1(self):
+        self.fmc.clear_fault("TAG_NOT_PRESENT")
@@ -0,0 +1,141 @@
+# Imports
+import unittest, os, queue, time
+import pandas as pd
+
+# Self-defined imports
+from src.modbusclient import FactoryIOModbusClient
+from src.simulator import FactoryIOSimulator
+
+class TagPollerTest(unittest.TestCase):
+    # Setup mock FactoryIO tags
+    mock_tags_dict= {
+        "Name": ["S_AL1_B", "S_AL1_C", "AL2_ST_GRAB", "AL1_ST_Z_POS",
+            "AL1_Z_SET"],
+        "Type": ["Input", "Input", "Output", "Input", "Output"],
+        "Data Type": ["Bool", "Bool", "Bool", "Real", "Real"],
+        "Address": ["Input 0", "Input 3", "Coil 54", "Input Reg 11",
+            "Holding Reg 2"]
+    }
+    MOCK_TAGS_PATH= "./test/integration/mock_poller_tags.csv"
+
+    # SETUP
+    # ===================================================================================
+    @classmethod
+    def setUpClass(cls):
+        # Create mock tags dataframe
+        mock_tags_df= pd.DataFrame.from_dict(TagPollerTest.mock_tags_dict)
+        # Save to file
+        mock_tags_df.to_csv(TagPollerTest.MOCK_TAGS_PATH, index=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        # Delete
+        os.remove(TagPollerTest.MOCK_TAGS_PATH)
+
+    def setUp(self):
+        # Start simulator and connect client
+        self.simulator= FactoryIOSimulator(
+            filepath= TagPollerTest.MOCK_TAGS_PATH)
+        host, port= self.simulator.start()
+        self.fmc= FactoryIOModbusClient(host, port,
+            filepath= TagPollerTest.MOCK_TAGS_PATH)
+        self.assertTrue(self.fmc.connect())
+
+    def tearDown(self):
+        self.fmc.close()
+        self.simulator.stop()
+
+    # ===================================================================================
+    # TESTING
+    # ===================================================================================
+    # poll
+    def test_poll1(self):
+        changes= []
+        poller= self.fmc.poller
+        poller.subscribe(["S_AL1_B", "S_AL1_C", "AL1_ST_Z_POS"], 0.2,
+            callback=changes.append)
+        # Tags of a group are read together: one request per address space
+        requests= self.simulator.requests
+        self.assertEqual(poller.poll(0.2), {"S_AL1_B": False,
+            "S_AL1_C": False, "AL1_ST_Z_POS": 0})
+        self.assertEqual(self.simulator.requests - requests, 2)
+        # First poll delivers all values, then only changes
+        self.simulator.set_value("S_AL1_C", True)
+        poller.poll(0.2)
+        poller.poll(0.2)
+        self.assertEqual(changes, [
+            {"S_AL1_B": False, "S_AL1_C": False, "AL1_ST_Z_POS": 0},
+            {"S_AL1_C": True}
+        ])
+
+    def test_poll2(self):
+        # Groups by period, read faults applied
+        fast, slow= queue.Queue(), queue.Queue()
+        poller= self.fmc.poller
+        poller.subscribe(["AL1_ST_Z_POS"], 0.01, queue=fast)
+        poller.subscribe(["S_AL1_B", "AL2_ST_GRAB"], 0.2, queue=slow)
+        self.assertEqual(sorted(poller.groups), [0.01, 0.2])
+        self.fmc.read_fault("S_AL1_B", True)
+        poller.poll(0.2)
+        self.assertEqual(slow.get_nowait(),
+            {"S_AL1_B": True, "AL2_ST_GRAB": False})
+        self.assertTrue(fast.empty())
+
+    # ===================================================================================
+    # subscribe
+    def test_subscribe1(self):
+        updates= queue.Queue()
+        self.fmc.subscribe(["AL1_ST_Z_POS"], 0.01, queue=updates)
+        self.assertTrue(self.fmc.poller.running)
+        self.assertEqual(updates.get(timeout=2), {"AL1_ST_Z_POS": 0})
+        self.simulator.set_value("AL1_ST_Z_POS", 120)
+        self.assertEqual(updates.get(timeout=2), {"AL1_ST_Z_POS": 120})
+
+    def test_subscribe2(self):
+        updates= queue.Queue()
+        subscription= self.fmc.subscribe(["S_AL1_B"], 0.01, queue=updates)
+        updates.get(timeout=2)
+        self.fmc.unsubscribe(subscription)
+        self.assertEqual(self.fmc.poller.groups, {})
+        # Let a poll in progress finish
+        time.sleep(0.05)
+        while not updates.empty():
+            updates.get_nowait()
+        self.simulator.set_value("S_AL1_B", True)
+        time.sleep(0.05)
+        self.assertTrue(updates.empty())
+        # Polling stops on close
+        self.fmc.close()
+        self.assertFalse(self.fmc.poller.running)
+
+    def test_subscribe3(self):
+        # KeyError raised by a callback reported, polling goes on
+        updates= queue.Queue()
+        calls= []
+        def callback(values):
+            calls.append(values)
+            updates.put(values)
+            if len(calls) == 1:
+                raise KeyError("AL1_ST_Z_POS")
+        with self.assertLogs(level="ERROR"):
+            self.fmc.subscribe(["AL1_ST_Z_POS"], 0.01, callback=callback)
+            self.assertEqual(updates.get(timeout=2), {"AL1_ST_Z_POS": 0})
+            self.simulator.set_value("AL1_ST_Z_POS", 120)
+            self.assertEqual(updates.get(timeout=2), {"AL1_ST_Z_POS": 120})
+        self.assertEqual(self.fmc.poller.errors, 1)
+
+    @unittest.expectedFailure
+    def test_subscribe_fail1(self):
+        # Neither callback nor queue
+        self.fmc.subscribe(["S_AL1_B"], 0.1)
+
+    @unittest.expectedFailure
+    def test_subscribe_fail2(self):
+        # Unknown tag
+        self.fmc.subscribe(["S_AL1_X"], 0.1, callback=print)
+
+    @unittest.expectedFailure
+    def test_subscribe_fail3(self):
+        # Period must be positive
+        self.fmc.subscribe(["S_AL1_B"], 0, callback=print)
+
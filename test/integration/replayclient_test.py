@@ -0,0 +1,167 @@
+# Imports
+import unittest, os
+import pandas as pd
+
+# Self-defined imports
+from src.modbusclient import FactoryIOModbusClient
+from src.simulator import FactoryIOSimulator, follow
+from src.scanscheduler import ScanScheduler, VirtualClock
+from src.tracelog import TraceRecorder, TraceLog
+from src.replayclient import ReplayClient
+
+def make_cycle(client):
+    """Controller cycle: move to 700 while a box is at the entry, count
+    the scans at position."""
+    state= {"at_position": 0}
+    def cycle():
+        inputs= client.read_tags(["S_AL1_B", "AL1_ST_X_POS"])
+        client.write_tag("AL1_Z_SET", 700 if inputs["S_AL1_B"] else 0)
+        if inputs["AL1_ST_X_POS"] == 700:
+            state["at_position"]+= 1
+        client.write_tags({"AL2_ST_GRAB": state["at_position"] > 2})
+    cycle.state= state
+    return cycle
+
+class ReplayClientTest(unittest.TestCase):
+    # Setup mock FactoryIO tags
+    mock_tags_dict= {
+        "Name": ["S_AL1_B", "AL2_ST_GRAB", "AL1_ST_X_POS", "AL1_Z_SET"],
+        "Type": ["Input", "Output", "Input", "Output"],
+        "Data Type": ["Bool", "Bool", "Int", "Int"],
+        "Address": ["Input 0", "Coil 54", "Input Reg 14", "Holding Reg 2"]
+    }
+    MOCK_TAGS_PATH= "./test/integration/mock_replayclient_tags.csv"
+    MOCK_TRACE_PATH= "./test/integration/mock_replay_session.trace"
+    MOCK_REPLAY_PATH= "./test/integration/mock_replay_replayed.trace"
+
+    # SETUP
+    # ===================================================================================
+    @classmethod
+    def setUpClass(cls):
+        # Create mock tags dataframe
+        mock_tags_df= pd.DataFrame.from_dict(ReplayClientTest.mock_tags_dict)
+        # Save to file
+        mock_tags_df.to_csv(ReplayClientTest.MOCK_TAGS_PATH, index=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        # Delete
+        os.remove(ReplayClientTest.MOCK_TAGS_PATH)
+
+    def setUp(self):
+        # Initialize ReplayClient object
+        self.client= ReplayClient(filepath= ReplayClientTest.MOCK_TAGS_PATH)
+
+    def tearDown(self):
+        for path in (ReplayClientTest.MOCK_TRACE_PATH,
+            ReplayClientTest.MOCK_REPLAY_PATH):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def record_session(self, cycles=30, period=0.1):
+        """Record the mock controller against the simulator, in virtual
+        time: the box arrives at 0.5 s and leaves at 2 s."""
+        virtual= VirtualClock()
+        with FactoryIOSimulator(filepath= ReplayClientTest.MOCK_TAGS_PATH,
+            tick=None) as simulator:
+            simulator.script("AL1_ST_X_POS", follow("AL1_Z_SET", 1000))
+            simulator.script("S_AL1_B", lambda sim, t, value: 0.5 <= t < 2)
+            with FactoryIOModbusClient(*simulator.address,
+                filepath= ReplayClientTest.MOCK_TAGS_PATH) as fmc:
+                self.assertTrue(fmc.connect())
+                cycle= make_cycle(fmc)
+                with TraceRecorder(fmc, ReplayClientTest.MOCK_TRACE_PATH,
+                    clock=virtual.clock) as recorder:
+                    def scan():
+                        simulator.step(virtual.clock())
+                        recorder.scan()
+                        cycle()
+                    ScanScheduler(scan, period, clock=virtual.clock,
+                        sleep=virtual.sleep).run(cycles=cycles)
+        return cycle.state
+
+    # ===================================================================================
+    # TESTING
+    # ===================================================================================
+    # Client API
+    def test_read_write1(self):
+        self.assertEqual(self.client.read_tags(["S_AL1_B", "AL1_ST_X_POS"]),
+            {"S_AL1_B": False, "AL1_ST_X_POS": 0})
+        self.client.set_value("AL1_ST_X_POS", 12)
+        self.assertEqual(self.client.read_tag("AL1_ST_X_POS"), 12)
+        self.assertFalse(self.client.write_tag("AL1_Z_SET", 5).isError())
+        self.assertEqual(self.client.write_tags({"AL2_ST_GRAB": True}),
+            {"AL2_ST_GRAB": True})
+        self.assertEqual(self.client.get_value("AL1_Z_SET"), 5)
+        self.assertEqual((self.client.reads, self.client.writes), (3, 2))
+
+    def test_faults1(self):
+        self.client.read_fault("S_AL1_B", True)
+        self.client.write_fault("AL1_Z_SET", 9)
+        self.assertTrue(self.client.read_tag("S_AL1_B"))
+        self.client.write_tag("AL1_Z_SET", 5)
+        self.assertEqual(self.client.get_value("AL1_Z_SET"), 9)
+        self.client.clear_faults()
+        self.assertFalse(self.client.read_tag("S_AL1_B"))
+
+    @unittest.expectedFailure
+    def test_write_fail1(self):
+        # Value type checked as by FactoryIOModbusClient
+        self.client.write_tag("AL2_ST_GRAB", 5)
+
+    # ===================================================================================
+    # Simulation
+    def test_run1(self):
+        # Scripted inputs, one hour of plant time
+        self.client.script("AL1_ST_X_POS", follow("AL1_Z_SET", 1000))
+        self.client.schedule([(0.5, "S_AL1_B", True),
+            (1800, "S_AL1_B", False)])
+        cycle= make_cycle(self.client)
+        stats= self.client.run(cycle, 0.1, duration=3600)
+        self.assertEqual(stats["cycles"], 36000)
+        self.assertAlmostEqual(stats["virtual_time"], 3600)
+        self.assertAlmostEqual(self.client.clock(), 3600)
+        self.assertGreater(stats["speedup"], 1)
+        self.assertGreater(stats["io_us"]["mean"], 0)
+        # Moved back to 0 after the box left
+        self.assertEqual(self.client.get_value("AL1_ST_X_POS"), 0)
+        self.assertGreater(cycle.state["at_position"], 17000)
+
+    def test_run2(self):
+        # Recorded session replayed, and recorded again
+        recorded_state= self.record_session()
+        client= ReplayClient(filepath= ReplayClientTest.MOCK_TAGS_PATH,
+            trace= ReplayClientTest.MOCK_TRACE_PATH)
+        cycle= make_cycle(client)
+        with TraceRecorder(client, ReplayClientTest.MOCK_REPLAY_PATH,
+            clock=client.clock) as recorder:
+            stats= client.run(recorder.wrap(cycle), 0.1)
+        self.assertEqual(stats["cycles"], 30)
+        self.assertEqual(cycle.state, recorded_state)
+        # Same writes, scan by scan
+        recorded= [scan.writes for scan in
+            TraceLog(ReplayClientTest.MOCK_TRACE_PATH).scans()]
+        replayed= [scan.writes for scan in
+            TraceLog(ReplayClientTest.MOCK_REPLAY_PATH).scans()]
+        self.assertEqual(replayed, recorded)
+
+    def test_advance1(self):
+        # Recorded scans applied in the replayed scan they start in, e.g.
+        #   with replayed scans offset from the recorded ones
+        self.record_session(cycles=8)
+        client= ReplayClient(filepath= ReplayClientTest.MOCK_TAGS_PATH,
+            trace= ReplayClientTest.MOCK_TRACE_PATH)
+        # Recorded scans up to 0.4 s
+        client.advance(0.35, 0.1)
+        self.assertFalse(client.get_value("S_AL1_B"))
+        # Box at the entry from the recorded scan at 0.5 s
+        client.advance(0.45, 0.1)
+        self.assertTrue(client.get_value("S_AL1_B"))
+        # Replayed through the TraceReplay of the log
+        self.assertEqual(client.replay.scan.index, 5)
+        self.assertEqual(client.replay.peek_scan().index, 6)
+
+    @unittest.expectedFailure
+    def test_run_fail1(self):
+        # Without trace, the run needs a length
+        self.client.run(lambda: None, 0.1)
@@ -0,0 +1,191 @@
+# Imports
+import unittest, os, threading, time
+import pandas as pd
+
+# Self-defined imports
+from src.modbusclient import FactoryIOModbusClient, DeadlineExceededError
+from src.simulator import FactoryIOSimulator
+from src.requestqueue import RequestQueue, HIGH, NORMAL, LOW
+
+def wait_depth(queue, depth, timeout=2.0):
+    """Wait until depth requests are waiting in the queue."""
+    end= time.monotonic() + timeout
+    while queue.depth < depth:
+        if time.monotonic() > end:
+            raise AssertionError("Queue depth {} not reached".format(depth))
+        time.sleep(0.001)
+
+class RequestQueueTest(unittest.TestCase):
+    # Setup mock FactoryIO tags
+    mock_tags_dict= {
+        "Name": ["S_AL1_B", "RP_AL1_ST_CLAMP", "AL1_ST_X_POS", "AL1_Z_SET"],
+        "Type": ["Input", "Output", "Input", "Output"],
+        "Data Type": ["Bool", "Bool", "Int", "Int"],
+        "Address": ["Input 0", "Coil 54", "Input Reg 14", "Holding Reg 2"]
+    }
+    MOCK_TAGS_PATH= "./test/integration/mock_requestqueue_tags.csv"
+
+    # SETUP
+    # ===================================================================================
+    @classmethod
+    def setUpClass(cls):
+        # Create mock tags dataframe
+        mock_tags_df= pd.DataFrame.from_dict(RequestQueueTest.mock_tags_dict)
+        # Save to file
+        mock_tags_df.to_csv(RequestQueueTest.MOCK_TAGS_PATH, index=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        # Delete
+        os.remove(RequestQueueTest.MOCK_TAGS_PATH)
+
+    def setUp(self):
+        # Start simulator and connect a client with a request queue
+        self.simulator= FactoryIOSimulator(
+            filepath= RequestQueueTest.MOCK_TAGS_PATH)
+        host, port= self.simulator.start()
+        self.queue= RequestQueue()
+        self.fmc= FactoryIOModbusClient(host, port,
+            filepath= RequestQueueTest.MOCK_TAGS_PATH,
+            request_queue=self.queue)
+        self.assertTrue(self.fmc.connect())
+
+    def tearDown(self):
+        self.fmc.close()
+        self.simulator.stop()
+
+    # ===================================================================================
+    # TESTING
+    # ===================================================================================
+    # RequestQueue
+    def test_order1(self):
+        # Waiting requests served by priority class, then arrival
+        queue= RequestQueue()
+        served= []
+        def request(label, priority):
+            queue.acquire(priority)
+            served.append(label)
+            queue.release()
+        queue.acquire(NORMAL)
+        threads= []
+        for depth, (label, priority) in enumerate([("poll", LOW),
+            ("read1", NORMAL), ("write", HIGH), ("read2", NORMAL)], 1):
+            thread= threading.Thread(target=request, args=(label, priority))
+            thread.start()
+            threads.append(thread)
+            wait_depth(queue, depth)
+        queue.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(served, ["write", "read1", "read2", "poll"])
+        snapshot= queue.snapshot()
+        self.assertEqual((snapshot["depth"], snapshot["max_depth"]), (0, 4))
+        self.assertEqual(snapshot["waits"]["normal"]["count"], 3)
+        self.assertGreater(snapshot["waits"]["low"]["max_us"], 0)
+
+    def test_deadline1(self):
+        # Stale request dropped, the next one served
+        queue= RequestQueue(deadlines={LOW: 0.05})
+        acquired= []
+        def poll():
+            acquired.append(queue.acquire(LOW))
+        queue.acquire(HIGH)
+        # Nested requests of the holder don't queue
+        queue.acquire(HIGH)
+        queue.release()
+        thread= threading.Thread(target=poll)
+        thread.start()
+        thread.join()
+        self.assertEqual(acquired, [False])
+        self.assertEqual(queue.dropped[LOW], 1)
+        self.assertEqual(queue.depth, 0)
+        queue.release()
+        self.assertTrue(queue.acquire(LOW))
+        queue.release()
+
+    # ===================================================================================
+    # Client
+    def test_client1(self):
+        # Write jumping ahead of a pending read, behind a slow read
+        self.simulator.latency= 0.2
+        done= []
+        def read():
+            self.fmc.read_tag("AL1_ST_X_POS")
+            done.append("read")
+        def write():
+            self.fmc.write_tag("RP_AL1_ST_CLAMP", True)
+            done.append("write")
+        slow= threading.Thread(target=read)
+        slow.start()
+        time.sleep(0.05)
+        threads= [threading.Thread(target=read),
+            threading.Thread(target=write)]
+        for depth, thread in enumerate(threads, 1):
+            thread.start()
+            wait_depth(self.queue, depth)
+        for thread in [slow] + threads:
+            thread.join()
+        self.assertEqual(done, ["read", "write", "read"])
+        self.assertTrue(self.simulator.get_value("RP_AL1_ST_CLAMP"))
+        self.assertEqual(self.queue.snapshot()["waits"]["high"]["count"], 1)
+
+    def test_client2(self):
+        # Explicit priority and deadline
+        self.simulator.latency= 0.2
+        slow= threading.Thread(target=self.fmc.read_tag,
+            args=("AL1_ST_X_POS",))
+        slow.start()
+        time.sleep(0.05)
+        with self.fmc.priority(LOW, deadline=0.01):
+            with self.assertRaises(DeadlineExceededError):
+                self.fmc.read_tag("S_AL1_B")
+        slow.join()
+        self.assertEqual(self.queue.dropped[LOW], 1)
+        self.simulator.latency= 0.0
+        self.assertFalse(self.fmc.read_tag("S_AL1_B"))
+
+    def test_instrumented1(self):
+        # Request round trips exclude the wait for the queue
+        fmc= FactoryIOModbusClient(*self.simulator.address,
+            filepath= RequestQueueTest.MOCK_TAGS_PATH,
+            request_queue=self.queue, instrument=True)
+        self.assertTrue(fmc.connect())
+        self.queue.acquire(HIGH)
+        thread= threading.Thread(target=fmc.read_tag, args=("AL1_ST_X_POS",))
+        thread.start()
+        wait_depth(self.queue, 1)
+        time.sleep(0.1)
+        self.queue.release()
+        thread.join()
+        fmc.close()
+        self.assertLess(fmc.metrics.function_codes[4].max, 0.1e9)
+        self.assertGreaterEqual(fmc.metrics.tags["AL1_ST_X_POS"].max, 0.1e9)
+
+    def test_poller1(self):
+        # Subscription polls sent with low priority
+        self.fmc.subscribe(["S_AL1_B"], 0.01, callback=lambda values: None)
+        self.fmc.poller.poll(0.01)
+        self.assertGreater(self.queue.waits[LOW].count, 0)
+
+    def test_poller2(self):
+        # Polls dropped behind a slow request counted, not logged as failures
+        self.simulator.latency= 0.2
+        slow= threading.Thread(target=self.fmc.read_tag,
+            args=("AL1_ST_X_POS",))
+        with self.assertNoLogs(level="WARNING"):
+            slow.start()
+            time.sleep(0.05)
+            subscription= self.fmc.subscribe(["S_AL1_B"], 0.01,
+                callback=lambda values: None)
+            slow.join()
+            self.fmc.unsubscribe(subscription)
+            time.sleep(0.05)
+        self.assertGreater(self.fmc.poller.dropped, 0)
+        self.assertEqual(self.fmc.poller.errors, 0)
+
+    @unittest.expectedFailure
+    def test_client_fail1(self):
+        # Multi-request calls are atomic in thread-safe mode
+        FactoryIOModbusClient(*self.simulator.address,
+            filepath= RequestQueueTest.MOCK_TAGS_PATH,
+            request_queue=RequestQueue(), thread_safe=True)
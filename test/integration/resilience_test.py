@@ -0,0 +1,186 @@
+# Imports
+import unittest, os, queue
+import pandas as pd
+from pymodbus.exceptions import ModbusException
+
+# Self-defined imports
+from src.modbusclient import FactoryIOModbusClient, CircuitOpenError
+from src.simulator import FactoryIOSimulator
+from src.scanscheduler import VirtualClock
+import src.resilience as resilience
+from src.resilience import RetryPolicy, CircuitBreaker
+
+class ResilienceTest(unittest.TestCase):
+    # Setup mock FactoryIO tags
+    mock_tags_dict= {
+        "Name": ["S_AL1_B", "AL2_ST_GRAB", "AL1_ST_X_POS", "AL1_Z_SET"],
+        "Type": ["Input", "Output", "Input", "Output"],
+        "Data Type": ["Bool", "Bool", "Int", "Int"],
+        "Address": ["Input 0", "Coil 54", "Input Reg 14", "Holding Reg 2"]
+    }
+    MOCK_TAGS_PATH= "./test/integration/mock_resilience_tags.csv"
+
+    # SETUP
+    # ===================================================================================
+    @classmethod
+    def setUpClass(cls):
+        # Create mock tags dataframe
+        mock_tags_df= pd.DataFrame.from_dict(ResilienceTest.mock_tags_dict)
+        # Save to file
+        mock_tags_df.to_csv(ResilienceTest.MOCK_TAGS_PATH, index=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        # Delete
+        os.remove(ResilienceTest.MOCK_TAGS_PATH)
+
+    def setUp(self):
+        # Start simulator, restarted on the same port by the tests
+        self.simulator= FactoryIOSimulator(
+            filepath= ResilienceTest.MOCK_TAGS_PATH)
+        self.host, self.simulator.port= self.simulator.start()
+        # Virtual time of backoffs and breaker
+        self.virtual= VirtualClock()
+        self.delays= []
+        self.clients= []
+
+    def tearDown(self):
+        for fmc in self.clients:
+            fmc.close()
+        self.simulator.stop()
+
+    def make_client(self, **kwargs):
+        fmc= FactoryIOModbusClient(self.host, self.simulator.port,
+            filepath= ResilienceTest.MOCK_TAGS_PATH, timeout=0.5, **kwargs)
+        self.clients.append(fmc)
+        self.assertTrue(fmc.connect())
+        return fmc
+
+    def restart_on_sleep(self, delay):
+        """Backoff sleep restarting the simulator after the first retry."""
+        self.delays.append(delay)
+        self.virtual.sleep(delay)
+        if len(self.delays) == 2:
+            self.simulator.start()
+
+    # ===================================================================================
+    # TESTING
+    # ===================================================================================
+    # Policies
+    def test_policy1(self):
+        retry= RetryPolicy(retries=5, backoff=0.1, backoff_max=0.3)
+        self.assertEqual([retry.delay(attempt) for attempt in range(1, 5)],
+            [0.1, 0.2, 0.3, 0.3])
+
+    def test_breaker1(self):
+        breaker= CircuitBreaker(failure_threshold=2, reset_timeout=1.0,
+            clock=self.virtual.clock)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, resilience.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, resilience.OPEN)
+        self.assertFalse(breaker.allow())
+        self.virtual.sleep(1.0)
+        # Trial request
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, resilience.HALF_OPEN)
+        breaker.record_failure()
+        self.assertEqual((breaker.state, breaker.opened), (resilience.OPEN, 2))
+        self.virtual.sleep(1.0)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual((breaker.state, breaker.failures),
+            (resilience.CLOSED, 0))
+
+    def test_breaker3(self):
+        # Half open: a single trial request at a time
+        breaker= CircuitBreaker(failure_threshold=1, reset_timeout=1.0,
+            clock=self.virtual.clock)
+        breaker.record_failure()
+        self.virtual.sleep(1.0)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.remaining(), 1.0)
+        breaker.record_success()
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+        # Trial without outcome replaced after reset_timeout
+        breaker.record_failure()
+        self.virtual.sleep(1.0)
+        self.assertTrue(breaker.allow())
+        self.virtual.sleep(0.5)
+        self.assertFalse(breaker.allow())
+        self.virtual.sleep(0.5)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual((breaker.state, breaker.opened), (resilience.OPEN, 3))
+
+    # ===================================================================================
+    # Client
+    def test_retry1(self):
+        # Server back after two attempts
+        fmc= self.make_client(instrument=True, retry=RetryPolicy(retries=3,
+            backoff=0.1, sleep=self.restart_on_sleep))
+        self.simulator.set_value("AL1_ST_X_POS", 42)
+        self.simulator.stop()
+        self.assertEqual(fmc.read_tag("AL1_ST_X_POS"), 42)
+        self.assertEqual(self.delays, [0.1, 0.2])
+        self.assertEqual(fmc.metrics.retries, 2)
+        self.assertEqual(fmc.metrics.tags["AL1_ST_X_POS"].errors, 0)
+
+    def test_resync1(self):
+        # Confirmed outputs written again once reconnected
+        fmc= self.make_client(write_cache=True, retry=RetryPolicy(
+            sleep=self.restart_on_sleep))
+        fmc.write_tags({"AL1_Z_SET": 7, "AL2_ST_GRAB": True})
+        self.simulator.stop()
+        # e.g. scene restarted
+        self.simulator.set_value("AL1_Z_SET", 0)
+        self.simulator.set_value("AL2_ST_GRAB", False)
+        # Written after the re-synced outputs
+        self.assertFalse(fmc.write_tag("AL1_Z_SET", 8).isError())
+        self.assertEqual(self.simulator.get_value("AL1_Z_SET"), 8)
+        self.assertTrue(self.simulator.get_value("AL2_ST_GRAB"))
+        # Write cache restored
+        self.assertEqual(fmc._write_cache["AL2_ST_GRAB"][0], True)
+
+    def test_breaker2(self):
+        fmc= self.make_client(retry=RetryPolicy(retries=1,
+            sleep=self.virtual.sleep), breaker=CircuitBreaker(
+            failure_threshold=2, reset_timeout=1.0, clock=self.virtual.clock))
+        self.simulator.stop()
+        with self.assertRaises(ModbusException):
+            fmc.read_tag("S_AL1_B")
+        self.assertEqual(fmc.breaker.state, resilience.OPEN)
+        # Fails at once, without connecting
+        with self.assertRaises(CircuitOpenError):
+            fmc.read_tags(["S_AL1_B", "AL1_ST_X_POS"])
+        self.assertFalse(fmc.is_socket_open())
+        # Trial request once the server is back
+        self.simulator.start()
+        self.virtual.sleep(1.0)
+        self.assertFalse(fmc.read_tag("S_AL1_B"))
+        self.assertEqual(fmc.breaker.state, resilience.CLOSED)
+
+    def test_poller1(self):
+        # Transport failures don't stop polling
+        fmc= self.make_client(retry=RetryPolicy(retries=0))
+        changes= queue.Queue()
+        fmc.subscribe(["S_AL1_B"], 0.01, queue=changes)
+        self.assertEqual(changes.get(timeout=2), {"S_AL1_B": False})
+        self.simulator.stop()
+        with self.assertRaises(ModbusException):
+            fmc.read_tag("AL1_ST_X_POS")
+        self.assertTrue(fmc.poller.running)
+        self.simulator.start()
+        self.simulator.set_value("S_AL1_B", True)
+        self.assertEqual(changes.get(timeout=2), {"S_AL1_B": True})
+
+    @unittest.expectedFailure
+    def test_retry_fail1(self):
+        # Retries exhausted
+        fmc= self.make_client(retry=RetryPolicy(retries=2,
+            sleep=self.virtual.sleep))
+        self.simulator.stop()
+        fmc.read_tag("S_AL1_B")
@@ -0,0 +1,188 @@
+# Imports
+import unittest, os, time, threading
+import pandas as pd
+
+# Self-defined imports
+from src.modbusclient import FactoryIOModbusClient
+from src.simulator import FactoryIOSimulator, follow
+
+class FactoryIOSimulatorTest(unittest.TestCase):
+    # Setup mock FactoryIO tags
+    mock_tags_dict= {
+        "Name": ["S_AL1_B", "AL2_ST_GRAB", "AL1_X_POS", "AL1_X_SET"],
+        "Type": ["Input", "Output", "Input", "Output"],
+        "Data Type": ["Bool", "Bool", "Real", "Real"],
+        "Address": ["Input 0", "Coil 54", "Input Reg 11", "Holding Reg 2"]
+    }
+    MOCK_TAGS_PATH= "./test/integration/mock_simulator_tags.csv"
+
+    # SETUP
+    # ===================================================================================
+    @classmethod
+    def setUpClass(cls):
+        # Create mock tags dataframe
+        mock_tags_df= pd.DataFrame.from_dict(
+            FactoryIOSimulatorTest.mock_tags_dict)
+        # Save to file
+        mock_tags_df.to_csv(FactoryIOSimulatorTest.MOCK_TAGS_PATH, 
+            index=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        # Delete
+        os.remove(FactoryIOSimulatorTest.MOCK_TAGS_PATH)
+
+    def setUp(self):
+        # Start simulator and connect client
+        self.simulator= FactoryIOSimulator(
+            filepath= FactoryIOSimulatorTest.MOCK_TAGS_PATH)
+        host, port= self.simulator.start()
+        self.fmc= FactoryIOModbusClient(host, port, 
+            filepath= FactoryIOSimulatorTest.MOCK_TAGS_PATH)
+        self.assertTrue(self.fmc.connect())
+
+    def tearDown(self):
+        self.fmc.close()
+        self.simulator.stop()
+
+    # ===================================================================================
+    # TESTING
+    # ===================================================================================
+    # __init__
+    def test_constructor(self):
+        self.assertNotEqual(self.simulator.address[1], 0)
+        # Datastore sized to the tags
+        self.assertEqual(len(self.simulator.store.store["c"].values), 55)
+        self.assertEqual(len(self.simulator.store.store["i"].values), 12)
+
+    # ===================================================================================
+    # read / write
+    def test_read1(self):
+        self.simulator.set_value("S_AL1_B", True)
+        self.simulator.set_value("AL1_X_POS", 123)
+        self.assertIs(self.fmc.read_tag("S_AL1_B"), True)
+        self.assertEqual(self.fmc.read_tag("AL1_X_POS"), 123)
+        self.assertEqual(self.simulator.requests, 2)
+
+    def test_write1(self):
+        self.fmc.write_tag("AL2_ST_GRAB", True)
+        self.fmc.write_tag("AL1_X_SET", 700)
+        self.assertIs(self.simulator.get_value("AL2_ST_GRAB"), True)
+        self.assertEqual(self.simulator.get_value("AL1_X_SET"), 700)
+
+    def test_latency1(self):
+        self.simulator.latency= 0.05
+        start= time.perf_counter()
+        self.fmc.read_tag("S_AL1_B")
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+
+    @unittest.expectedFailure
+    def test_set_value_fail1(self):
+        self.simulator.set_value("TAG_NOT_PRESENT", True)
+
+    # ===================================================================================
+    # dynamics
+    def test_dynamics1(self):
+        self.simulator.script("S_AL1_B", 
+            lambda simulator, t, value: t >= 1.0)
+        self.simulator.step(0.5)
+        self.assertIs(self.fmc.read_tag("S_AL1_B"), False)
+        self.simulator.step(1.5)
+        self.assertIs(self.fmc.read_tag("S_AL1_B"), True)
+
+    def test_dynamics2(self):
+        # Position follows set point at 100 units/s
+        self.simulator.script("AL1_X_POS", follow("AL1_X_SET", 100))
+        self.fmc.write_tag("AL1_X_SET", 150)
+        self.simulator.step(0.0)
+        self.simulator.step(1.0)
+        self.assertEqual(self.fmc.read_tag("AL1_X_POS"), 100)
+        self.simulator.step(2.0)
+        self.assertEqual(self.fmc.read_tag("AL1_X_POS"), 150)
+
+    def test_dynamics3(self):
+        # Background updates
+        self.simulator.script("AL1_X_POS", lambda simulator, t, value: 42)
+        deadline= time.monotonic() + 2
+        while self.fmc.read_tag("AL1_X_POS") != 42:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    # ===================================================================================
+    # data types
+    def typed_client(self, data_types):
+        # Restart simulator and client with typed registers
+        self.tearDown()
+        self.simulator= FactoryIOSimulator(
+            filepath= FactoryIOSimulatorTest.MOCK_TAGS_PATH, 
+            data_types= data_types)
+        host, port= self.simulator.start()
+        self.fmc= FactoryIOModbusClient(host, port, 
+            filepath= FactoryIOSimulatorTest.MOCK_TAGS_PATH,
+            data_types= data_types)
+        self.assertTrue(self.fmc.connect())
+
+    def test_data_types1(self):
+        # float32 registers
+        self.typed_client({"Real": "float32"})
+        self.simulator.set_value("AL1_X_POS", 12.5)
+        self.assertEqual(self.fmc.read_tag("AL1_X_POS"), 12.5)
+        self.assertEqual(self.fmc.read_tags(["S_AL1_B", "AL1_X_POS"]),
+            {"S_AL1_B": False, "AL1_X_POS": 12.5})
+        self.fmc.write_tag("AL1_X_SET", -0.25)
+        self.assertEqual(self.simulator.get_value("AL1_X_SET"), -0.25)
+        # Both registers written
+        self.assertEqual(self.simulator.store.getValues(3, 2, 2),
+            [0xBE80, 0x0000])
+
+    def test_data_types2(self):
+        # Scaled, little endian words
+        self.typed_client({"AL1_X_SET": ("int32", "little", "big", 0.1, 0)})
+        self.assertEqual(self.fmc.write_tags({"AL1_X_SET": 7000.5}),
+            {"AL1_X_SET": True})
+        # 70005 = 0x00011175, least significant word first
+        self.assertEqual(self.simulator.store.getValues(3, 2, 2),
+            [0x1175, 0x0001])
+        self.assertAlmostEqual(self.simulator.get_value("AL1_X_SET"), 7000.5)
+
+    @unittest.expectedFailure
+    def test_data_types_fail1(self):
+        # Value out of range of int16
+        self.typed_client({"Real": "int16"})
+        self.fmc.write_tag("AL1_X_SET", 40000)
+
+    # ===================================================================================
+    # thread safety
+    def test_threads1(self):
+        # Controller threads sharing one thread-safe connection, faults 
+        #   injected from another thread
+        self.fmc.close()
+        host, port= self.simulator.address
+        self.fmc= FactoryIOModbusClient(host, port, 
+            filepath= FactoryIOSimulatorTest.MOCK_TAGS_PATH, thread_safe=True,
+            write_cache=True)
+        self.assertTrue(self.fmc.connect())
+        self.simulator.set_value("AL1_X_POS", 321)
+        errors= []
+        def controller(idx):
+            try:
+                for cycle in range(50):
+                    values= self.fmc.read_tags(["S_AL1_B", "AL1_X_POS"])
+                    assert values["AL1_X_POS"] == 321, values
+                    self.fmc.write_tags({"AL1_X_SET": idx * 100 + cycle,
+                        "AL2_ST_GRAB": cycle % 2 == 0})
+            except Exception as error:
+                errors.append(error)
+        def injector():
+            for cycle in range(50):
+                self.fmc.read_fault("S_AL1_B", cycle % 2 == 0)
+                self.fmc.clear_fault("S_AL1_B")
+        threads= [threading.Thread(target=controller, args=(idx,))
+            for idx in range(4)] + [threading.Thread(target=injector)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        # Last write is the last cycle of a controller
+        self.assertEqual(self.simulator.get_value("AL1_X_SET") % 100, 49)
@@ -1,6 +1,8 @@
 # Imports
-import unittest
+import unittest, os, shutil, tempfile
+from unittest.mock import MagicMock
 import src.FMC_functions as FMC_functions
+datatypes= FMC_functions.datatypes
 
 class FMC_functionsTest(unittest.TestCase):
     # ================================================================
@@ -128,3 +130,326 @@ class FMC_functionsTest(unittest.TestCase):
             }
         )
 
+
+    # ===============================================================
+    # parse_address
+    def test_parse_address1(self):
+        self.assertEqual(
+            [FMC_functions.parse_address(address) for address in 
+                ["Input 0", "Coil 6", "Holding Reg 17", " Input Reg 80 "]],
+            [0, 6, 17, 80]
+        )
+
+    def test_parse_address2(self):
+        # Malformed addresses are returned as is
+        self.assertEqual(
+            [FMC_functions.parse_address(address) for address in 
+                ["Input p", "Holding Reg17", "Input Reg", "Register 3"]],
+            ["Input p", "Holding Reg17", "Input Reg", "Register 3"]
+        )
+
+    # ===============================================================
+    # parse_addresses
+    def test_parse_addresses1(self):
+        numbers, spaces, errors= FMC_functions.parse_addresses(
+            ["Input 0", "Coil 6", "Holding Reg 17", "Input Reg 80"])
+        self.assertEqual(list(numbers), [0, 6, 17, 80])
+        self.assertEqual(list(spaces), [0x02, 0x01, 0x03, 0x04])
+        self.assertEqual(errors, [])
+
+    def test_parse_addresses2(self):
+        # Malformed addresses are reported, valid ones still parsed
+        numbers, spaces, errors= FMC_functions.parse_addresses(
+            ["Input p", " Coil 6 ", "Holding Reg17", "Input Reg", 
+                "Register 3", None])
+        self.assertEqual(list(numbers), [-1, 6, -1, -1, -1, -1])
+        self.assertEqual(list(spaces), [0, 0x01, 0, 0, 0, 0])
+        self.assertEqual(errors, [
+            FMC_functions.AddressError(0, "Input p", 
+                "missing address number"),
+            FMC_functions.AddressError(2, "Holding Reg17", 
+                "malformed address"),
+            FMC_functions.AddressError(3, "Input Reg", 
+                "missing address number"),
+            FMC_functions.AddressError(4, "Register 3", 
+                "unknown address space"),
+            FMC_functions.AddressError(5, None, "not a string")
+        ])
+
+    def test_parse_addresses3(self):
+        # Line breaks don't shift addresses
+        numbers, _, errors= FMC_functions.parse_addresses(
+            ["Coil 1\nCoil 2", "Coil 3", ""])
+        self.assertEqual(list(numbers), [-1, 3, -1])
+        self.assertEqual([error.index for error in errors], [0, 2])
+
+    def test_parse_addresses4(self):
+        # Malformed addresses the joined fast path can't tell apart
+        numbers, spaces, errors= FMC_functions.parse_addresses(
+            ["Coil ", "Input 3"])
+        self.assertEqual(list(numbers), [-1, 3])
+        self.assertEqual(list(spaces), [0, 0x02])
+        self.assertEqual(errors, [
+            FMC_functions.AddressError(0, "Coil ", "missing address number")])
+        numbers, _, errors= FMC_functions.parse_addresses(["Coil \u00b2"])
+        self.assertEqual(list(numbers), [-1])
+        self.assertEqual([error.index for error in errors], [0])
+        # Repeated prefix, not compensated by a missing one
+        numbers, spaces, errors= FMC_functions.parse_addresses(
+            ["Coil Coil 3", "7"])
+        self.assertEqual(list(numbers), [-1, 7])
+        self.assertEqual(list(spaces), [0, 0])
+        self.assertEqual(errors, [FMC_functions.AddressError(0, 
+            "Coil Coil 3", "unknown address space")])
+
+    # ===============================================================
+    # read_tags_file
+    def write_tags_file(self, content):
+        tags_file= tempfile.NamedTemporaryFile("wb", suffix=".csv", 
+            delete=False)
+        with tags_file:
+            tags_file.write(content)
+        self.addCleanup(os.remove, tags_file.name)
+        return tags_file.name
+
+    def test_read_tags_file1(self):
+        # FactoryIO export with byte order mark
+        path= self.write_tags_file(
+            b"\xef\xbb\xbfName,Type,Data Type,Address\r\n"
+            b"S_AL1_B,Input,Bool,Input 0\r\n"
+            b"\"Machining Center 3 (Reset)\",Output,Bool,Coil 187\r\n"
+            b"\r\n"
+            b"AL1_Z_SET,Output,Real,Holding Reg 2\r\n")
+        self.assertEqual(FMC_functions.read_tags_file(path), {
+            "Name": ["S_AL1_B", "Machining Center 3 (Reset)", "AL1_Z_SET"],
+            "Type": ["Input", "Output", "Output"],
+            "Data Type": ["Bool", "Bool", "Real"],
+            "Address": [0, 187, 2]
+        })
+
+    def test_read_tags_file2(self):
+        # Column order and malformed addresses
+        path= self.write_tags_file(
+            b"Address,Name,Data Type,Type\n"
+            b"Input Reg 11,AL2_ST_Z_POS,Real,Input\n"
+            b"Input Reg,BROKEN,Real,Input\n")
+        tags= FMC_functions.read_tags_file(path)
+        self.assertEqual(tags["Name"], ["AL2_ST_Z_POS", "BROKEN"])
+        self.assertEqual(tags["Address"], [11, "Input Reg"])
+
+    @unittest.expectedFailure
+    def test_read_tags_file_fail1(self):
+        # Missing column
+        path= self.write_tags_file(b"Name,Type,Address\nS,Input,Input 0\n")
+        FMC_functions.read_tags_file(path)
+
+    # ===============================================================
+    # build_tag_index
+    def test_build_tag_index1(self):
+        tag_index= FMC_functions.build_tag_index({
+            "Name": ["S_AL1_B", "AL1_Z_SET", "AL1_G_SC_TG", "S_AL1_B", 
+                "AL1_LABEL"],
+            "Type": ["Input", "Output", "Output", "Output", "Output"],
+            "Data Type": ["Bool", "Real", "Int", "Bool", "String"],
+            "Address": [0, 2, 6, 9, 7]
+        })
+        # Discrete Input
+        tag= tag_index["S_AL1_B"]
+        self.assertEqual(tag.address, 0)
+        self.assertEqual(tag.read_type, "read_discrete_inputs")
+        self.assertEqual(tag.read_fc, 0x02)
+        self.assertEqual(tag.unit, 0x1)
+        self.assertIsNone(tag.write_type)
+        # Holding Register
+        tag= tag_index["AL1_Z_SET"]
+        self.assertEqual(tag.read_fc, 0x03)
+        self.assertEqual(tag.write_type, "write_register")
+        self.assertEqual(tag.write_fc, 0x06)
+        # Method handles
+        client= MagicMock()
+        self.assertIs(tag.reader(client), client.read_holding_registers)
+        self.assertIs(tag.writer(client), client.write_register)
+        response= MagicMock()
+        response.getRegister.return_value= 7
+        self.assertEqual(tag.decoder(response), 7)
+        response.getRegister.assert_called_with(0)
+        self.assertIsNone(tag.datatype)
+        # Int registers are signed 16-bit
+        tag= tag_index["AL1_G_SC_TG"]
+        self.assertEqual(tag.read_type, "read_holding_registers")
+        self.assertEqual(tag.write_type, "write_register")
+        self.assertEqual(tag.datatype, datatypes.INT16)
+        response.registers= [0xFFFE]
+        self.assertEqual(tag.decoder(response), -2)
+        # Unsupported types are compiled but can't be read or written
+        self.assertIsNone(tag_index["AL1_LABEL"].read_type)
+        self.assertIsNone(tag_index["AL1_LABEL"].reader)
+        self.assertIsNone(tag_index["AL1_LABEL"].write_type)
+
+    @unittest.expectedFailure
+    def test_build_tag_index_fail1(self):
+        # Index is read-only
+        tag_index= FMC_functions.build_tag_index({
+            "Name": ["S_AL1_B"], "Type": ["Input"], "Data Type": ["Bool"],
+            "Address": [0]
+        })
+        tag_index["S_AL1_B"]= None
+
+    @unittest.expectedFailure
+    def test_build_tag_index_fail2(self):
+        # Tags are immutable
+        tag_index= FMC_functions.build_tag_index({
+            "Name": ["S_AL1_B"], "Type": ["Input"], "Data Type": ["Bool"],
+            "Address": [0]
+        })
+        tag_index["S_AL1_B"].address= 5
+
+    # ===============================================================
+    # load_compiled_tags
+    def test_load_compiled_tags1(self):
+        path= self.write_tags_file(
+            b"Name,Type,Data Type,Address\n"
+            b"S_AL1_B,Input,Bool,Input 0\n"
+            b"AL1_Z_SET,Output,Real,Holding Reg 2\n")
+        cache_dir= tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        # Cache miss: file parsed and cache written
+        tags, tag_index= FMC_functions.load_compiled_tags(path, cache_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        # Cache hit
+        cached_tags, cached_index= FMC_functions.load_compiled_tags(path, 
+            cache_dir)
+        self.assertEqual(cached_tags, tags)
+        self.assertEqual(list(cached_index), ["S_AL1_B", "AL1_Z_SET"])
+        tag= cached_index["AL1_Z_SET"]
+        self.assertEqual((tag.address, tag.read_type, tag.write_type,
+            tag.read_fc, tag.write_fc), (2, "read_holding_registers", 
+            "write_register", 0x03, 0x06))
+        self.assertIs(tag.reader, tag_index["AL1_Z_SET"].reader)
+        self.assertIs(tag.decoder, tag_index["AL1_Z_SET"].decoder)
+
+    def test_load_compiled_tags2(self):
+        # Cache keyed by content, corrupt cache files are rebuilt
+        path= self.write_tags_file(
+            b"Name,Type,Data Type,Address\nS_AL1_B,Input,Bool,Input 0\n")
+        cache_dir= tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        FMC_functions.load_compiled_tags(path, cache_dir)
+        cache_path= os.path.join(cache_dir, os.listdir(cache_dir)[0])
+        with open(cache_path, "wb") as cache_file:
+            cache_file.write(b"corrupt")
+        _, tag_index= FMC_functions.load_compiled_tags(path, cache_dir)
+        self.assertEqual(tag_index["S_AL1_B"].address, 0)
+        self.assertIsNotNone(FMC_functions.load_tags_cache(cache_path))
+        # Modified tags file
+        with open(path, "ab") as tags_file:
+            tags_file.write(b"S_AL1_C,Input,Bool,Input 1\n")
+        _, tag_index= FMC_functions.load_compiled_tags(path, cache_dir)
+        self.assertEqual(tag_index["S_AL1_C"].address, 1)
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+    # ===============================================================
+    # plan_reads
+    def test_plan_reads1(self):
+        tag_index= FMC_functions.build_tag_index({
+            "Name": ["S0", "S1", "S5", "S40", "C3", "R0", "R2"],
+            "Type": ["Input", "Input", "Input", "Input", "Output", "Input",
+                "Input"],
+            "Data Type": ["Bool", "Bool", "Bool", "Bool", "Bool", "Real",
+                "Real"],
+            "Address": [0, 1, 5, 40, 3, 0, 2]
+        })
+        blocks= FMC_functions.plan_reads(tag_index.values(), max_gap=8)
+        spans= sorted((block.read_type, block.address, block.count, 
+            [tag.name for tag in block.tags]) for block in blocks)
+        self.assertEqual(spans, [
+            ("read_coils", 3, 1, ["C3"]),
+            ("read_discrete_inputs", 0, 6, ["S0", "S1", "S5"]),
+            ("read_discrete_inputs", 40, 1, ["S40"]),
+            ("read_input_registers", 0, 3, ["R0", "R2"])
+        ])
+
+    def test_plan_reads2(self):
+        # No gap tolerance: only contiguous addresses are merged
+        tag_index= FMC_functions.build_tag_index({
+            "Name": ["R0", "R1", "R3"],
+            "Type": ["Output"] * 3,
+            "Data Type": ["Real"] * 3,
+            "Address": [0, 1, 3]
+        })
+        blocks= FMC_functions.plan_reads(tag_index.values(), max_gap=0)
+        self.assertEqual([(block.address, block.count) for block in blocks],
+            [(0, 2), (3, 1)])
+
+    def test_plan_reads3(self):
+        # Blocks are split at the protocol limit of 125 registers
+        tag_index= FMC_functions.build_tag_index({
+            "Name": ["R{}".format(idx) for idx in range(300)],
+            "Type": ["Input"] * 300,
+            "Data Type": ["Real"] * 300,
+            "Address": list(range(300))
+        })
+        blocks= FMC_functions.plan_reads(tag_index.values())
+        self.assertEqual([(block.address, block.count) for block in blocks],
+            [(0, 125), (125, 125), (250, 50)])
+
+    @unittest.expectedFailure
+    def test_plan_reads_fail1(self):
+        # Unsupported tag type
+        tag_index= FMC_functions.build_tag_index({
+            "Name": ["AL1_LABEL"], "Type": ["Output"], 
+            "Data Type": ["String"], "Address": [7]
+        })
+        FMC_functions.plan_reads(tag_index.values())
+
+    # ===============================================================
+    # check_write_value
+    def test_check_write_value1(self):
+        tag_index= FMC_functions.build_tag_index({
+            "Name": ["C0", "R0"], "Type": ["Output", "Output"],
+            "Data Type": ["Bool", "Real"], "Address": [0, 0]
+        })
+        FMC_functions.check_write_value(tag_index["C0"], True)
+        FMC_functions.check_write_value(tag_index["R0"], 5)
+
+    @unittest.expectedFailure
+    def test_check_write_value_fail1(self):
+        tag_index= FMC_functions.build_tag_index({
+            "Name": ["R0"], "Type": ["Output"], "Data Type": ["Real"],
+            "Address": [0]
+        })
+        FMC_functions.check_write_value(tag_index["R0"], True)
+
+    # ===============================================================
+    # plan_writes
+    def test_plan_writes1(self):
+        tag_index= FMC_functions.build_tag_index({
+            "Name": ["C0", "C1", "C2", "C7", "R4", "R5"],
+            "Type": ["Output"] * 6,
+            "Data Type": ["Bool", "Bool", "Bool", "Bool", "Real", "Real"],
+            "Address": [0, 1, 2, 7, 4, 5]
+        })
+        items= [(tag_index["C2"], True), (tag_index["C0"], False),
+            (tag_index["C7"], True), (tag_index["C1"], True),
+            (tag_index["R4"], 10), (tag_index["R5"], 11)]
+        blocks= FMC_functions.plan_writes(items)
+        requests= sorted((block.write_type, block.address, block.payload())
+            for block in blocks)
+        self.assertEqual(requests, [
+            ("write_coil", 7, True),
+            ("write_coils", 0, [False, True, True]),
+            ("write_registers", 4, [10, 11])
+        ])
+
+    def test_plan_writes2(self):
+        # Blocks are split at the protocol limit of 123 registers
+        tag_index= FMC_functions.build_tag_index({
+            "Name": ["R{}".format(idx) for idx in range(200)],
+            "Type": ["Output"] * 200,
+            "Data Type": ["Real"] * 200,
+            "Address": list(range(200))
+        })
+        blocks= FMC_functions.plan_writes(
+            (tag, 0) for tag in tag_index.values())
+        self.assertEqual([(block.address, len(block.values)) 
+            for block in blocks], [(0, 123), (123, 77)])
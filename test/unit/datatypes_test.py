@@ -0,0 +1,104 @@
+# Imports
+import unittest
+import src.datatypes as datatypes
+
+class DataTypeTest(unittest.TestCase):
+    # ================================================================
+    # DataType
+    def test_constructor1(self):
+        data_type= datatypes.DataType("float32")
+        self.assertEqual(data_type.length, 2)
+        self.assertEqual(data_type.value_types, (int, float))
+        self.assertEqual(datatypes.INT16.length, 1)
+        self.assertEqual(datatypes.INT16.value_types, (int,))
+
+    @unittest.expectedFailure
+    def test_constructor_fail1(self):
+        # Unknown type
+        datatypes.DataType("float64")
+
+    @unittest.expectedFailure
+    def test_constructor_fail2(self):
+        # Unknown word order
+        datatypes.DataType("int32", word_order="middle")
+
+    # ================================================================
+    # decode / encode
+    def test_decode1(self):
+        self.assertEqual(datatypes.INT16.decode([0xFFFE]), -2)
+        self.assertEqual(datatypes.UINT32.decode([0x0001, 0x0002]), 0x10002)
+        self.assertEqual(datatypes.INT32.decode([0xFFFF, 0xFFFF]), -1)
+        self.assertEqual(datatypes.FLOAT32.decode([0x4148, 0x0000]), 12.5)
+
+    def test_decode2(self):
+        # Word and byte orders
+        self.assertEqual(datatypes.DataType("float32", word_order="little")
+            .decode([0x0000, 0x4148]), 12.5)
+        self.assertEqual(datatypes.DataType("float32", byte_order="little")
+            .decode([0x4841, 0x0000]), 12.5)
+        self.assertEqual(datatypes.DataType("uint16", byte_order="little")
+            .decode([0x0102]), 0x0201)
+
+    def test_decode3(self):
+        # Scaling
+        data_type= datatypes.DataType("int16", scale=0.5, offset=10)
+        self.assertEqual(data_type.decode([0xFFFE]), 9)
+        self.assertEqual(data_type.encode(9), [0xFFFE])
+
+    def test_encode1(self):
+        self.assertEqual(datatypes.FLOAT32.encode(12.5), [0x4148, 0x0000])
+        self.assertEqual(datatypes.INT32.encode(-1), [0xFFFF, 0xFFFF])
+        self.assertEqual(datatypes.DataType("uint32", word_order="little")
+            .encode(0x10002), [0x0002, 0x0001])
+
+    @unittest.expectedFailure
+    def test_encode_fail1(self):
+        # Out of range
+        datatypes.UINT16.encode(-1)
+
+    def test_encode_fail2(self):
+        # Float out of range of float32
+        with self.assertRaises(ValueError):
+            datatypes.FLOAT32.encode(1e40)
+
+    def test_encode_fail3(self):
+        # Infinite and NaN values of a scaled integer type
+        data_type= datatypes.DataType("int32", scale=0.1)
+        for value in (float("inf"), float("-inf"), float("nan")):
+            with self.assertRaisesRegex(ValueError, "out of range"):
+                data_type.encode(value)
+
+    # ================================================================
+    # as_data_type
+    def test_as_data_type1(self):
+        self.assertIs(datatypes.as_data_type(datatypes.FLOAT32),
+            datatypes.FLOAT32)
+        self.assertEqual(datatypes.as_data_type("float32"), datatypes.FLOAT32)
+        spec= ("int32", "little", "big", 0.1, 0)
+        self.assertEqual(datatypes.as_data_type(spec).spec(), spec)
+
+    # ================================================================
+    # BlockCodec
+    def test_block_codec1(self):
+        # Big endian fields, unpacked in place
+        codec= datatypes.BlockCodec(6, [("B", 3, datatypes.FLOAT32),
+            ("A", 0, datatypes.INT16)])
+        self.assertEqual(codec.names, ["A", "B"])
+        self.assertEqual(codec.decode([0xFFFE, 7, 7, 0x4148, 0x0000, 7]),
+            (-2, 12.5))
+
+    def test_block_codec2(self):
+        # Little endian and scaled fields, gathered
+        codec= datatypes.BlockCodec(4, [
+            ("A", 0, datatypes.DataType("uint32", word_order="little")),
+            ("B", 2, datatypes.DataType("int16", scale=0.1)),
+            ("C", 3, datatypes.UINT16)])
+        values= codec.decode_dict([0x0002, 0x0001, 25, 9])
+        self.assertEqual(values["A"], 0x10002)
+        self.assertAlmostEqual(values["B"], 2.5)
+        self.assertEqual(values["C"], 9)
+
+    @unittest.expectedFailure
+    def test_block_codec_fail1(self):
+        # Field beyond the block
+        datatypes.BlockCodec(2, [("A", 1, datatypes.FLOAT32)])
@@ -0,0 +1,111 @@
+# Imports
+import unittest
+from src.scanscheduler import ScanScheduler, VirtualClock
+
+class ScanSchedulerTest(unittest.TestCase):
+
+    def make_scheduler(self, durations, **kwargs):
+        """Scheduler with a 100 ms period whose cycles take the supplied 
+        durations (seconds)."""
+        virtual= VirtualClock()
+        durations= list(durations)
+        starts= []
+        def cycle():
+            starts.append(virtual.now)
+            virtual.now+= durations[len(starts) - 1]
+        scheduler= ScanScheduler(cycle, 0.1, clock=virtual.clock, 
+            sleep=virtual.sleep, **kwargs)
+        return scheduler, starts
+
+    # ================================================================
+    # run
+    def test_run1(self):
+        # I/O and logic time is compensated: no drift
+        scheduler, starts= self.make_scheduler([0.03, 0.05, 0.01, 0.02])
+        scheduler.run(cycles=4)
+        for idx, start in enumerate(starts):
+            self.assertAlmostEqual(start, 0.1 * idx)
+        self.assertEqual(scheduler.cycles, 4)
+        self.assertEqual(scheduler.overruns, 0)
+        self.assertEqual([round(latency, 6) for latency in 
+            scheduler.latencies()], [0.03, 0.05, 0.01, 0.02])
+
+    def test_run2(self):
+        # Skip policy: start at the next period boundary
+        scheduler, starts= self.make_scheduler([0.25, 0.01, 0.01],
+            overrun_policy="skip")
+        scheduler.run(cycles=3)
+        self.assertEqual(len(starts), 3)
+        self.assertAlmostEqual(starts[1], 0.3)
+        self.assertAlmostEqual(starts[2], 0.4)
+        self.assertEqual(scheduler.overruns, 1)
+        self.assertEqual(scheduler.skipped, 2)
+
+    def test_run3(self):
+        # Catch up policy: run missed cycles back-to-back
+        scheduler, starts= self.make_scheduler([0.25, 0.01, 0.01, 0.01],
+            overrun_policy="catch_up")
+        scheduler.run(cycles=4)
+        self.assertAlmostEqual(starts[1], 0.25)
+        self.assertAlmostEqual(starts[2], 0.26)
+        self.assertAlmostEqual(starts[3], 0.3)
+        self.assertEqual(scheduler.overruns, 2)
+        # Jitter: delay between scheduled and actual start
+        self.assertAlmostEqual(scheduler.jitters()[1], 0.15)
+
+    def test_run4(self):
+        # Warn policy: restart schedule after overrun
+        scheduler, starts= self.make_scheduler([0.25, 0.01, 0.01],
+            overrun_policy="warn")
+        with self.assertLogs(level="WARNING") as logs:
+            scheduler.run(cycles=3)
+        # First cycle overran
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("Scan cycle 0 ", logs.output[0])
+        self.assertAlmostEqual(starts[1], 0.25)
+        self.assertAlmostEqual(starts[2], 0.35)
+
+    def test_stop1(self):
+        virtual= VirtualClock()
+        def cycle():
+            virtual.now+= 0.01
+            if scheduler.cycles == 2:
+                scheduler.stop()
+        scheduler= ScanScheduler(cycle, 0.1, clock=virtual.clock, 
+            sleep=virtual.sleep)
+        scheduler.run()
+        self.assertEqual(scheduler.cycles, 3)
+        self.assertFalse(scheduler.running)
+
+    @unittest.expectedFailure
+    def test_constructor_fail1(self):
+        ScanScheduler(lambda: None, 0.1, overrun_policy="ignore")
+
+    @unittest.expectedFailure
+    def test_constructor_fail2(self):
+        # Empty ring buffers
+        ScanScheduler(lambda: None, 0.1, history=0)
+
+    # ================================================================
+    # ring buffer / percentiles
+    def test_percentiles1(self):
+        scheduler, _= self.make_scheduler(
+            [0.001 * idx for idx in range(1, 11)], history=5)
+        scheduler.run(cycles=10)
+        # Only the last 5 cycles are kept
+        latencies= scheduler.latencies()
+        self.assertEqual(len(latencies), 5)
+        self.assertAlmostEqual(latencies[0], 0.006)
+        self.assertAlmostEqual(latencies[-1], 0.010)
+        percentiles= scheduler.percentiles((0, 50, 100))
+        self.assertAlmostEqual(percentiles[0], 0.006)
+        self.assertAlmostEqual(percentiles[50], 0.008)
+        self.assertAlmostEqual(percentiles[100], 0.010)
+        stats= scheduler.stats()
+        self.assertEqual(stats["cycles"], 10)
+        self.assertAlmostEqual(stats["latency"]["max"], 0.010)
+        self.assertEqual(stats["jitter"]["max"], 0.0)
+
+    def test_percentiles2(self):
+        scheduler, _= self.make_scheduler([])
+        self.assertEqual(scheduler.percentiles((50,)), {50: None})